@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+
+from app.schemas.admin import SlowQuery
+from app.core.dependencies import get_admin_user_id
+from app.core.slow_queries import read_slow_queries
+
+router = APIRouter()
+
+@router.get("/slow-queries", response_model=List[SlowQuery])
+def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    service: Optional[str] = Query(None, description="Servicio (assets_service) o función (assets_service.get_assets)"),
+    admin_id: int = Depends(get_admin_user_id)
+):
+    """
+    Consultas lentas capturadas por este proceso, de la más reciente a la más antigua,
+    con sus parámetros redactados y el plan de EXPLAIN (ANALYZE, BUFFERS).
+    """
+    return read_slow_queries(limit, service)
@@ -0,0 +1,25 @@
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.core.dependencies import get_current_user_id
+from app.services.export_service import export_stream, EXPORT_FORMATS
+
+router = APIRouter()
+
+@router.get("/{dataset}")
+async def export_data(
+    dataset: Literal["operations", "transactions", "prices"],
+    format: Literal["csv", "parquet"] = "csv",
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Descarga las operaciones, transacciones o el histórico de precios de los activos del usuario
+    en CSV o Parquet. La respuesta se envía por trozos a medida que se lee la base de datos.
+    """
+    filename = f"{dataset}_{date.today():%Y%m%d}.{format}"
+    return StreamingResponse(
+        export_stream(dataset, user_id, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.dependencies import get_current_user_id, get_db
+from app.core.dependencies import get_current_user_id, get_read_db
 from app.services.history_chart_service import get_account_growth, get_portfolio_growth 
 from app.schemas.history_chart import PortfolioGrowthResponse
 
 router = APIRouter()
 
 @router.get("/growth", response_model=PortfolioGrowthResponse)
-async def get_growth(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+async def get_growth(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
     try:
         history = await get_portfolio_growth(db, user_id)
         return {"history": history}
@@ -17,7 +17,7 @@ async def get_growth(user_id: int = Depends(get_current_user_id), db: AsyncSessi
     
 
 @router.get("/growth/account/{account_id}", response_model=PortfolioGrowthResponse)
-async def get_account_growth_endpoint(account_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+async def get_account_growth_endpoint(account_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
     try:
         # Verificación de propiedad de la cuenta
         acc_query = await db.execute(
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.schemas.rebalance import RebalanceSettingRead, RebalanceBulkUpdate
-from app.services.rebalance_service import get_rebalance_status, update_rebalance_settings
+from app.schemas.rebalance import RebalanceSettingRead, RebalanceBulkUpdate, RebalancePlan, RebalanceBacktest
+from app.services.rebalance_service import get_rebalance_status, update_rebalance_settings, get_rebalance_plan, get_rebalance_backtest
 from app.core.dependencies import get_current_user_id, get_db
 
 router = APIRouter()
@@ -23,6 +23,43 @@ async def get_rebalance_table(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener datos: {str(e)}")
 
+@router.get("/plan", response_model=RebalancePlan)
+async def get_rebalance_plan_endpoint(
+    cash: float = Query(0, ge=0, description="Efectivo disponible para invertir (divisa base)"),
+    min_trade: float = Query(0, ge=0, description="Importe mínimo de cada orden (divisa base)"),
+    whole_shares: bool = True,
+    allow_sells: bool = True,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Calcula las órdenes de compra/venta para llevar la cartera a los porcentajes objetivo,
+    con las posiciones actuales a último precio, el efectivo disponible, un importe mínimo
+    por orden y redondeo a acciones enteras.
+    """
+    try:
+        return await get_rebalance_plan(db, user_id, cash, min_trade, whole_shares, allow_sells)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al calcular el plan: {str(e)}")
+
+@router.get("/backtest", response_model=RebalanceBacktest)
+async def get_rebalance_backtest_endpoint(
+    strategy: str = Query("monthly", description="monthly | quarterly | threshold"),
+    threshold: float = Query(5, gt=0, le=100, description="Desviación máxima en puntos para la estrategia por umbral"),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Simula la estrategia de rebalanceo guardada sobre el histórico de precios real,
+    con las mismas aportaciones que la cartera, y la compara con su crecimiento real.
+    """
+    try:
+        return await get_rebalance_backtest(db, user_id, strategy, threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al simular el rebalanceo: {str(e)}")
+
 @router.post("/save")
 async def save_rebalance(
     payload: RebalanceBulkUpdate,
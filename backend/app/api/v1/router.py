@@ -7,6 +7,8 @@ from app.api.v1.accounts import router as accounts_router
 from app.api.v1.rebalance import router as rebalance_router
 from app.api.v1.history_chart import router as history_chart
 from app.api.v1.transactions import router as transactions_router
+from app.api.v1.export import router as export_router
+from app.api.v1.admin import router as admin_router
 
 api_router = APIRouter()
 api_router.include_router(
@@ -55,4 +57,16 @@ api_router.include_router(
     transactions_router,
     prefix="/transactions",
     tags=["transactions"]
-)
\ No newline at end of file
+)
+
+api_router.include_router(
+    export_router,
+    prefix="/export",
+    tags=["export"]
+)
+
+api_router.include_router(
+    admin_router,
+    prefix="/admin",
+    tags=["admin"]
+)
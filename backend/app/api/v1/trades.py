@@ -1,30 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import get_current_user_id, get_db
 from app.services.trade_service import get_trade_history, create_operation
 from app.services.transaction_service import create_transaction_from_operation
+from app.services.import_service import import_operations_csv, ImportFileError
 
 from app.models.asset import Asset
-from app.schemas.trade import TradeHistoryResponse
+from app.schemas.trade import TradeHistoryPage, TradeImportResult
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.schemas.operation import OperationCreate, OperationResponse
-from typing import Optional
+from typing import Optional, Literal
+from datetime import datetime
 
 router = APIRouter()
 
-@router.get("/history", summary="Get complete trade history for a user", response_model=list[TradeHistoryResponse])
-async def get_user_trade_history(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+@router.get("/history", summary="Get paginated trade history for a user", response_model=TradeHistoryPage)
+async def get_user_trade_history(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    account_id: Optional[int] = None,
+    asset_id: Optional[int] = None,
+    operation_type: Optional[Literal["buy", "sell"]] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Retrieve all trade operations (buys/sells) for the authenticated user.
+    Retrieve trade operations (buys/sells) for the authenticated user, one page at a time.
     
     Returns:
     - Ticker, ISIN, asset name and currency
     - Operation date, quantity, price and type (buy/sell)
     - Fees and account name
     - Ordered by date (newest first)
+    - `next_cursor`: pass it as `cursor` to get the next page (null on the last page)
+
+    Optional filters: account, asset, operation type and date range.
     """
-    trades = await get_trade_history(db, user_id)
-    return trades
+    try:
+        trades, next_cursor = await get_trade_history(
+            db, user_id, limit, cursor,
+            account_id=account_id,
+            asset_id=asset_id,
+            operation_type=operation_type,
+            date_from=date_from,
+            date_to=date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": trades, "next_cursor": next_cursor}
 
 
 @router.post("/create", response_model=OperationResponse, status_code=201)
@@ -49,4 +75,26 @@ async def create_new_operation(operation_data: OperationCreate, user_id: int = D
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         await db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error interno al procesar la operación: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error interno al procesar la operación: {str(e)}")
+
+
+@router.post("/import", response_model=TradeImportResult, status_code=201)
+async def import_operations(
+    file: UploadFile = File(..., description="CSV: date, account_id, operation_type, quantity, price, fees y asset_id, ticker o isin"),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk import of a broker trade history from a CSV file.
+
+    Rows are streamed and inserted in batches together with their cash transactions and price points.
+    The import is atomic: if any row is invalid nothing is stored and the row errors are returned.
+    """
+    try:
+        return await import_operations_csv(db, user_id, file.file)
+    except ImportFileError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail={"message": str(e), "errors": e.errors})
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error interno al importar las operaciones: {str(e)}")
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional, Literal
+from datetime import datetime
 from app.core.dependencies import get_current_user_id, get_db
-from app.schemas.transaction import TransactionCreate, TransactionResponse
-from app.services import transaction_service
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.schemas.transaction import (
+    TransactionCreate, TransactionResponse, TransactionPage, TransactionSummaryRow,
+    MonthlyTrendPoint, CategoryTrendResponse, StatementImportResult
+)
+from app.services import transaction_service, spending_service
+from app.services.import_service import import_statement, statement_format, ImportFileError
 
 router = APIRouter()
 
@@ -15,9 +21,107 @@ async def create_new_transaction(
 ):
     return await transaction_service.create_transaction(db, transaction_in, current_user_id)
 
-@router.get("/me", response_model=List[TransactionResponse])
+@router.post("/import", response_model=StatementImportResult, status_code=status.HTTP_201_CREATED)
+async def import_bank_statement(
+    account_id: int,
+    file: UploadFile = File(..., description="Extracto en CSV (date, amount, description[, category, type]), OFX/QFX o CAMT.053 (.xml)"),
+    db: AsyncSession = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Importa un extracto bancario en la cuenta indicada.
+    El formato se deduce de la extensión; los movimientos que ya existen no se duplican.
+    Si alguna línea no es válida no se guarda nada y se devuelven los errores.
+    """
+    try:
+        return await import_statement(db, current_user_id, account_id, file.file, statement_format(file.filename))
+    except ImportFileError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail={"message": str(e), "errors": e.errors})
+
+@router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_transaction(
+    transaction_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Baja lógica: la transacción deja de contar en saldos, listados y resúmenes.
+    """
+    await transaction_service.deactivate_transaction(db, transaction_id, current_user_id)
+
+@router.get("/me", response_model=TransactionPage)
 async def list_transactions(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    account_id: Optional[int] = None,
+    category: Optional[str] = None,
+    type: Optional[Literal["income", "expense"]] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Transacciones del usuario paginadas por cursor (más recientes primero).
+    `next_cursor` se pasa como `cursor` para la página siguiente (null en la última).
+    Filtros opcionales: cuenta, categoría, tipo y rango de fechas.
+    """
+    try:
+        transactions, next_cursor = await transaction_service.get_user_transactions(
+            db, current_user_id, limit, cursor,
+            account_id=account_id,
+            category=category,
+            type=type,
+            date_from=date_from,
+            date_to=date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": transactions, "next_cursor": next_cursor}
+
+@router.get("/summary", response_model=List[TransactionSummaryRow])
+async def transaction_summary(
+    account_id: Optional[int] = None,
+    type: Optional[Literal["income", "expense"]] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Totales por mes, categoría y tipo (en la divisa base), calculados en la base de datos.
+    """
+    return await transaction_service.get_transaction_summary(
+        db, current_user_id,
+        account_id=account_id,
+        type=type,
+        date_from=date_from,
+        date_to=date_to
+    )
+
+@router.get("/trends/monthly", response_model=List[MonthlyTrendPoint])
+async def monthly_trend(
+    months: int = Query(12, ge=1, le=120),
+    account_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Ingresos, gastos y neto por mes con la variación respecto al mes anterior (divisa base).
+    Se lee del rollup mensual, sin recorrer las transacciones.
+    """
+    return await spending_service.get_monthly_trend(db, current_user_id, months, account_id)
+
+@router.get("/trends/categories", response_model=CategoryTrendResponse)
+async def category_trend(
+    type: Literal["income", "expense"] = "expense",
+    months: int = Query(12, ge=1, le=120),
+    account_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
     current_user_id: int = Depends(get_current_user_id)
 ):
-    return await transaction_service.get_user_transactions(db, current_user_id)
\ No newline at end of file
+    """
+    Serie mensual por categoría de gastos (o ingresos) en la divisa base, leída del rollup mensual.
+    """
+    return await spending_service.get_category_trend(db, current_user_id, type, months, account_id)
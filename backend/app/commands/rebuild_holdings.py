@@ -0,0 +1,17 @@
+"""
+Reconstruye las tablas holdings, tax_lots y lot_realizations a partir de la tabla operations.
+
+Uso (desde backend/):
+    python -m app.commands.rebuild_holdings
+"""
+import asyncio
+from app.core.database import AsyncSessionLocal
+from app.services.holdings_service import rebuild_holdings
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        total = await rebuild_holdings(db)
+    print(f"Holdings reconstruidos: {total} posiciones")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+"""
+Comprueba que los saldos de cash_balances cuadran con la tabla transactions.
+Con --fix corrige las cuentas descuadradas (también sirve para rellenar la tabla la primera vez).
+
+Uso (desde backend/):
+    python -m app.commands.reconcile_cash_balances [--fix]
+"""
+import asyncio
+import sys
+from app.core.database import AsyncSessionLocal
+from app.services.cash_service import reconcile_cash_balances
+
+async def main(fix: bool) -> int:
+    async with AsyncSessionLocal() as db:
+        mismatches = await reconcile_cash_balances(db, fix=fix)
+        if fix:
+            await db.commit()
+
+    for row in mismatches:
+        print(
+            f"Cuenta {row['account_id']}: ledger {row['ledger_balance']} ({row['ledger_count']} transacciones), "
+            f"guardado {row['stored_balance']} ({row['stored_count']} transacciones)"
+        )
+
+    if not mismatches:
+        print("Saldos de caja correctos")
+        return 0
+    if fix:
+        print(f"Saldos corregidos: {len(mismatches)} cuentas")
+        return 0
+    print(f"Saldos descuadrados: {len(mismatches)} cuentas (ejecuta con --fix para corregirlos)")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--fix" in sys.argv[1:])))
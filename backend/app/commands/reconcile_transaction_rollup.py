@@ -0,0 +1,36 @@
+"""
+Comprueba que transaction_monthly_rollup cuadra con las transacciones activas.
+Con --fix corrige las filas descuadradas (también sirve para rellenar la tabla la primera vez).
+
+Uso (desde backend/):
+    python -m app.commands.reconcile_transaction_rollup [--fix]
+"""
+import asyncio
+import sys
+from app.core.database import AsyncSessionLocal
+from app.services.spending_service import reconcile_transaction_rollup
+
+async def main(fix: bool) -> int:
+    async with AsyncSessionLocal() as db:
+        mismatches = await reconcile_transaction_rollup(db, fix=fix)
+        if fix:
+            await db.commit()
+
+    for row in mismatches:
+        print(
+            f"Cuenta {row['account_id']} {row['month']:%Y-%m} {row['category']} ({row['type']}): "
+            f"ledger {row['ledger_total']} ({row['ledger_count']} transacciones), "
+            f"guardado {row['stored_total']} ({row['stored_count']} transacciones)"
+        )
+
+    if not mismatches:
+        print("Rollup mensual correcto")
+        return 0
+    if fix:
+        print(f"Rollup corregido: {len(mismatches)} filas")
+        return 0
+    print(f"Rollup descuadrado: {len(mismatches)} filas (ejecuta con --fix para corregirlo)")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--fix" in sys.argv[1:])))
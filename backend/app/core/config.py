@@ -15,4 +15,64 @@ if SECRET_KEY is None:
 
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
-REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
\ No newline at end of file
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Antigüedad máxima (en días) de las métricas precalculadas por el worker
+PERFORMANCE_CACHE_MAX_AGE_DAYS = int(os.getenv("PERFORMANCE_CACHE_MAX_AGE_DAYS", "1"))
+
+# Método de asignación de lotes en las ventas (fifo | lifo)
+LOT_MATCHING_METHOD = os.getenv("LOT_MATCHING_METHOD", "fifo")
+
+# Divisa en la que se expresan todas las valoraciones (saldos, asignaciones, crecimiento)
+BASE_CURRENCY = os.getenv("BASE_CURRENCY", "EUR")
+
+# Segundos que se reutiliza en memoria la matriz de tipos de cambio antes de recargarla
+FX_CACHE_TTL_SECONDS = int(os.getenv("FX_CACHE_TTL_SECONDS", "3600"))
+
+# Pool de conexiones del motor (por proceso de uvicorn: conexiones máximas = workers × (pool + overflow))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Sentencias preparadas que asyncpg guarda por conexión (0 para desactivarlas, p. ej. detrás de pgbouncer)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+# statement_timeout de cada conexión en milisegundos (0 = sin límite)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# Log de SQLAlchemy: WARNING (sin SQL), INFO (sentencias) o DEBUG (sentencias y filas)
+DB_LOG_LEVEL = os.getenv("DB_LOG_LEVEL", "WARNING").upper()
+
+# Réplica de solo lectura para las lecturas de analítica (/portfolio, /history_chart); sin ella se lee del primario
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
+
+# Segundos que un usuario sigue leyendo del primario tras escribir (para ver sus cambios aunque la réplica vaya con retraso)
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+# Caché de respuestas GET de /portfolio y /history_chart: entradas máximas (LRU) y caducidad de seguridad
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "900"))
+
+# Consultas pesadas (crecimiento, rendimiento) a la vez por usuario y en todo el proceso.
+# El global debe quedar por debajo de DB_POOL_SIZE para dejar conexiones al resto de peticiones.
+EXPENSIVE_QUERIES_PER_USER = int(os.getenv("EXPENSIVE_QUERIES_PER_USER", "2"))
+EXPENSIVE_QUERIES_GLOBAL = int(os.getenv("EXPENSIVE_QUERIES_GLOBAL", "6"))
+
+# Captura de consultas lentas: umbral en milisegundos (0 = desactivada) y servicios vigilados (vacío = todos)
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_SERVICES = {
+    service.strip()
+    for service in os.getenv("SLOW_QUERY_SERVICES", "assets_service,account_service,history_chart_service").split(",")
+    if service.strip()
+}
+# Segundos durante los que no se repite el EXPLAIN ANALYZE de una misma sentencia
+SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS = int(os.getenv("SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS", "300"))
+# Fichero rotativo (JSON por línea) donde se guardan, tamaño máximo y ficheros rotados que se conservan
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "logs/slow_queries.jsonl")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+
+# Usuarios con acceso a los endpoints de /admin (ids separados por comas)
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
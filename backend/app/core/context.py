@@ -0,0 +1,5 @@
+from contextvars import ContextVar
+
+# Usuario autenticado de la petición en curso (None fuera de una petición o sin token).
+# Lo fija get_current_user_id; la sesión lo usa para saber quién ha escrito.
+current_user_id: ContextVar[int | None] = ContextVar("current_user_id", default=None)
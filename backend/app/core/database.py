@@ -1,14 +1,145 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+import time
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine
+from sqlalchemy.orm import DeclarativeBase, Session
 
-from app.core.config import DATABASE_URL
+from app.core.config import (
+    DATABASE_URL,
+    DATABASE_REPLICA_URL,
+    REPLICA_STICKY_SECONDS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_STATEMENT_TIMEOUT_MS,
+    DB_LOG_LEVEL,
+)
+from app.core.context import current_user_id
+
+# echo añade el handler de SQLAlchemy; por debajo de INFO no se registra ninguna sentencia
+SQL_ECHO = {"DEBUG": "debug", "INFO": True}
+
+def _create_engine(url: str, read_only: bool = False) -> AsyncEngine:
+    server_settings = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    if read_only:
+        server_settings["default_transaction_read_only"] = "on"
+    return create_async_engine(
+        url,
+        echo=SQL_ECHO.get(DB_LOG_LEVEL, False),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            # Caché de sentencias preparadas de SQLAlchemy y la interna de asyncpg
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        },
+    )
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = _create_engine(DATABASE_URL)
+# Sin réplica configurada las lecturas usan el mismo motor (y pool) que las escrituras
+replica_engine = _create_engine(DATABASE_REPLICA_URL, read_only=True) if DATABASE_REPLICA_URL else engine
+
+class PrimarySession(Session):
+    """Sesión del primario: al confirmar, el usuario de la petición queda fijado al primario."""
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
+    expire_on_commit=False,
+    sync_session_class=PrimarySession
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=replica_engine,
     expire_on_commit=False
 )
 
 class Base(DeclarativeBase):
     pass
+
+# user_id -> instante (time.monotonic) hasta el que sus lecturas van al primario
+_primary_until = {}
+
+def mark_primary_sticky(user_id: int):
+    now = time.monotonic()
+    if len(_primary_until) > 10000:
+        for expired in [uid for uid, until in _primary_until.items() if until <= now]:
+            del _primary_until[expired]
+    _primary_until[user_id] = now + REPLICA_STICKY_SECONDS
+
+def reads_from_primary(user_id: int) -> bool:
+    """Si las lecturas del usuario deben ir al primario (no hay réplica o ha escrito hace poco)."""
+    if replica_engine is engine:
+        return True
+    return _primary_until.get(user_id, 0.0) > time.monotonic()
+
+@event.listens_for(PrimarySession, "after_commit")
+def _on_primary_commit(session):
+    # Dentro de la petición que escribe, antes de responder: la siguiente lectura ya ve el primario
+    user_id = current_user_id.get()
+    if user_id is not None and replica_engine is not engine:
+        mark_primary_sticky(user_id)
+
+def _track_pool(tracked: AsyncEngine) -> dict:
+    """Registra los eventos del pool del motor y devuelve sus contadores (desde que arrancó el proceso)."""
+    stats = {
+        "connects": 0,
+        "checkouts": 0,
+        "invalidations": 0,
+        "peak_checked_out": 0,
+        "held_seconds_total": 0.0,
+        "held_seconds_max": 0.0,
+    }
+
+    @event.listens_for(tracked.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats["connects"] += 1
+
+    @event.listens_for(tracked.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats["checkouts"] += 1
+        stats["peak_checked_out"] = max(stats["peak_checked_out"], tracked.pool.checkedout())
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(tracked.sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            held = time.perf_counter() - checked_out_at
+            stats["held_seconds_total"] += held
+            stats["held_seconds_max"] = max(stats["held_seconds_max"], held)
+
+    @event.listens_for(tracked.sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats["invalidations"] += 1
+
+    return stats
+
+_pool_stats = {"primary": _track_pool(engine)}
+if replica_engine is not engine:
+    _pool_stats["replica"] = _track_pool(replica_engine)
+
+def pool_metrics() -> dict:
+    """
+    Estado actual de cada pool (primario y, si hay, réplica) y contadores acumulados
+    de uso, para dimensionar DB_POOL_SIZE / DB_MAX_OVERFLOW con la carga real.
+    """
+    metrics = {}
+    for name, stats in _pool_stats.items():
+        pool = (engine if name == "primary" else replica_engine).pool
+        checkouts = stats["checkouts"]
+        metrics[name] = {
+            "pool_size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            **stats,
+            "held_seconds_avg": stats["held_seconds_total"] / checkouts if checkouts else 0.0,
+        }
+    return metrics
@@ -1,7 +1,9 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from app.core.database import AsyncSessionLocal
+from app.core.database import AsyncSessionLocal, AsyncReadSessionLocal, reads_from_primary
+from app.core.context import current_user_id
+from app.core.config import ADMIN_USER_IDS
 from sqlalchemy import select
 
 from app.core.jwt import SECRET_KEY, ALGORITHM
@@ -18,6 +20,23 @@ async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401)
+        current_user_id.set(int(user_id))
         return int(user_id)
     except JWTError:
         raise HTTPException(status_code=401)
+
+async def get_admin_user_id(user_id: int = Depends(get_current_user_id)) -> int:
+    # Solo los usuarios de ADMIN_USER_IDS
+    if user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Acceso restringido a administradores")
+    return user_id
+
+async def get_read_db(user_id: int = Depends(get_current_user_id)):
+    """
+    Sesión para lecturas de analítica: va a la réplica si hay una configurada, salvo que
+    el usuario haya escrito hace menos de REPLICA_STICKY_SECONDS (entonces al primario,
+    para que vea sus propios cambios).
+    """
+    session_factory = AsyncSessionLocal if reads_from_primary(user_id) else AsyncReadSessionLocal
+    async with session_factory() as session:
+        yield session
@@ -0,0 +1,143 @@
+import time
+import greenlet
+from sqlalchemy import event
+
+# Límites (segundos) de los buckets de los histogramas de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Histograma acumulado en memoria del proceso, con una serie por combinación de etiquetas."""
+
+    def __init__(self, name: str, description: str, labelnames: tuple, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # etiquetas -> [conteo por bucket, suma, total]
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in sorted(self.series.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            prefix = label_text + "," if label_text else ""
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Tiempo de respuesta por ruta (plantilla), método y código",
+    ("method", "route", "status"),
+)
+SQL_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Tiempo de cada sentencia SQL por función de servicio que la lanza",
+    ("service",),
+)
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide cada petición HTTP hasta enviar el último trozo del cuerpo.
+    La ruta es la plantilla de FastAPI (/trades/{id}), no la URL, para acotar las series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            HTTP_LATENCY.observe(
+                (scope["method"], route_template(scope), str(status["code"])),
+                time.perf_counter() - start
+            )
+
+def route_template(scope) -> str:
+    """
+    Plantilla de la ruta que atendió la petición. Con routers incluidos, FastAPI deja la
+    plantilla completa en el contexto de la ruta elegida (scope["route"] solo trae la parte
+    relativa al router). Las respuestas servidas desde la caché la traen en "route_template".
+    """
+    if "route_template" in scope:
+        return scope["route_template"]
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if getattr(context, "path_format", None):
+        return context.path_format
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _calling_service() -> str:
+    """
+    Función de servicio que lanzó la sentencia. Con AsyncSession la sentencia se ejecuta en
+    un greenlet; la pila de corrutinas que la pidió es la del greenlet padre, parado en
+    greenlet_spawn. Se toma la función pública más interna de app.services (o, si no hay,
+    la más interna de app: endpoints y comandos con SQL propio).
+    """
+    current = greenlet.getcurrent()
+    frame = current.parent.gr_frame if current.parent is not None else None
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        function = frame.f_code.co_name
+        if module.startswith("app.services.") and not function.startswith("_"):
+            return f"{module.rsplit('.', 1)[-1]}.{function}"
+        if fallback is None and module.startswith("app.") and not module.startswith("app.core."):
+            fallback = f"{module.rsplit('.', 1)[-1]}.{function}"
+        frame = frame.f_back
+    return fallback or "other"
+
+def instrument_engine(engine):
+    """Mide cada sentencia del motor y la atribuye a la función de servicio que la lanzó."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_timing = (time.perf_counter(), _calling_service())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        start, service = context._metrics_timing
+        SQL_LATENCY.observe((service,), time.perf_counter() - start)
+
+def render_metrics(pools: dict) -> str:
+    """Histogramas de HTTP y SQL y estado de los pools en formato de texto de Prometheus."""
+    lines = HTTP_LATENCY.render() + SQL_LATENCY.render()
+    gauges = {
+        "checked_out": "Conexiones del pool en uso",
+        "checked_in": "Conexiones del pool libres",
+        "peak_checked_out": "Máximo de conexiones en uso a la vez",
+    }
+    for metric, description in gauges.items():
+        lines += [f"# HELP db_pool_{metric} {description}", f"# TYPE db_pool_{metric} gauge"]
+        lines += [f'db_pool_{metric}{{pool="{pool}"}} {stats[metric]}' for pool, stats in pools.items()]
+    lines += ["# HELP db_pool_checkouts_total Conexiones entregadas por el pool", "# TYPE db_pool_checkouts_total counter"]
+    lines += [f'db_pool_checkouts_total{{pool="{pool}"}} {stats["checkouts"]}' for pool, stats in pools.items()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime
+
+# Tamaño de página por defecto y máximo de los listados paginados por cursor
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(date: datetime, row_id: int) -> str:
+    """
+    Cursor opaco con la clave (date, id) de la última fila devuelta.
+    La siguiente página empieza justo después de esa fila en el orden (date DESC, id DESC).
+    """
+    raw = f"{date.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        date, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(date), int(row_id)
+    except Exception:
+        raise ValueError("Cursor de paginación no válido")
@@ -0,0 +1,263 @@
+import asyncio
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from jose import jwt, JWTError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+from app.core.jwt import SECRET_KEY, ALGORITHM
+from app.core.metrics import route_template
+
+# Canal de NOTIFY por el que el worker (y las escrituras en price_history) avisan de precios nuevos
+PRICE_UPDATES_CHANNEL = "price_updates"
+# Canal por el que cada proceso avisa al resto de las escrituras de un usuario (payload: user_id)
+USER_INVALIDATIONS_CHANNEL = "user_cache_invalidations"
+
+# Rutas GET cuyas respuestas se cachean por usuario
+CACHED_PREFIXES = ("/api/v1/portfolio/", "/api/v1/history_chart/")
+
+class CacheBackend(ABC):
+    """
+    Almacén de la caché de respuestas. Además de las entradas guarda contadores de
+    generación: invalidar un usuario (o los precios) es subir su generación, y las
+    claves antiguas dejan de consultarse. Un backend compartido (p. ej. Redis) implementa
+    estos cuatro métodos y se activa con set_cache_backend.
+    """
+
+    # Generaciones propias de cada proceso: las invalidaciones de usuario se avisan al resto
+    # de procesos (USER_INVALIDATIONS_CHANNEL). Un backend compartido no lo necesita.
+    per_process = False
+
+    @abstractmethod
+    async def get(self, key: str):
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value):
+        ...
+
+    @abstractmethod
+    async def generation(self, name: str) -> int:
+        ...
+
+    @abstractmethod
+    async def bump(self, name: str):
+        ...
+
+class MemoryCacheBackend(CacheBackend):
+    """Caché del proceso: LRU con un máximo de entradas y caducidad por entrada."""
+
+    per_process = True
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.generations = {}
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value):
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def generation(self, name: str) -> int:
+        return self.generations.get(name, 0)
+
+    async def bump(self, name: str):
+        self.generations[name] = self.generations.get(name, 0) + 1
+
+_backend: CacheBackend = MemoryCacheBackend()
+
+def set_cache_backend(backend: CacheBackend):
+    global _backend
+    _backend = backend
+
+async def invalidate_user(user_id: int, engine=None):
+    """
+    Invalida la caché del usuario en este proceso y, si las generaciones son por proceso, avisa
+    a los demás workers por NOTIFY para que no sirvan respuestas anteriores a la escritura.
+    """
+    await _backend.bump(f"user:{user_id}")
+    if engine is None or not _backend.per_process:
+        return
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": USER_INVALIDATIONS_CHANNEL, "payload": str(user_id)}
+            )
+            await conn.commit()
+    except Exception as e:
+        # Los demás procesos la verán caducar (TTL); la respuesta de la escritura no debe fallar por esto
+        print(f"Error avisando por {USER_INVALIDATIONS_CHANNEL}: {e}")
+
+async def invalidate_prices():
+    await _backend.bump("prices")
+
+async def cache_generations(user_id: int | None) -> tuple:
+    """Generaciones vigentes (usuario, precios): cambian con cada escritura del usuario o precio nuevo."""
+    user_generation = await _backend.generation(f"user:{user_id}") if user_id is not None else None
+    return user_generation, await _backend.generation("prices")
+
+async def notify_price_update(db: AsyncSession):
+    """Avisa a todos los procesos de que han cambiado precios (se entrega al hacer commit)."""
+    await db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": PRICE_UPDATES_CHANNEL})
+
+async def _cache_key(user_id: int, path: str, query_string: bytes) -> str:
+    # Las generaciones van en la clave: se leen antes de calcular la respuesta, así que un
+    # resultado calculado mientras llega una escritura queda guardado con la generación vieja
+    user_generation, prices_generation = await cache_generations(user_id)
+    query = "&".join(sorted(query_string.decode("latin-1").split("&")))
+    return f"{user_id}:{user_generation}:{prices_generation}:{path}?{query}"
+
+def _user_id(headers: dict) -> int | None:
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        user_id = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        return int(user_id) if user_id is not None else None
+    except (JWTError, ValueError):
+        return None
+
+def _cache_headers(etag: str) -> list:
+    # no-cache: el navegador guarda la respuesta pero siempre revalida con If-None-Match
+    return [
+        (b"etag", etag.encode()),
+        (b"cache-control", b"private, no-cache"),
+        (b"vary", b"Authorization"),
+    ]
+
+class ResponseCacheMiddleware:
+    """
+    Middleware ASGI de la caché de respuestas:
+    - GET en CACHED_PREFIXES: se sirve de la caché (o se calcula y se guarda si es 200),
+      con ETag; si coincide con If-None-Match se responde 304 sin cuerpo
+    - Cualquier otro método de un usuario autenticado invalida su caché antes de responder,
+      en este proceso y (con `engine`) en los demás workers
+    Las actualizaciones de precios invalidan todo a través de listen_for_invalidations.
+    """
+
+    def __init__(self, app, engine=None):
+        self.app = app
+        self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        user_id = _user_id(headers)
+        if user_id is None:
+            return await self.app(scope, receive, send)
+
+        if scope["method"] not in ("GET", "HEAD", "OPTIONS"):
+            return await self.app(scope, receive, self._invalidating_send(user_id, send))
+        if scope["method"] != "GET" or not scope["path"].startswith(CACHED_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        key = await _cache_key(user_id, scope["path"], scope["query_string"])
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1")
+        cached = await _backend.get(key)
+        if cached is not None:
+            # Sin pasar por el router: las métricas toman la ruta de la entrada
+            scope["route_template"] = cached["route"]
+            return await self._send_cached(send, cached, if_none_match)
+
+        response = {"start": None, "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+            response["body"].append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            start, body = response["start"], b"".join(response["body"])
+            if start["status"] != 200:
+                await send(start)
+                return await send({"type": "http.response.body", "body": body})
+
+            entry = {
+                "headers": [(k, v) for k, v in start["headers"] if k.lower() != b"content-length"],
+                "body": body,
+                "etag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+                "route": route_template(scope),
+            }
+            await _backend.set(key, entry)
+            await self._send_cached(send, entry, if_none_match)
+
+        await self.app(scope, receive, capture)
+
+    def _invalidating_send(self, user_id: int, send):
+        async def wrapped(message):
+            # La escritura ya se ha confirmado cuando empieza la respuesta
+            if message["type"] == "http.response.start":
+                await invalidate_user(user_id, self.engine)
+            await send(message)
+        return wrapped
+
+    async def _send_cached(self, send, entry: dict, if_none_match: str):
+        if entry["etag"] in [tag.strip() for tag in if_none_match.split(",")]:
+            await send({"type": "http.response.start", "status": 304, "headers": _cache_headers(entry["etag"])})
+            return await send({"type": "http.response.body", "body": b""})
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": entry["headers"] + [(b"content-length", str(len(entry["body"])).encode())] + _cache_headers(entry["etag"]),
+        })
+        await send({"type": "http.response.body", "body": entry["body"]})
+
+async def listen_for_invalidations(engine, retry_seconds: float = 5.0):
+    """
+    Escucha PRICE_UPDATES_CHANNEL y USER_INVALIDATIONS_CHANNEL en una conexión dedicada mientras
+    vive la aplicación. Un aviso de precios invalida la caché entera y uno de usuario, la de ese
+    usuario (solo en este proceso: no se vuelve a avisar). Si la conexión se pierde se invalida
+    todo (pudo perderse un aviso) y se vuelve a conectar.
+    """
+    def on_notification(connection, pid, channel, payload):
+        if channel == USER_INVALIDATIONS_CHANNEL:
+            if payload.isdigit():
+                asyncio.create_task(_backend.bump(f"user:{payload}"))
+            return
+        asyncio.create_task(invalidate_prices())
+
+    while True:
+        lost = asyncio.Event()
+        try:
+            async with engine.connect() as conn:
+                raw = (await conn.get_raw_connection()).driver_connection
+                raw.add_termination_listener(lambda connection: lost.set())
+                for channel in (PRICE_UPDATES_CHANNEL, USER_INVALIDATIONS_CHANNEL):
+                    await raw.add_listener(channel, on_notification)
+                try:
+                    await lost.wait()
+                finally:
+                    if not raw.is_closed():
+                        for channel in (PRICE_UPDATES_CHANNEL, USER_INVALIDATIONS_CHANNEL):
+                            await raw.remove_listener(channel, on_notification)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error escuchando {PRICE_UPDATES_CHANNEL} y {USER_INVALIDATIONS_CHANNEL}: {e}")
+        await invalidate_prices()
+        await asyncio.sleep(retry_seconds)
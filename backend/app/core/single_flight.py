@@ -0,0 +1,88 @@
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import EXPENSIVE_QUERIES_PER_USER, EXPENSIVE_QUERIES_GLOBAL
+from app.core.context import current_user_id
+from app.core.response_cache import cache_generations
+
+# Cálculos en curso: clave de la llamada -> tarea compartida por todos los que la piden
+_in_flight: dict[tuple, asyncio.Task] = {}
+# Claves de los cálculos que ya tienen hueco y se están ejecutando
+_running: set[tuple] = set()
+
+_global_slots = asyncio.Semaphore(EXPENSIVE_QUERIES_GLOBAL)
+# user_id -> [semáforo, peticiones que lo usan]; se borra al quedar sin uso
+_user_slots: dict[int, list] = {}
+
+# True dentro de un cálculo que ya tiene hueco: las llamadas anidadas (rendimiento -> crecimiento)
+# no piden otro, así no se bloquean esperando huecos que ocupan sus propios padres
+_holding_slot: ContextVar[bool] = ContextVar("_holding_slot", default=False)
+
+@asynccontextmanager
+async def _expensive_slot(user_id: int | None):
+    if _holding_slot.get():
+        yield
+        return
+
+    entry = None
+    if user_id is not None:
+        entry = _user_slots.setdefault(user_id, [asyncio.Semaphore(EXPENSIVE_QUERIES_PER_USER), 0])
+        entry[1] += 1
+    try:
+        if entry is not None:
+            await entry[0].acquire()
+        try:
+            async with _global_slots:
+                token = _holding_slot.set(True)
+                try:
+                    yield
+                finally:
+                    _holding_slot.reset(token)
+        finally:
+            if entry is not None:
+                entry[0].release()
+    finally:
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _user_slots.pop(user_id, None)
+
+async def _run(key, func, bind, user_id, args, kwargs):
+    # Sesión propia: la tarea sobrevive a la petición que la lanzó si esta se cancela
+    async with _expensive_slot(user_id):
+        _running.add(key)
+        try:
+            async with AsyncSession(bind, expire_on_commit=False) as session:
+                return await func(session, *args, **kwargs)
+        finally:
+            _running.discard(key)
+
+def single_flight(func):
+    """
+    Decorador para consultas de solo lectura caras de los servicios, `func(db, *args)`.
+    Las llamadas idénticas y simultáneas (mismos argumentos, mismo motor, sin escrituras
+    del usuario ni precios nuevos entre medias) comparten una sola ejecución. Cada ejecución
+    ocupa un hueco de EXPENSIVE_QUERIES_PER_USER y de EXPENSIVE_QUERIES_GLOBAL; el resto espera.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        user_id = current_user_id.get()
+        key = (name, db.bind, await cache_generations(user_id), args, tuple(sorted(kwargs.items())))
+        task = _in_flight.get(key)
+        if _holding_slot.get() and (task is None or key not in _running):
+            # Llamada anidada: esperar a una tarea que aún no tiene hueco podría bloquearse
+            # con el hueco que ocupa el propio llamante, así que se ejecuta aquí mismo
+            return await func(db, *args, **kwargs)
+        if task is None:
+            task = asyncio.create_task(_run(key, func, db.bind, user_id, args, kwargs))
+            _in_flight[key] = task
+            task.add_done_callback(lambda done: _in_flight.pop(key, None) if _in_flight.get(key) is done else None)
+        # shield: si se cancela una petición, las demás siguen esperando el mismo resultado
+        return await asyncio.shield(task)
+
+    return wrapper
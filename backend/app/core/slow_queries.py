@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+
+from app.core.config import (
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_SERVICES,
+    SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS,
+    SLOW_QUERY_LOG_PATH,
+    SLOW_QUERY_LOG_MAX_BYTES,
+    SLOW_QUERY_LOG_BACKUPS,
+)
+
+# Parámetros que identifican al usuario: se guardan como "[redactado]"
+REDACTED_PARAMS = {"user_id", "account_id", "account_ids", "email", "username", "password_hash", "description", "token"}
+REDACTED = "[redactado]"
+
+# EXPLAIN ANALYZE ejecuta la sentencia: solo se analizan las de lectura
+READ_STATEMENT = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+_store = logging.getLogger("app.slow_queries")
+# Tareas de EXPLAIN en curso (referencia para que no las recoja el GC) y último EXPLAIN por sentencia
+_pending = set()
+_explained_at = {}
+# Un EXPLAIN ANALYZE a la vez: repite la consulta lenta y no debe sumar carga en un pico
+_explain_slot = asyncio.Semaphore(1)
+
+def _watched(service: str) -> bool:
+    return not SLOW_QUERY_SERVICES or service.split(".", 1)[0] in SLOW_QUERY_SERVICES
+
+def _redacted_parameters(context):
+    if context.compiled is None or not context.compiled_parameters:
+        return None
+    # Las consultas del ORM numeran los parámetros (user_id_1)
+    return {
+        name: REDACTED if re.sub(r"_\d+$", "", name) in REDACTED_PARAMS else value
+        for name, value in context.compiled_parameters[0].items()
+    }
+
+def capture_slow_queries(engine):
+    """
+    Registra las sentencias del motor que superan SLOW_QUERY_THRESHOLD_MS en las funciones de
+    SLOW_QUERY_SERVICES, con sus parámetros redactados y un EXPLAIN (ANALYZE, BUFFERS) que se
+    obtiene en segundo plano. Usa el inicio y la función de servicio que anota instrument_engine,
+    que debe estar registrado antes en el mismo motor.
+    """
+    if SLOW_QUERY_THRESHOLD_MS <= 0:
+        return
+    _configure_store()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        start, service = context._metrics_timing
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms < SLOW_QUERY_THRESHOLD_MS or executemany or not _watched(service):
+            return
+        entry = {
+            "captured_at": datetime.now(timezone.utc).isoformat(),
+            "service": service,
+            "duration_ms": round(duration_ms, 3),
+            "fingerprint": hashlib.blake2b(statement.encode(), digest_size=8).hexdigest(),
+            "statement": statement,
+            "parameters": _redacted_parameters(context),
+            "plan": None,
+            "plan_error": None,
+        }
+        # El evento corre en el greenlet de la sesión, dentro del bucle de eventos
+        task = asyncio.get_running_loop().create_task(
+            _explain_and_store(engine, entry, statement, tuple(parameters or ()))
+        )
+        _pending.add(task)
+        task.add_done_callback(_pending.discard)
+
+async def _explain_and_store(engine, entry: dict, statement: str, parameters: tuple):
+    fingerprint = entry["fingerprint"]
+    last = _explained_at.get(fingerprint)
+    if not READ_STATEMENT.match(statement):
+        entry["plan_error"] = "Solo se analizan sentencias de lectura"
+    elif last is not None and time.monotonic() - last < SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS:
+        entry["plan_error"] = "Plan ya capturado recientemente (ver entradas anteriores con el mismo fingerprint)"
+    else:
+        _explained_at[fingerprint] = time.monotonic()
+        try:
+            async with _explain_slot:
+                entry["plan"] = await _explain(engine, statement, parameters)
+        except Exception as e:
+            entry["plan_error"] = f"{type(e).__name__}: {e}"
+    _store.info(json.dumps(entry, default=str))
+
+async def _explain(engine, statement: str, parameters: tuple):
+    """
+    EXPLAIN (ANALYZE, BUFFERS) con los mismos parámetros que la ejecución lenta, en una
+    transacción de solo lectura y directamente sobre asyncpg (sin pasar por los eventos
+    del motor, para que el propio EXPLAIN no se mida ni se capture).
+    """
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        async with driver.transaction(readonly=True):
+            plan = await driver.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", *parameters)
+    # El dialecto de SQLAlchemy registra el códec json en la conexión; sin él llega como texto
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+def _configure_store():
+    # Un JSON por línea; al llegar a SLOW_QUERY_LOG_MAX_BYTES se rota y se guardan SLOW_QUERY_LOG_BACKUPS ficheros
+    if _store.handlers:
+        return
+    os.makedirs(os.path.dirname(SLOW_QUERY_LOG_PATH) or ".", exist_ok=True)
+    handler = RotatingFileHandler(
+        SLOW_QUERY_LOG_PATH,
+        maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+        backupCount=SLOW_QUERY_LOG_BACKUPS,
+        encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _store.addHandler(handler)
+    _store.setLevel(logging.INFO)
+    _store.propagate = False
+
+def read_slow_queries(limit: int, service: str | None = None) -> list[dict]:
+    """
+    Entradas guardadas, de la más reciente a la más antigua (fichero actual y rotados),
+    opcionalmente solo las de un servicio ("assets_service" o "assets_service.get_assets").
+    """
+    paths = [SLOW_QUERY_LOG_PATH] + [f"{SLOW_QUERY_LOG_PATH}.{i}" for i in range(1, SLOW_QUERY_LOG_BACKUPS + 1)]
+    entries = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+        for line in reversed(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Línea cortada por una rotación o una escritura a medias
+                continue
+            if service and entry["service"] != service and entry["service"].split(".", 1)[0] != service:
+                continue
+            entries.append(entry)
+            if len(entries) >= limit:
+                return entries
+    return entries
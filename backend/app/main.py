@@ -1,10 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.api.v1.router import api_router
+from app.core.database import engine, replica_engine, pool_metrics
+from app.core.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from app.core.slow_queries import capture_slow_queries
+from app.core.response_cache import ResponseCacheMiddleware, listen_for_invalidations
 from fastapi.middleware.cors import CORSMiddleware
 
+instrument_engine(engine)
+capture_slow_queries(engine)
+if replica_engine is not engine:
+    instrument_engine(replica_engine)
+    capture_slow_queries(replica_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Avisos de precios nuevos y de escrituras en otros workers para invalidar la caché de respuestas
+    listener = asyncio.create_task(listen_for_invalidations(engine))
+    yield
+    listener.cancel()
+
 app = FastAPI(
     title="Fintech Tracker API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(api_router, prefix="/api/v1")
@@ -13,10 +34,24 @@ app.include_router(api_router, prefix="/api/v1")
 def root():
     return {"status": "API running"}
 
+@app.get("/metrics/db-pool")
+def db_pool_metrics():
+    """Uso del pool de conexiones de este proceso (checkouts, tiempo retenidas, pico)."""
+    return pool_metrics()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Latencias por ruta y por función de servicio (SQL) y estado de los pools, para Prometheus."""
+    return PlainTextResponse(render_metrics(pool_metrics()), media_type="text/plain; version=0.0.4")
+
+app.add_middleware(ResponseCacheMiddleware, engine=engine)
+# Por fuera de la caché: mide también las respuestas servidas desde ella
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-)
\ No newline at end of file
+)
@@ -5,6 +5,13 @@ from .asset import Asset
 from .operation import Operation
 from .price_history import PriceHistory
 from .rebalance import RebalanceSetting
+from .performance_cache import PerformanceCache
+from .holding import Holding
+from .tax_lot import TaxLot
+from .lot_realization import LotRealization
+from .cash_balance import CashBalance
+from .fx_rate import FxRate
+from .transaction_monthly_rollup import TransactionMonthlyRollup
 
 __all__ = [
     "User",
@@ -13,5 +20,12 @@ __all__ = [
     "Asset",
     "Operation",
     "PriceHistory",
-    "RebalanceSetting"
+    "RebalanceSetting",
+    "PerformanceCache",
+    "Holding",
+    "TaxLot",
+    "LotRealization",
+    "CashBalance",
+    "FxRate",
+    "TransactionMonthlyRollup"
 ]
\ No newline at end of file
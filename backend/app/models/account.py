@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, BigInteger, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -17,4 +17,9 @@ class Account(Base):
     # Relationships
     user = relationship("User", back_populates="accounts")
     transactions = relationship("Transaction", back_populates="account", cascade="all, delete-orphan")
-    operations = relationship("Operation", back_populates="account", cascade="all, delete-orphan")
\ No newline at end of file
+    operations = relationship("Operation", back_populates="account", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Cuentas de un usuario sin leer la tabla (migración 0002)
+        Index("idx_accounts_user", "user_id", postgresql_include=["account_id", "currency", "is_active"]),
+    )
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey, Numeric
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class CashBalance(Base):
+    __tablename__ = "cash_balances"
+
+    account_id = Column(BigInteger, ForeignKey("accounts.account_id"), primary_key=True)
+    balance = Column(Numeric(20, 6), nullable=False, default=0)
+    transaction_count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    account = relationship("Account")
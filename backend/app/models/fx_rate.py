@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, Date, Numeric
+from app.core.database import Base
+
+class FxRate(Base):
+    __tablename__ = "fx_rates"
+
+    currency = Column(String(3), primary_key=True)
+    date = Column(Date, primary_key=True)
+    # Valor en BASE_CURRENCY de una unidad de `currency`
+    rate = Column(Numeric(20, 10), nullable=False)
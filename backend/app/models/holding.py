@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey, Numeric
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class Holding(Base):
+    __tablename__ = "holdings"
+
+    account_id = Column(BigInteger, ForeignKey("accounts.account_id"), primary_key=True)
+    asset_id = Column(BigInteger, ForeignKey("assets.asset_id"), primary_key=True)
+    quantity = Column(Numeric(20, 6), nullable=False, default=0)
+    cost_basis = Column(Numeric(20, 6), nullable=False, default=0)
+    realized_gain = Column(Numeric(20, 6), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    account = relationship("Account")
+    asset = relationship("Asset")
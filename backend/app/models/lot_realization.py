@@ -0,0 +1,25 @@
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey, Numeric, Index
+from app.core.database import Base
+
+class LotRealization(Base):
+    __tablename__ = "lot_realizations"
+
+    realization_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    sell_operation_id = Column(BigInteger, ForeignKey("operations.operation_id"), nullable=False)
+    # NULL si la venta supera la cantidad abierta (sin lote que la cubra)
+    lot_operation_id = Column(BigInteger, ForeignKey("tax_lots.operation_id"))
+    account_id = Column(BigInteger, ForeignKey("accounts.account_id"), nullable=False)
+    asset_id = Column(BigInteger, ForeignKey("assets.asset_id"), nullable=False)
+    date = Column(DateTime(timezone=True), nullable=False)
+    quantity = Column(Numeric(15, 6), nullable=False)
+    proceeds = Column(Numeric(20, 6), nullable=False)
+    cost = Column(Numeric(20, 6), nullable=False)
+    realized_gain = Column(Numeric(20, 6), nullable=False)
+
+
+    __table_args__ = (
+        Index("idx_lot_realizations_sell", "sell_operation_id"),
+        # Borrado por posición al rehacerla y comprobación de fk_realization_lot al borrar lotes (migración 0007)
+        Index("idx_lot_realizations_position", "account_id", "asset_id"),
+        Index("idx_lot_realizations_lot", "lot_operation_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, DateTime, ForeignKey, Numeric, CheckConstraint
+from sqlalchemy import Column, BigInteger, String, DateTime, ForeignKey, Numeric, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -20,4 +20,10 @@ class Operation(Base):
     
     __table_args__ = (
         CheckConstraint("operation_type IN ('buy', 'sell')", name="chk_operation_type"),
+        # Posiciones por activo y fecha de las cuentas sin leer la tabla (migración 0004)
+        Index(
+            "idx_operations_account_asset_date",
+            "account_id", "asset_id", "date",
+            postgresql_include=["operation_type", "quantity"]
+        ),
     )
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, Date, DateTime, ForeignKey, Numeric
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class PerformanceCache(Base):
+    __tablename__ = "performance_cache"
+
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), primary_key=True)
+    as_of = Column(Date, nullable=False)
+    current_val = Column(Numeric(20, 6), nullable=False, default=0)
+    current_cap = Column(Numeric(20, 6), nullable=False, default=0)
+    val_1m = Column(Numeric(20, 6), nullable=False, default=0)
+    val_3m = Column(Numeric(20, 6), nullable=False, default=0)
+    val_ytd = Column(Numeric(20, 6), nullable=False, default=0)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey, Numeric, Index, text
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class TaxLot(Base):
+    __tablename__ = "tax_lots"
+
+    # Cada compra abre un lote: el identificador del lote es la operación de compra
+    operation_id = Column(BigInteger, ForeignKey("operations.operation_id"), primary_key=True)
+    account_id = Column(BigInteger, ForeignKey("accounts.account_id"), nullable=False)
+    asset_id = Column(BigInteger, ForeignKey("assets.asset_id"), nullable=False)
+    open_date = Column(DateTime(timezone=True), nullable=False)
+    quantity = Column(Numeric(15, 6), nullable=False)
+    cost_basis = Column(Numeric(20, 6), nullable=False)
+    remaining_quantity = Column(Numeric(15, 6), nullable=False)
+    remaining_cost = Column(Numeric(20, 6), nullable=False)
+
+    # Relationships
+    operation = relationship("Operation")
+
+    __table_args__ = (
+        Index(
+            "idx_tax_lots_open",
+            "account_id", "asset_id", "open_date", "operation_id",
+            postgresql_where=text("remaining_quantity > 0")
+        ),
+        # Borrado de los lotes de una posición al rehacerla (migración 0007)
+        Index("idx_tax_lots_position", "account_id", "asset_id"),
+    )
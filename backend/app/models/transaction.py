@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Text, Boolean, DateTime, ForeignKey, Numeric, CheckConstraint
+from sqlalchemy import Column, BigInteger, String, Text, Boolean, DateTime, ForeignKey, Numeric, CheckConstraint, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -21,4 +21,11 @@ class Transaction(Base):
     
     __table_args__ = (
         CheckConstraint("type IN ('income', 'expense')", name="chk_transaction_type"),
+        # Flujos de caja de las transacciones activas sin leer la tabla (migración 0003)
+        Index(
+            "idx_transactions_active_account_date",
+            "account_id", "date",
+            postgresql_include=["type", "category", "amount"],
+            postgresql_where=text("is_active = TRUE")
+        ),
     )
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, String, Date, DateTime, ForeignKey, Numeric
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class TransactionMonthlyRollup(Base):
+    __tablename__ = "transaction_monthly_rollup"
+
+    account_id = Column(BigInteger, ForeignKey("accounts.account_id"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    category = Column(String(100), primary_key=True)
+    type = Column(String(10), primary_key=True)
+    total = Column(Numeric(20, 6), nullable=False, default=0)
+    transaction_count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    account = relationship("Account")
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+from datetime import datetime
+
+class SlowQuery(BaseModel):
+    captured_at: datetime
+    service: str
+    duration_ms: float
+    fingerprint: str
+    statement: str
+    parameters: Optional[dict[str, Any]] = None
+    plan: Optional[list[Any]] = None
+    plan_error: Optional[str] = None
@@ -5,6 +5,7 @@ class AccountWithBalance(BaseModel):
     account_id: int
     name: str
     type: str
+    # Divisa de los importes (BASE_CURRENCY: se convierten con el último tipo de cambio)
     currency: str
     cash_balance: float
     invested_value: float
@@ -17,6 +18,22 @@ class AssetAllocation(BaseModel):
     asset_count: int
 
 
+class AllocationBreakdown(BaseModel):
+    asset: list[AssetAllocation]
+    theme: list[AssetAllocation]
+    type: list[AssetAllocation]
+
+
+class AccountAllocationBreakdown(AllocationBreakdown):
+    account_id: int
+    name: str
+
+
+class AllocationOverview(BaseModel):
+    portfolio: AllocationBreakdown
+    accounts: list[AccountAllocationBreakdown]
+
+
 class AssetTableRow(BaseModel):
     account_id: int
     account_name: str
@@ -31,6 +48,21 @@ class AssetTableRow(BaseModel):
     total_value: float
     invested_value: float
     performance: float
+    unrealized_gain: float = 0
+    realized_gain: float = 0
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class PositionGains(BaseModel):
+    account_id: int
+    account_name: str
+    asset_id: int
+    name: str
+    ticker: Optional[str] = None
+    quantity: float
+    cost_basis: float
+    market_value: float
+    unrealized_gain: float
+    realized_gain: float
\ No newline at end of file
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+from app.schemas.allocation import AccountWithBalance, AssetTableRow, AllocationOverview
+from app.schemas.performance import PerformanceResponse
+from app.schemas.history_chart import PortfolioPoint
+
+class DashboardResponse(BaseModel):
+    accounts: List[AccountWithBalance]
+    assets: List[AssetTableRow]
+    allocation: AllocationOverview
+    performance: PerformanceResponse
+    growth: List[PortfolioPoint]
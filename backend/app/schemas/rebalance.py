@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List
+from typing import List, Literal, Optional
+from datetime import date
 
 class RebalanceSettingRead(BaseModel):
     rebalance_id: int
@@ -21,8 +22,46 @@ class RebalanceBulkUpdate(BaseModel):
     @field_validator('settings')
     @classmethod
     def validate_total_percentage(cls, v):
+        asset_ids = [item.asset_id for item in v]
+        if len(asset_ids) != len(set(asset_ids)):
+            raise ValueError('Cada activo solo puede aparecer una vez')
         total = sum(item.target_percentage for item in v)
         # Pequeña tolerancia para evitar problemas de redondeo
         if not (99.99 <= total <= 100.01):
             raise ValueError('La suma de los porcentajes debe ser exactamente 100%')
-        return v
\ No newline at end of file
+        return v
+
+class RebalancePlanAsset(BaseModel):
+    asset_id: int
+    asset_name: str | None = None
+    ticker: str | None = None
+    price: Optional[float] = None
+    quantity: float
+    current_value: float
+    current_weight: float
+    target_weight: float
+    action: Literal["buy", "sell", "hold"]
+    trade_quantity: float
+    trade_value: float
+    post_trade_weight: float
+
+class RebalancePlan(BaseModel):
+    total_value: float
+    cash_available: float
+    cash_used: float
+    cash_remaining: float
+    assets: List[RebalancePlanAsset]
+
+class RebalanceBacktestPoint(BaseModel):
+    date: date
+    capital_invertido: float
+    total_value: float
+    simulated_value: float
+
+class RebalanceBacktest(BaseModel):
+    strategy: Literal["monthly", "quarterly", "threshold"]
+    rebalance_count: int
+    final_value: float
+    real_final_value: float
+    capital_invertido: float
+    history: List[RebalanceBacktestPoint]
@@ -1,8 +1,9 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 class TradeHistoryResponse(BaseModel):
+    operation_id: Optional[int] = None
     ticker: Optional[str] = None
     isin: Optional[str] = None
     asset_name: str
@@ -15,4 +16,14 @@ class TradeHistoryResponse(BaseModel):
     account_name: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TradeHistoryPage(BaseModel):
+    items: List[TradeHistoryResponse]
+    next_cursor: Optional[str] = None
+
+
+class TradeImportResult(BaseModel):
+    operations_imported: int
+    transactions_created: int
+    positions_updated: int
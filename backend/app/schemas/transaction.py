@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
-from datetime import datetime
-from typing import Optional, Literal
+from datetime import datetime, date
+from typing import Optional, Literal, List
 
 class TransactionBase(BaseModel):
     account_id: int
@@ -18,4 +18,37 @@ class TransactionResponse(TransactionBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TransactionPage(BaseModel):
+    items: List[TransactionResponse]
+    next_cursor: Optional[str] = None
+
+class TransactionSummaryRow(BaseModel):
+    month: date
+    category: str
+    type: Literal["income", "expense"]
+    total: float
+    transaction_count: int
+
+class MonthlyTrendPoint(BaseModel):
+    month: date
+    income: float
+    expense: float
+    net: float
+    income_change_pct: Optional[float] = None
+    expense_change_pct: Optional[float] = None
+
+class CategoryTrendSeries(BaseModel):
+    category: str
+    totals: List[float]
+    total: float
+
+class CategoryTrendResponse(BaseModel):
+    months: List[date]
+    categories: List[CategoryTrendSeries]
+
+class StatementImportResult(BaseModel):
+    rows_read: int
+    imported: int
+    duplicates: int
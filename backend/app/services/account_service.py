@@ -4,6 +4,7 @@ from datetime import date
 from sqlalchemy import select
 from app.models import Account
 from app.schemas.account import AccountCreate
+from app.services.fx_service import get_fx_matrix, to_base_currency
 
 async def create_account(db: AsyncSession, account_data: AccountCreate, user_id: int) -> Account:
     # Verificar si ya existe para este usuario
@@ -42,109 +43,75 @@ async def get_accounts_with_balance(db, user_id: int):
     """
     Devuelve una lista de cuentas con su saldo efectivo, valor de inversiones y patrimonio total.
     Se seleccionan las cuentas del usuario especificado y se ordenan por tipo de cuenta y patrimonio total de manera descendente.
-    La consulta utiliza dos CTEs: transaccion y inversiones. 
-    La primera suma el valor de todas las transacciones de ingresos y egresos de cada cuenta.
-    La segunda suma el valor de todas las operaciones de inversiones de cada cuenta (teniendo en cuenta el ultimo precio histórico).
+    Los importes se expresan en BASE_CURRENCY.
     """
-    query = text("""
-        -- Cash
-        WITH transacciones AS (
-            SELECT 
-                account_id,
-                SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) AS saldo
-            FROM transactions
-            WHERE is_active = TRUE
-            GROUP BY account_id
-        ),
-        inversiones AS (
-            SELECT 
-                o.account_id,
-                SUM(
-                    CASE 
-                        WHEN o.operation_type = 'buy' THEN o.quantity 
-                        ELSE -o.quantity 
-                    END * ph.price
-                ) AS valor
-            FROM operations o
-            LEFT JOIN price_history ph ON ph.asset_id = o.asset_id
-            WHERE ph.date = (
-                SELECT MAX(date) 
-                FROM price_history 
-                WHERE asset_id = o.asset_id
-            )
-            GROUP BY o.account_id
-        )
-        SELECT 
-            a.account_id,
-            a.name,
-            a.type,
-            a.currency,
-            COALESCE(t.saldo, 0) AS cash_balance,
-            COALESCE(i.valor, 0) AS invested_value,
-            COALESCE(t.saldo, 0) + COALESCE(i.valor, 0) AS total_value
-        FROM accounts a
-        LEFT JOIN transacciones t ON t.account_id = a.account_id
-        LEFT JOIN inversiones i ON i.account_id = a.account_id
-        WHERE a.user_id = :user_id
-          AND a.is_active = TRUE
-        ORDER BY a.type, total_value DESC
-    """)
-    
-    result = await db.execute(query, {"user_id": user_id})
-    return result.mappings().all()
+    return await _accounts_with_balance(db, user_id)
 
 async def get_selected_account_with_balance(db, user_id: int, account_id: int):
     """
-    Devuelve una lista de cuentas con su saldo efectivo, valor de inversiones y patrimonio total.
-    Se seleccionan las cuentas del usuario especificado y se ordenan por tipo de cuenta y patrimonio total de manera descendente.
-    La consulta utiliza dos CTEs: transaccion y inversiones. 
-    La primera suma el valor de todas las transacciones de ingresos y egresos de cada cuenta.
-    La segunda suma el valor de todas las operaciones de inversiones de cada cuenta (teniendo en cuenta el ultimo precio histórico).
+    Igual que get_accounts_with_balance pero solo para la cuenta indicada del usuario.
+    """
+    return await _accounts_with_balance(db, user_id, account_id)
+
+async def _accounts_with_balance(db, user_id: int, account_id: int | None = None):
     """
-    query = text("""
-        -- Cash
-        WITH transacciones AS (
-            SELECT 
-                account_id,
-                SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) AS saldo
-            FROM transactions
-            WHERE is_active = TRUE
-            GROUP BY account_id
-        ),
-        inversiones AS (
-            SELECT 
-                o.account_id,
-                SUM(
-                    CASE 
-                        WHEN o.operation_type = 'buy' THEN o.quantity 
-                        ELSE -o.quantity 
-                    END * ph.price
-                ) AS valor
-            FROM operations o
-            LEFT JOIN price_history ph ON ph.asset_id = o.asset_id
-            WHERE ph.date = (
-                SELECT MAX(date) 
-                FROM price_history 
-                WHERE asset_id = o.asset_id
-            )
-            GROUP BY o.account_id
-        )
+    El efectivo se lee de cash_balances (saldo por cuenta mantenido al insertar transacciones, en la divisa de la cuenta)
+    y las inversiones se valoran con la tabla holdings y el último precio histórico, agrupadas por divisa del activo.
+    La conversión a BASE_CURRENCY se hace en memoria con la matriz de tipos de cambio.
+    Solo se tocan filas de las cuentas del usuario.
+    """
+    account_filter = "AND a.account_id = :account_id" if account_id is not None else ""
+    params = {"user_id": user_id, "account_id": account_id}
+
+    accounts_query = text(f"""
         SELECT 
             a.account_id,
             a.name,
             a.type,
             a.currency,
-            COALESCE(t.saldo, 0) AS cash_balance,
-            COALESCE(i.valor, 0) AS invested_value,
-            COALESCE(t.saldo, 0) + COALESCE(i.valor, 0) AS total_value
+            COALESCE(cb.balance, 0) AS cash_balance
         FROM accounts a
-        LEFT JOIN transacciones t ON t.account_id = a.account_id
-        LEFT JOIN inversiones i ON i.account_id = a.account_id
+        -- Cash: saldo mantenido en cash_balances al insertar cada transacción
+        LEFT JOIN cash_balances cb ON cb.account_id = a.account_id
         WHERE a.user_id = :user_id
           AND a.is_active = TRUE
-          AND a.account_id = :account_id
-        ORDER BY a.type, total_value DESC
+          {account_filter}
     """)
-    
-    result = await db.execute(query, {"user_id": user_id, "account_id": account_id})
-    return result.mappings().all()
\ No newline at end of file
+    investments_query = text(f"""
+        SELECT 
+            h.account_id,
+            ast.currency,
+            SUM(h.quantity * lp.price) AS valor
+        FROM holdings h
+        JOIN accounts a ON a.account_id = h.account_id
+        JOIN assets ast ON ast.asset_id = h.asset_id
+        JOIN LATERAL (
+            SELECT price
+            FROM price_history
+            WHERE asset_id = h.asset_id
+            ORDER BY date DESC
+            LIMIT 1
+        ) lp ON TRUE
+        WHERE a.user_id = :user_id
+          AND h.quantity <> 0
+          {account_filter}
+        GROUP BY h.account_id, ast.currency
+    """)
+    accounts = (await db.execute(accounts_query, params)).mappings().all()
+    investments = (await db.execute(investments_query, params)).mappings().all()
+
+    fx = await get_fx_matrix(db)
+    invested = {}
+    for row in to_base_currency(fx, investments, ["valor"]):
+        invested[row["account_id"]] = invested.get(row["account_id"], 0.0) + row["valor"]
+
+    result = [
+        {
+            **account,
+            "invested_value": invested.get(account["account_id"], 0.0),
+            "total_value": account["cash_balance"] + invested.get(account["account_id"], 0.0),
+        }
+        for account in to_base_currency(fx, accounts, ["cash_balance"])
+    ]
+    result.sort(key=lambda account: (account["type"], -account["total_value"]))
+    return result
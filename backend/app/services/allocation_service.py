@@ -0,0 +1,159 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.fx_service import get_fx_matrix
+
+# Agrupaciones permitidas -> columna de valued_positions
+GROUP_COLUMNS = {
+    "asset": "name",
+    "theme": "theme",
+    "type": "type",
+}
+
+def _allocation_query(group_bys: list[str], portfolio: bool, per_account: bool, account_filter: bool = False):
+    """
+    Construye la consulta de asignación: un único escaneo de las posiciones valoradas
+    agrupado con GROUPING SETS. Cada fila indica su agrupación (`group_by`) y si es
+    de una cuenta concreta (`account_id`) o del total del usuario (`account_id` NULL).
+    Las columnas y los conjuntos salen siempre de GROUP_COLUMNS, nunca de la petición.
+    Los valores se pasan a BASE_CURRENCY con los últimos tipos de la matriz en memoria,
+    que llegan como dos arrays (:fx_currencies, :fx_rates) de una fila por divisa.
+    """
+    columns = {group_by: GROUP_COLUMNS[group_by] for group_by in group_bys}
+    grouping_sets = []
+    if portfolio:
+        grouping_sets += [f"({column})" for column in columns.values()]
+    if per_account:
+        grouping_sets += [f"(account_id, {column})" for column in columns.values()]
+
+    # GROUPING() solo admite columnas que aparecen en algún conjunto
+    group_key = "CASE " + " ".join(
+        f"WHEN GROUPING({column}) = 0 THEN {column}" for column in columns.values()
+    ) + " END"
+    group_by = "CASE " + " ".join(
+        f"WHEN GROUPING({column}) = 0 THEN '{name}'" for name, column in columns.items()
+    ) + " END"
+    account_id = "CASE WHEN GROUPING(account_id) = 0 THEN account_id END" if per_account else "NULL::bigint"
+
+    return text(f"""
+        WITH positions AS (
+            SELECT
+                h.account_id,
+                ac.name AS account_name,
+                h.asset_id,
+                h.quantity AS net_quantity
+            FROM holdings h
+            JOIN accounts ac ON ac.account_id = h.account_id
+            WHERE ac.user_id = :user_id
+                {"AND h.account_id = :account_id" if account_filter else ""}
+                AND h.quantity > 0
+        ),
+        valued_positions AS (
+            SELECT
+                p.account_id,
+                p.account_name,
+                a.asset_id,
+                a.name,
+                COALESCE(a.theme, 'Unclassified') AS theme,
+                a.type,
+                p.net_quantity * lp.price * COALESCE(fx.rate, 1) AS value
+            FROM positions p
+            JOIN assets a ON a.asset_id = p.asset_id
+            LEFT JOIN unnest(CAST(:fx_currencies AS varchar[]), CAST(:fx_rates AS numeric[])) AS fx(currency, rate)
+                ON fx.currency = a.currency
+            JOIN LATERAL (
+                SELECT price
+                FROM price_history
+                WHERE asset_id = p.asset_id
+                ORDER BY date DESC
+                LIMIT 1
+            ) lp ON TRUE
+        ),
+        grouped AS (
+            SELECT
+                {account_id} AS account_id,
+                MAX(account_name) AS account_name,
+                {group_by} AS group_by,
+                {group_key} AS group_key,
+                SUM(value) AS total_value,
+                COUNT(DISTINCT asset_id) AS asset_count
+            FROM valued_positions
+            GROUP BY GROUPING SETS ({", ".join(grouping_sets)})
+        )
+        SELECT
+            account_id,
+            account_name,
+            group_by,
+            group_key,
+            total_value,
+            total_value / SUM(total_value) OVER (PARTITION BY account_id, group_by) AS allocation_pct,
+            asset_count
+        FROM grouped
+        ORDER BY account_id NULLS FIRST, group_by, total_value DESC;
+    """)
+
+def _allocation_row(row):
+    return {
+        "group_key": row.group_key,
+        "total_value": row.total_value,
+        "allocation_pct": row.allocation_pct,
+        "asset_count": row.asset_count,
+    }
+
+def _normalize_group_by(group_by: str) -> str:
+    # GROUP_BY ::= asset | theme | type (cualquier otro valor se trata como asset)
+    return group_by if group_by in GROUP_COLUMNS else "asset"
+
+async def get_asset_allocation(db: AsyncSession, account_id: int, user_id: int, group_by: str):
+    """
+    Devuelve la asignación de activos de una cuenta del usuario agrupada por:
+    - asset (detalle)
+    - theme
+    - type
+
+    Incluye porcentaje sobre el total de la cuenta.
+    """
+    group_by = _normalize_group_by(group_by)
+    query = _allocation_query([group_by], portfolio=False, per_account=True, account_filter=True)
+    fx = await get_fx_matrix(db)
+    result = await db.execute(query, {"user_id": user_id, "account_id": account_id, **fx.latest_params()})
+    return [_allocation_row(row) for row in result.all()]
+
+async def get_global_asset_allocation(db: AsyncSession, user_id: int, group_by: str):
+    """
+    Devuelve la asignación de activos global (todas las cuentas) agrupada por:
+    - asset (detalle)
+    - theme
+    - type
+
+    Incluye porcentaje sobre el total.
+    """
+    group_by = _normalize_group_by(group_by)
+    query = _allocation_query([group_by], portfolio=True, per_account=False)
+    fx = await get_fx_matrix(db)
+    result = await db.execute(query, {"user_id": user_id, **fx.latest_params()})
+    return [_allocation_row(row) for row in result.all()]
+
+async def get_allocation_overview(db: AsyncSession, user_id: int):
+    """
+    Devuelve en una sola consulta las tres agrupaciones (asset, theme, type),
+    tanto del total del usuario como de cada una de sus cuentas.
+    """
+    group_bys = list(GROUP_COLUMNS)
+    query = _allocation_query(group_bys, portfolio=True, per_account=True)
+    fx = await get_fx_matrix(db)
+    result = await db.execute(query, {"user_id": user_id, **fx.latest_params()})
+
+    portfolio = {group_by: [] for group_by in group_bys}
+    accounts = {}
+    for row in result.all():
+        if row.account_id is None:
+            target = portfolio
+        else:
+            target = accounts.setdefault(row.account_id, {
+                "account_id": row.account_id,
+                "name": row.account_name,
+                **{group_by: [] for group_by in group_bys}
+            })
+        target[row.group_by].append(_allocation_row(row))
+
+    return {"portfolio": portfolio, "accounts": list(accounts.values())}
@@ -1,8 +1,9 @@
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.models import Asset, Operation, Account
+from app.models import Asset, Holding, Account
 from app.schemas.asset import AssetCreate
+from app.services.fx_service import get_fx_matrix, to_base_currency
 
 async def create_asset(db: AsyncSession, asset_data: AssetCreate) -> Asset:
     # Verificar si ya existe
@@ -24,11 +25,11 @@ async def create_asset(db: AsyncSession, asset_data: AssetCreate) -> Asset:
     return db_asset
 
 async def get_user_assets(db: AsyncSession, user_id: int):
-    # Buscamos activos que tengan operaciones en cuentas del usuario
+    # Buscamos activos que tengan posición (holdings) en cuentas del usuario
     stmt = (
         select(Asset)
-        .join(Operation, Asset.asset_id == Operation.asset_id)
-        .join(Account, Operation.account_id == Account.account_id)
+        .join(Holding, Asset.asset_id == Holding.asset_id)
+        .join(Account, Holding.account_id == Account.account_id)
         .where(Account.user_id == user_id)
         .distinct()
     )
@@ -36,201 +37,23 @@ async def get_user_assets(db: AsyncSession, user_id: int):
     result = await db.execute(stmt)
     return result.scalars().all()
 
-async def get_asset_allocation(db, account_id: int, user_id: int, group_by: str):
-    """
-    Devuelve la asignación de activos agrupada por:
-    - asset (detalle)
-    - theme
-    - type
-
-    Incluye porcentaje sobre el total.
-    """
-    if group_by != 'asset' and group_by != 'theme' and group_by != 'type':
-        group_by = 'asset'
-    query = text("""
-        WITH positions AS (
-            SELECT
-                o.asset_id,
-                SUM(
-                    CASE
-                        WHEN o.operation_type = 'buy' THEN o.quantity
-                        ELSE -o.quantity
-                    END
-                ) AS net_quantity
-            FROM operations o
-            JOIN accounts ac ON ac.account_id = o.account_id
-            WHERE o.account_id = :account_id
-                AND ac.user_id = :user_id
-            GROUP BY o.asset_id
-            HAVING SUM(
-                CASE
-                    WHEN o.operation_type = 'buy' THEN o.quantity
-                    ELSE -o.quantity
-                END
-            ) > 0
-        ),
-        latest_prices AS (
-            SELECT DISTINCT ON (asset_id)
-                asset_id,
-                price
-            FROM price_history
-            ORDER BY asset_id, date DESC
-        ),
-        valued_positions AS (
-            SELECT
-                a.asset_id,
-                a.name,
-                COALESCE(a.theme, 'Unclassified') AS theme,
-                a.type,
-                p.net_quantity * lp.price AS value
-            FROM positions p
-            JOIN assets a ON a.asset_id = p.asset_id
-            JOIN latest_prices lp ON lp.asset_id = p.asset_id
-        )
-        SELECT
-            CASE
-                WHEN :group_by = 'theme' THEN theme
-                WHEN :group_by = 'type'  THEN type
-                ELSE name
-            END AS group_key,
-
-            SUM(value) AS total_value,
-
-            SUM(value)
-            / SUM(SUM(value)) OVER ()
-            AS allocation_pct,
-            COUNT(DISTINCT asset_id) AS asset_count
-        FROM valued_positions
-        GROUP BY group_key
-        ORDER BY total_value DESC;
-    """)
-    result = await db.execute(query, {"account_id": account_id, "user_id": user_id, "group_by": group_by})
-    return result.mappings().all()
-
-async def get_global_asset_allocation(db, user_id: int, group_by: str):
-    """
-    Devuelve la asignación de activos glboal agrupada por:
-    - asset (detalle)
-    - theme
-    - type
-
-    Incluye porcentaje sobre el total.
-    """
-    if group_by != 'asset' and group_by != 'theme' and group_by != 'type':
-        group_by = 'asset'
-    query = text("""
-        WITH positions AS (
-            SELECT
-                o.asset_id,
-                SUM(
-                    CASE
-                        WHEN o.operation_type = 'buy' THEN o.quantity
-                        ELSE -o.quantity
-                    END
-                ) AS net_quantity
-            FROM operations o
-            JOIN accounts ac ON ac.account_id = o.account_id
-            WHERE ac.user_id = :user_id
-            GROUP BY o.asset_id
-            HAVING SUM(
-                CASE
-                    WHEN o.operation_type = 'buy' THEN o.quantity
-                    ELSE -o.quantity
-                END
-            ) > 0
-        ),
-        latest_prices AS (
-            SELECT DISTINCT ON (asset_id)
-                asset_id,
-                price
-            FROM price_history
-            ORDER BY asset_id, date DESC
-        ),
-        valued_positions AS (
-            SELECT
-                a.asset_id,
-                a.name,
-                COALESCE(a.theme, 'Unclassified') AS theme,
-                a.type,
-                p.net_quantity * lp.price AS value
-            FROM positions p
-            JOIN assets a ON a.asset_id = p.asset_id
-            JOIN latest_prices lp ON lp.asset_id = p.asset_id
-        )
-        SELECT
-            CASE
-                WHEN :group_by = 'theme' THEN theme
-                WHEN :group_by = 'type'  THEN type
-                ELSE name
-            END AS group_key,
-
-            SUM(value) AS total_value,
-
-            SUM(value)
-            / SUM(SUM(value)) OVER ()
-            AS allocation_pct,
-            COUNT(DISTINCT asset_id) AS asset_count
-        FROM valued_positions
-        GROUP BY group_key
-        ORDER BY total_value DESC;
-    """)
-
-    if group_by not in {"asset", "theme", "type"}:
-        raise ValueError("group_by must be: asset, theme or type")
-
-    result = await db.execute(
-        query,
-        {"user_id": user_id, "group_by": group_by}
-    )
-    return result.mappings().all()
-
 async def get_all_assets(db, user_id: int):
     """
-    Devuelve todos los activos del usuario con detalles completos
+    Devuelve todos los activos del usuario con detalles completos.
+    Los importes se convierten a BASE_CURRENCY con el último tipo de cambio.
     """
     query = text("""
         WITH positions AS (
             SELECT
-                o.account_id,
-                o.asset_id,
-                SUM(
-                    CASE
-                        WHEN o.operation_type = 'buy' THEN o.quantity
-                        ELSE -o.quantity
-                    END
-                ) AS net_quantity
-            FROM operations o
-            JOIN accounts ac ON ac.account_id = o.account_id
+                h.account_id,
+                h.asset_id,
+                h.quantity AS net_quantity,
+                h.cost_basis AS invested_value,
+                h.realized_gain
+            FROM holdings h
+            JOIN accounts ac ON ac.account_id = h.account_id
             WHERE ac.user_id = :user_id
-            GROUP BY o.account_id, o.asset_id
-            HAVING SUM(
-                CASE
-                    WHEN o.operation_type = 'buy' THEN o.quantity
-                    ELSE -o.quantity
-                END
-            ) > 0
-        ),
-        latest_prices AS (
-            SELECT DISTINCT ON (asset_id)
-                asset_id,
-                price
-            FROM price_history
-            ORDER BY asset_id, date DESC
-        ),
-        asset_performance AS (
-            SELECT
-                o.account_id,
-                o.asset_id,
-                SUM(
-                    CASE
-                        WHEN o.operation_type = 'buy' THEN o.quantity * o.price
-                        ELSE -o.quantity * o.price
-                    END
-                ) AS invested_value
-            FROM operations o
-            JOIN accounts ac ON ac.account_id = o.account_id
-            WHERE ac.user_id = :user_id
-            GROUP BY o.account_id, o.asset_id  -- ¡Importante: agrupa por account y asset!
+                AND h.quantity > 0
         ),
         valued_positions AS (
             SELECT
@@ -241,22 +64,29 @@ async def get_all_assets(db, user_id: int):
                 a.ticker,
                 a.isin,
                 a.type,
+                a.currency,
                 COALESCE(a.theme, 'Unclassified') AS theme,
                 p.net_quantity,
                 lp.price AS current_price,
                 p.net_quantity * lp.price AS total_value,
-                COALESCE(ap.invested_value, 0) AS invested_value,  -- Usa COALESCE para evitar NULL
+                p.invested_value,  -- Coste de los lotes abiertos (tabla holdings)
+                p.realized_gain,
                 CASE 
-                    WHEN COALESCE(ap.invested_value, 0) > 0 
-                    THEN ((p.net_quantity * lp.price - ap.invested_value) / ap.invested_value * 100)
+                    WHEN p.invested_value > 0 
+                    THEN ((p.net_quantity * lp.price - p.invested_value) / p.invested_value * 100)
                     ELSE 0 
                 END AS performance_pct
             FROM positions p
             JOIN accounts ac ON ac.account_id = p.account_id
             JOIN assets a ON a.asset_id = p.asset_id
-            JOIN latest_prices lp ON lp.asset_id = p.asset_id
-            LEFT JOIN asset_performance ap ON ap.account_id = p.account_id AND ap.asset_id = p.asset_id
-            WHERE ac.user_id = :user_id
+            -- Último precio de cada posición por índice (asset_id, date), sin recorrer el histórico
+            JOIN LATERAL (
+                SELECT price
+                FROM price_history
+                WHERE asset_id = p.asset_id
+                ORDER BY date DESC
+                LIMIT 1
+            ) lp ON TRUE
         )
         SELECT
             account_id,
@@ -266,17 +96,23 @@ async def get_all_assets(db, user_id: int):
             ticker,
             isin,
             type,
+            currency,
             theme,
             net_quantity AS quantity,
             current_price,
             total_value,
             invested_value,
-            ROUND(performance_pct, 2) AS performance
+            ROUND(performance_pct, 2) AS performance,
+            total_value - invested_value AS unrealized_gain,
+            realized_gain
         FROM valued_positions
         ORDER BY account_name, total_value DESC;
     """)
     
     result = await db.execute(query, {"user_id": user_id})
     data = result.mappings().all()
-    
-    return data
\ No newline at end of file
+
+    fx = await get_fx_matrix(db)
+    return to_base_currency(
+        fx, data, ["current_price", "total_value", "invested_value", "unrealized_gain", "realized_gain"]
+    )
\ No newline at end of file
@@ -0,0 +1,116 @@
+from decimal import Decimal
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from app.models import CashBalance, Transaction
+
+def signed_amount(transaction_type: str, amount: Decimal) -> Decimal:
+    # income suma, expense resta
+    return amount if transaction_type == 'income' else -amount
+
+async def apply_transaction_to_balance(db: AsyncSession, transaction: Transaction, direction: int = 1):
+    """
+    Suma una transacción nueva al saldo de su cuenta en cash_balances
+    (con direction=-1 la resta, al desactivarla).
+    El incremento se hace en la propia sentencia (upsert), así dos escrituras
+    simultáneas en la misma cuenta no se pisan. No hace commit.
+    """
+    if direction == 1 and transaction.is_active is False:
+        return
+
+    stmt = insert(CashBalance).values(
+        account_id=transaction.account_id,
+        balance=direction * signed_amount(transaction.type, transaction.amount),
+        transaction_count=direction
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['account_id'],
+            set_={
+                "balance": CashBalance.balance + stmt.excluded.balance,
+                "transaction_count": CashBalance.transaction_count + stmt.excluded.transaction_count,
+                "updated_at": text("NOW()"),
+            }
+        )
+    )
+
+async def apply_transactions_to_balances(db: AsyncSession, transaction_ids: list[int]):
+    """
+    Versión por lotes de apply_transaction_to_balance para importaciones:
+    agrupa por cuenta las transacciones recién insertadas y actualiza cash_balances en una sentencia.
+    No hace commit.
+    """
+    if not transaction_ids:
+        return
+    await db.execute(
+        text("""
+            INSERT INTO cash_balances (account_id, balance, transaction_count)
+            SELECT
+                account_id,
+                SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END),
+                COUNT(*)
+            FROM transactions
+            WHERE transaction_id = ANY(:transaction_ids)
+              AND is_active = TRUE
+            GROUP BY account_id
+            ON CONFLICT (account_id) DO UPDATE SET
+                balance = cash_balances.balance + EXCLUDED.balance,
+                transaction_count = cash_balances.transaction_count + EXCLUDED.transaction_count,
+                updated_at = NOW()
+        """),
+        {"transaction_ids": transaction_ids}
+    )
+
+async def reconcile_cash_balances(db: AsyncSession, fix: bool = False):
+    """
+    Compara cash_balances con la suma de la tabla transactions cuenta a cuenta.
+    Devuelve las cuentas que no cuadran; con fix=True además las corrige (sin commit).
+    """
+    query = text("""
+        WITH ledger AS (
+            SELECT
+                account_id,
+                SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) AS balance,
+                COUNT(*) AS transaction_count
+            FROM transactions
+            WHERE is_active = TRUE
+            GROUP BY account_id
+        )
+        SELECT
+            a.account_id,
+            COALESCE(l.balance, 0) AS ledger_balance,
+            COALESCE(l.transaction_count, 0) AS ledger_count,
+            cb.balance AS stored_balance,
+            cb.transaction_count AS stored_count
+        FROM accounts a
+        LEFT JOIN ledger l ON l.account_id = a.account_id
+        LEFT JOIN cash_balances cb ON cb.account_id = a.account_id
+        WHERE COALESCE(cb.balance, 0) <> COALESCE(l.balance, 0)
+           OR COALESCE(cb.transaction_count, 0) <> COALESCE(l.transaction_count, 0)
+        ORDER BY a.account_id
+    """)
+    result = await db.execute(query)
+    mismatches = result.mappings().all()
+
+    if fix and mismatches:
+        stmt = insert(CashBalance)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['account_id'],
+                set_={
+                    "balance": stmt.excluded.balance,
+                    "transaction_count": stmt.excluded.transaction_count,
+                    "updated_at": text("NOW()"),
+                }
+            ),
+            [
+                {
+                    "account_id": row["account_id"],
+                    "balance": row["ledger_balance"],
+                    "transaction_count": row["ledger_count"],
+                }
+                for row in mismatches
+            ]
+        )
+
+    return mismatches
@@ -0,0 +1,203 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.allocation_service import GROUP_COLUMNS
+from app.services.history_chart_service import get_portfolio_growth
+from app.services.performance_service import (
+    build_performance_metrics, capital_in_base_currency, get_capital_flows,
+    get_performance_references, get_reference_days, metrics_from_growth,
+)
+from app.services.fx_service import get_fx_matrix, to_base_currency
+
+async def get_dashboard(db: AsyncSession, user_id: int):
+    """
+    Devuelve todo lo que pinta la página de portfolio en una sola respuesta:
+    cuentas con balance, tabla de activos, asignaciones, métricas de rendimiento y serie de crecimiento.
+
+    Las piezas comunes (posiciones valoradas a último precio, saldos de caja y capital aportado)
+    se leen una sola vez, se pasan a BASE_CURRENCY y el resto se calcula en memoria, también el
+    valor actual de las métricas de rendimiento. Las tres partes van a la vez: las piezas comunes,
+    la serie de crecimiento (la consulta pesada; single_flight le da su propia sesión) y el
+    rendimiento, que busca su caché mientras tanto y después espera a lo que necesita.
+    """
+    blocks_task = asyncio.create_task(_load_building_blocks(db, user_id))
+    growth_task = asyncio.create_task(get_portfolio_growth(db, user_id))
+    performance_task = asyncio.create_task(_performance(db, user_id, blocks_task, growth_task))
+    tasks = (blocks_task, growth_task, performance_task)
+    try:
+        (positions, cash, _), growth, performance = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    held = [p for p in positions if p["quantity"] > 0]
+    return {
+        "accounts": _accounts_with_balance(positions, cash),
+        "assets": _asset_rows(held),
+        "allocation": _allocation_overview(held),
+        "performance": performance,
+        "growth": growth,
+    }
+
+async def _performance(db: AsyncSession, user_id: int, blocks_task: asyncio.Task, growth_task: asyncio.Task):
+    # Sesión propia para la caché: la del dashboard la están usando las piezas comunes
+    async with AsyncSession(db.bind, expire_on_commit=False) as session:
+        references = await get_performance_references(session, user_id)
+        ref_days = await get_reference_days(session) if references is None else None
+    if references is None:
+        # Sin caché se deriva de la serie de crecimiento de growth_task, sin volver a calcularla
+        return metrics_from_growth(await growth_task, ref_days)
+    positions, cash, current_cap = await blocks_task
+    return build_performance_metrics(_snapshot(positions, cash, current_cap), references)
+
+async def _load_building_blocks(db: AsyncSession, user_id: int):
+    """
+    Posiciones (holdings con último precio), caja por cuenta y capital aportado del usuario, en BASE_CURRENCY.
+    """
+    positions_query = text("""
+        SELECT
+            h.account_id,
+            ac.name AS account_name,
+            ac.is_active AS account_active,
+            a.asset_id,
+            a.name,
+            a.ticker,
+            a.isin,
+            a.type,
+            a.currency,
+            COALESCE(a.theme, 'Unclassified') AS theme,
+            h.quantity,
+            h.cost_basis,
+            h.realized_gain,
+            lp.price AS current_price
+        FROM holdings h
+        JOIN accounts ac ON ac.account_id = h.account_id
+        JOIN assets a ON a.asset_id = h.asset_id
+        JOIN LATERAL (
+            SELECT price
+            FROM price_history
+            WHERE asset_id = h.asset_id
+            ORDER BY date DESC
+            LIMIT 1
+        ) lp ON TRUE
+        WHERE ac.user_id = :user_id
+          AND h.quantity <> 0
+    """)
+    cash_query = text("""
+        SELECT
+            a.account_id,
+            a.name,
+            a.type,
+            a.currency,
+            a.is_active,
+            COALESCE(cb.balance, 0) AS cash_balance
+        FROM accounts a
+        LEFT JOIN cash_balances cb ON cb.account_id = a.account_id
+        WHERE a.user_id = :user_id
+    """)
+    positions = (await db.execute(positions_query, {"user_id": user_id})).mappings().all()
+    cash = (await db.execute(cash_query, {"user_id": user_id})).mappings().all()
+    capital_flows = await get_capital_flows(db, user_id)
+
+    fx = await get_fx_matrix(db)
+    valued = to_base_currency(
+        fx,
+        [{**row, "total_value": row["quantity"] * row["current_price"]} for row in positions],
+        ["current_price", "total_value", "cost_basis", "realized_gain"]
+    )
+    return valued, to_base_currency(fx, cash, ["cash_balance"]), capital_in_base_currency(fx, capital_flows)
+
+def _snapshot(positions, cash, current_cap):
+    # Mismas definiciones que performance_service.get_current_snapshot: el saldo de caja es la suma
+    # de las transacciones activas y las posiciones van a último precio, todo al último tipo
+    return {
+        "current_val": sum((c["cash_balance"] for c in cash), 0.0) + sum((p["total_value"] for p in positions), 0.0),
+        "current_cap": current_cap,
+    }
+
+def _accounts_with_balance(positions, cash):
+    invested = {}
+    for p in positions:
+        invested[p["account_id"]] = invested.get(p["account_id"], 0.0) + p["total_value"]
+
+    accounts = [
+        {
+            "account_id": c["account_id"],
+            "name": c["name"],
+            "type": c["type"],
+            "currency": c["currency"],
+            "cash_balance": c["cash_balance"],
+            "invested_value": invested.get(c["account_id"], 0.0),
+            "total_value": c["cash_balance"] + invested.get(c["account_id"], 0.0),
+        }
+        for c in cash
+        if c["is_active"]
+    ]
+    # Igual que get_accounts_with_balance: por tipo y patrimonio descendente
+    accounts.sort(key=lambda acc: (acc["type"], -acc["total_value"]))
+    return accounts
+
+def _asset_rows(held):
+    rows = []
+    for p in held:
+        performance = (
+            round((p["total_value"] - p["cost_basis"]) / p["cost_basis"] * 100, 2)
+            if p["cost_basis"] > 0 else 0.0
+        )
+        rows.append({
+            "account_id": p["account_id"],
+            "account_name": p["account_name"],
+            "asset_id": p["asset_id"],
+            "name": p["name"],
+            "ticker": p["ticker"],
+            "isin": p["isin"],
+            "type": p["type"],
+            "theme": p["theme"],
+            "quantity": p["quantity"],
+            "current_price": p["current_price"],
+            "total_value": p["total_value"],
+            "invested_value": p["cost_basis"],
+            "performance": performance,
+            "unrealized_gain": p["total_value"] - p["cost_basis"],
+            "realized_gain": p["realized_gain"],
+        })
+    rows.sort(key=lambda row: (row["account_name"], -row["total_value"]))
+    return rows
+
+def _group(held, column):
+    groups = {}
+    for p in held:
+        group = groups.setdefault(p[column], {"total_value": 0.0, "assets": set()})
+        group["total_value"] += p["total_value"]
+        group["assets"].add(p["asset_id"])
+
+    total = sum((g["total_value"] for g in groups.values()), 0.0)
+    allocation = [
+        {
+            "group_key": key,
+            "total_value": group["total_value"],
+            "allocation_pct": group["total_value"] / total if total else 0.0,
+            "asset_count": len(group["assets"]),
+        }
+        for key, group in groups.items()
+    ]
+    allocation.sort(key=lambda row: -row["total_value"])
+    return allocation
+
+def _allocation_overview(held):
+    accounts = {}
+    for p in held:
+        accounts.setdefault(p["account_id"], {"name": p["account_name"], "positions": []})["positions"].append(p)
+
+    return {
+        "portfolio": {group_by: _group(held, column) for group_by, column in GROUP_COLUMNS.items()},
+        "accounts": [
+            {
+                "account_id": account_id,
+                "name": account["name"],
+                **{group_by: _group(account["positions"], column) for group_by, column in GROUP_COLUMNS.items()}
+            }
+            for account_id, account in sorted(accounts.items())
+        ],
+    }
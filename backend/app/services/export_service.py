@@ -0,0 +1,172 @@
+import csv
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from app.core.database import AsyncSessionLocal
+
+# Filas que se leen del cursor de servidor y se escriben en cada trozo de la respuesta
+EXPORT_CHUNK_SIZE = 5000
+
+# Datos exportables: consulta (siempre filtrada por usuario) y esquema de columnas.
+# Los importes van en la divisa de la cuenta o del activo (sin convertir).
+EXPORTS = {
+    "operations": {
+        "query": """
+            SELECT
+                o.operation_id, o.date, o.account_id, ac.name AS account_name,
+                a.ticker, a.isin, a.name AS asset_name, a.currency,
+                o.operation_type, o.quantity, o.price, o.fees
+            FROM operations o
+            JOIN accounts ac ON ac.account_id = o.account_id
+            JOIN assets a ON a.asset_id = o.asset_id
+            WHERE ac.user_id = :user_id
+            ORDER BY o.date, o.operation_id
+        """,
+        "schema": pa.schema([
+            ("operation_id", pa.int64()),
+            ("date", pa.timestamp("us", tz="UTC")),
+            ("account_id", pa.int64()),
+            ("account_name", pa.string()),
+            ("ticker", pa.string()),
+            ("isin", pa.string()),
+            ("asset_name", pa.string()),
+            ("currency", pa.string()),
+            ("operation_type", pa.string()),
+            ("quantity", pa.decimal128(15, 6)),
+            ("price", pa.decimal128(15, 6)),
+            ("fees", pa.decimal128(15, 6)),
+        ]),
+    },
+    "transactions": {
+        "query": """
+            SELECT
+                t.transaction_id, t.date, t.account_id, ac.name AS account_name, ac.currency,
+                t.type, t.category, t.amount, t.description
+            FROM transactions t
+            JOIN accounts ac ON ac.account_id = t.account_id
+            WHERE ac.user_id = :user_id
+              AND t.is_active = TRUE
+            ORDER BY t.date, t.transaction_id
+        """,
+        "schema": pa.schema([
+            ("transaction_id", pa.int64()),
+            ("date", pa.timestamp("us", tz="UTC")),
+            ("account_id", pa.int64()),
+            ("account_name", pa.string()),
+            ("currency", pa.string()),
+            ("type", pa.string()),
+            ("category", pa.string()),
+            ("amount", pa.decimal128(15, 6)),
+            ("description", pa.string()),
+        ]),
+    },
+    # Histórico de precios de los activos con los que ha operado el usuario
+    "prices": {
+        "query": """
+            SELECT ph.asset_id, a.ticker, a.isin, a.currency, ph.date, ph.price
+            FROM price_history ph
+            JOIN assets a ON a.asset_id = ph.asset_id
+            WHERE ph.asset_id IN (
+                SELECT o.asset_id
+                FROM operations o
+                JOIN accounts ac ON ac.account_id = o.account_id
+                WHERE ac.user_id = :user_id
+            )
+            ORDER BY ph.asset_id, ph.date
+        """,
+        "schema": pa.schema([
+            ("asset_id", pa.int64()),
+            ("ticker", pa.string()),
+            ("isin", pa.string()),
+            ("currency", pa.string()),
+            ("date", pa.timestamp("us", tz="UTC")),
+            ("price", pa.decimal128(15, 6)),
+        ]),
+    },
+}
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+async def _row_chunks(dataset: str, user_id: int):
+    """
+    Lee el export con un cursor de servidor, EXPORT_CHUNK_SIZE filas cada vez.
+    Abre su propia sesión: el generador se consume mientras se envía la respuesta,
+    cuando la sesión de la petición ya está cerrada.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            text(EXPORTS[dataset]["query"]).execution_options(yield_per=EXPORT_CHUNK_SIZE),
+            {"user_id": user_id}
+        )
+        async for rows in result.partitions(EXPORT_CHUNK_SIZE):
+            yield rows
+
+async def _csv_chunks(dataset: str, user_id: int):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORTS[dataset]["schema"].names)
+    yield buffer.getvalue().encode()
+
+    async for rows in _row_chunks(dataset, user_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Destino de ParquetWriter que va soltando los bytes escritos para enviarlos por trozos.
+    Mantiene la posición absoluta, que el escritor usa para los offsets del footer.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+async def _parquet_chunks(dataset: str, user_id: int):
+    # Un row group por trozo del cursor
+    schema = EXPORTS[dataset]["schema"]
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for rows in _row_chunks(dataset, user_id):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def export_stream(dataset: str, user_id: int, file_format: str):
+    """
+    Generador asíncrono con el fichero exportado (CSV o Parquet) en trozos,
+    para devolverlo con StreamingResponse sin cargarlo entero en memoria.
+    """
+    if dataset not in EXPORTS:
+        raise ValueError(f"Export must be one of: {', '.join(EXPORTS)}")
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    return _csv_chunks(dataset, user_id) if file_format == "csv" else _parquet_chunks(dataset, user_id)
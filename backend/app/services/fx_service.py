@@ -0,0 +1,119 @@
+import asyncio
+import time
+from datetime import date
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import BASE_CURRENCY, FX_CACHE_TTL_SECONDS
+
+class FxMatrix:
+    """
+    Tipos de cambio diarios en memoria: una fila por divisa y una columna por día,
+    con el valor en BASE_CURRENCY de una unidad de cada divisa.
+    Los días sin cotización (fines de semana, festivos) llevan el último tipo conocido
+    y los anteriores al primer dato, el primero. La divisa base y las divisas sin datos
+    usan una fila de unos, así que nunca falta un tipo.
+    """
+
+    def __init__(self, currencies: list[str], start: date, rates: np.ndarray):
+        self.index = {currency: i for i, currency in enumerate(currencies)}
+        self.start = start
+        # Última fila: unos (divisa base o sin tipos guardados)
+        self.rates = np.vstack([rates, np.ones((1, rates.shape[1]))])
+
+    @property
+    def n_days(self) -> int:
+        return self.rates.shape[1]
+
+    def _rows(self, currencies) -> np.ndarray:
+        ones_row = len(self.rates) - 1
+        return np.array(
+            [ones_row if currency == BASE_CURRENCY else self.index.get(currency, ones_row) for currency in currencies],
+            dtype=np.intp
+        )
+
+    def _columns(self, days) -> np.ndarray:
+        offsets = np.array([(day - self.start).days for day in days], dtype=np.intp)
+        return np.clip(offsets, 0, self.n_days - 1)
+
+    def latest(self, currencies) -> np.ndarray:
+        """Último tipo de cada divisa (vector alineado con `currencies`)."""
+        return self.rates[self._rows(currencies), -1]
+
+    def on(self, currencies, days) -> np.ndarray:
+        """Tipo de cada par (divisa, día), elemento a elemento."""
+        return self.rates[self._rows(currencies), self._columns(days)]
+
+    def grid(self, currencies, start: date, n_days: int) -> np.ndarray:
+        """Submatriz divisa × día para `n_days` días consecutivos desde `start`."""
+        offsets = np.arange(n_days) + (start - self.start).days
+        columns = np.clip(offsets, 0, self.n_days - 1)
+        return self.rates[np.ix_(self._rows(currencies), columns)]
+
+    def latest_params(self) -> dict:
+        """Últimos tipos como parámetros de array para consultas SQL (unnest)."""
+        currencies = list(self.index)
+        return {
+            "fx_currencies": currencies + [BASE_CURRENCY],
+            "fx_rates": self.latest(currencies).tolist() + [1.0],
+        }
+
+def to_base_currency(fx: FxMatrix, rows, columns: list[str], currency_key: str = "currency"):
+    """
+    Convierte a BASE_CURRENCY, con el último tipo, las columnas monetarias de cada fila.
+    Devuelve dicts con esas columnas como float y `currency_key` = BASE_CURRENCY, la divisa
+    en la que quedan expresados los importes.
+    """
+    if not rows:
+        return []
+    rates = fx.latest([row[currency_key] for row in rows])
+    values = np.array([[float(row[column] or 0) for column in columns] for row in rows]) * rates[:, None]
+    return [
+        {**row, **dict(zip(columns, converted)), currency_key: BASE_CURRENCY}
+        for row, converted in zip(rows, values.tolist())
+    ]
+
+def _forward_fill(rates: np.ndarray) -> np.ndarray:
+    # Índice de la última columna con dato en cada posición; los huecos iniciales toman el primer dato
+    n_rows, n_days = rates.shape
+    known = ~np.isnan(rates)
+    last_known = np.where(known, np.arange(n_days), 0)
+    np.maximum.accumulate(last_known, axis=1, out=last_known)
+    first_known = known.argmax(axis=1)
+    last_known = np.maximum(last_known, first_known[:, None])
+    return rates[np.arange(n_rows)[:, None], last_known]
+
+async def load_fx_matrix(db: AsyncSession) -> FxMatrix:
+    result = await db.execute(text("SELECT currency, date, rate FROM fx_rates ORDER BY currency, date"))
+    rows = result.all()
+    if not rows:
+        return FxMatrix([], date.today(), np.empty((0, 1)))
+
+    currencies = sorted({row.currency for row in rows})
+    index = {currency: i for i, currency in enumerate(currencies)}
+    start = min(row.date for row in rows)
+    end = max(row.date for row in rows)
+
+    rates = np.full((len(currencies), (end - start).days + 1), np.nan)
+    rates[
+        [index[row.currency] for row in rows],
+        [(row.date - start).days for row in rows]
+    ] = [float(row.rate) for row in rows]
+    return FxMatrix(currencies, start, _forward_fill(rates))
+
+_fx_cache = {"matrix": None, "loaded_at": 0.0}
+_fx_lock = asyncio.Lock()
+
+async def get_fx_matrix(db: AsyncSession) -> FxMatrix:
+    """
+    Matriz de tipos de cambio compartida por todas las peticiones del proceso.
+    Se recarga de fx_rates como mucho cada FX_CACHE_TTL_SECONDS (el worker la actualiza una vez al día).
+    """
+    if _fx_cache["matrix"] is not None and time.monotonic() - _fx_cache["loaded_at"] < FX_CACHE_TTL_SECONDS:
+        return _fx_cache["matrix"]
+
+    async with _fx_lock:
+        if _fx_cache["matrix"] is None or time.monotonic() - _fx_cache["loaded_at"] >= FX_CACHE_TTL_SECONDS:
+            _fx_cache["matrix"] = await load_fx_matrix(db)
+            _fx_cache["loaded_at"] = time.monotonic()
+    return _fx_cache["matrix"]
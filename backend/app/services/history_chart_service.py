@@ -1,186 +1,172 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+import numpy as np
+from datetime import timedelta
 from app.schemas.history_chart import PortfolioPoint
+from app.services.fx_service import get_fx_matrix
+from app.core.single_flight import single_flight
 from typing import List
 
-async def get_portfolio_growth(db: AsyncSession, user_id: int):
-    query = text("""
-    WITH RECURSIVE daily_series AS (
-        SELECT MIN(date)::date AS day, NOW()::date AS last_day
+# Conjunto de cuentas de cada serie (nunca viene de la petición)
+GROWTH_SCOPES = {
+    "user": "user_id = :user_id",
+    "account": "account_id = :account_id",
+}
+
+def _growth_query(scope: str):
+    """
+    Movimientos diarios por divisa de las cuentas del ámbito:
+    - cash_flows: aportaciones (capital) y movimientos de caja de cada día, en la divisa de la cuenta
+    - daily_portfolio_value: valor de las posiciones cada día, en la divisa del activo
+    Los acumulados y la conversión a la divisa base se hacen después en memoria.
+    """
+    return text(f"""
+    WITH RECURSIVE scope_accounts AS (
+        SELECT account_id, currency
+        FROM accounts
+        WHERE {GROWTH_SCOPES[scope]}
+    ),
+    daily_series AS (
+        SELECT MIN(t.date)::date AS day, NOW()::date AS last_day
         FROM transactions t
-        JOIN accounts a ON t.account_id = a.account_id
-        WHERE a.user_id = :user_id
+        JOIN scope_accounts sa ON sa.account_id = t.account_id
+        WHERE t.is_active = TRUE
         UNION ALL
         SELECT (day + interval '1 day')::date, last_day
         FROM daily_series
         WHERE day < last_day
     ),
     raw_balances AS (
-        SELECT 
+        SELECT
             o.asset_id,
             o.date::date as op_date,
-            SUM(SUM(CASE WHEN o.operation_type = 'buy' THEN o.quantity ELSE -o.quantity END)) 
+            SUM(SUM(CASE WHEN o.operation_type = 'buy' THEN o.quantity ELSE -o.quantity END))
                 OVER (PARTITION BY o.asset_id ORDER BY o.date::date) as qty
         FROM operations o
-        JOIN accounts a ON o.account_id = a.account_id
-        WHERE a.user_id = :user_id
+        JOIN scope_accounts sa ON sa.account_id = o.account_id
         GROUP BY o.asset_id, o.date::date
     ),
+    daily_prices AS (
+        -- Último precio de cada día, solo de los activos del ámbito y desde el inicio de la serie
+        SELECT DISTINCT ON (ph.asset_id, ph.date::date)
+            ph.asset_id,
+            ph.date::date AS day,
+            ph.price
+        FROM price_history ph
+        WHERE ph.asset_id = ANY(ARRAY(SELECT DISTINCT asset_id FROM raw_balances))
+          AND ph.date >= (SELECT MIN(day) FROM daily_series)
+        ORDER BY ph.asset_id, ph.date::date, ph.date DESC
+    ),
     price_steps AS (
-        SELECT 
+        SELECT
             d.day,
             ast.asset_id,
-            ph.price,
-            COUNT(ph.price) OVER (PARTITION BY ast.asset_id ORDER BY d.day) as price_grp
+            dp.price,
+            COUNT(dp.price) OVER (PARTITION BY ast.asset_id ORDER BY d.day) as price_grp
         FROM daily_series d
-        CROSS JOIN (
-            SELECT DISTINCT asset_id FROM operations o 
-            JOIN accounts a ON o.account_id = a.account_id 
-            WHERE a.user_id = :user_id
-        ) ast
-        LEFT JOIN price_history ph ON ph.asset_id = ast.asset_id AND ph.date::date = d.day
+        CROSS JOIN (SELECT DISTINCT asset_id FROM raw_balances) ast
+        LEFT JOIN daily_prices dp ON dp.asset_id = ast.asset_id AND dp.day = d.day
     ),
     filled_prices AS (
-        SELECT 
+        SELECT
             day, asset_id,
             FIRST_VALUE(price) OVER (PARTITION BY asset_id, price_grp ORDER BY day) as price_ffill
         FROM price_steps
     ),
     daily_portfolio_value AS (
-        SELECT 
+        SELECT
             d.day,
+            a.currency,
             SUM(COALESCE(rb.qty, 0) * COALESCE(fp.price_ffill, 0)) as total_assets_value
         FROM daily_series d
-        LEFT JOIN LATERAL (
-            SELECT DISTINCT ON (asset_id) qty, asset_id 
-            FROM raw_balances 
-            WHERE op_date <= d.day 
+        JOIN LATERAL (
+            SELECT DISTINCT ON (asset_id) qty, asset_id
+            FROM raw_balances
+            WHERE op_date <= d.day
             ORDER BY asset_id, op_date DESC
         ) rb ON TRUE
+        JOIN assets a ON a.asset_id = rb.asset_id
         LEFT JOIN filled_prices fp ON fp.day = d.day AND fp.asset_id = rb.asset_id
-        GROUP BY d.day
+        GROUP BY d.day, a.currency
+    ),
+    cash_flows AS (
+        SELECT
+            t.date::date AS day,
+            sa.currency,
+            -- CAPITAL INVERTIDO:
+            -- No suma 'income' si es 'Inversión' (ventas)
+            -- No resta 'expense' si es 'Inversión' (compras)
+            SUM(CASE
+                WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount
+                WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount
+                ELSE 0 END) as capital_flow,
+            -- EFECTIVO TOTAL: todo afecta a la caja
+            SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END) as cash_flow
+        FROM transactions t
+        JOIN scope_accounts sa ON sa.account_id = t.account_id
+        WHERE t.is_active = TRUE
+        GROUP BY t.date::date, sa.currency
     ),
-    cash_evolution AS (
-    SELECT 
-        d.day,
-        -- CAPITAL INVERTIDO corregido:
-        -- No suma 'income' si es 'Inversión' (ventas)
-        -- No resta 'expense' si es 'Inversión' (compras)
-        SUM(SUM(CASE 
-            WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount 
-            WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount 
-            ELSE 0 END)) OVER (ORDER BY d.day) as capital_invertido,
-            
-        -- EFECTIVO TOTAL: Sigue igual (todo afecta a la caja)
-        SUM(SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END)) 
-            OVER (ORDER BY d.day) as efectivo_total
-    FROM daily_series d
-    CROSS JOIN (SELECT account_id FROM accounts WHERE user_id = :user_id) a
-    LEFT JOIN transactions t ON d.day = t.date::date AND t.account_id = a.account_id
-    GROUP BY d.day
+    bounds AS (
+        SELECT MIN(day) AS first_day, MAX(day) AS last_day FROM daily_series
     )
-    SELECT 
-        ce.day as date,
-        COALESCE(ce.capital_invertido, 0) as capital_invertido,
-        (COALESCE(dpv.total_assets_value, 0) + COALESCE(ce.efectivo_total, 0)) as total_value
-    FROM cash_evolution ce
-    LEFT JOIN daily_portfolio_value dpv ON ce.day = dpv.day
-    ORDER BY ce.day;
+    SELECT b.first_day, b.last_day, f.day, f.currency, f.capital_flow, f.cash_flow, f.assets_value
+    FROM (
+        SELECT day, currency, capital_flow, cash_flow, 0 AS assets_value FROM cash_flows
+        UNION ALL
+        SELECT day, currency, 0, 0, total_assets_value FROM daily_portfolio_value
+    ) f
+    CROSS JOIN bounds b
+    WHERE f.day BETWEEN b.first_day AND b.last_day;
     """)
 
-    result = await db.execute(query, {"user_id": user_id})
-    return [
-        {
-            "date": row.date,
-            "capital_invertido": float(row.capital_invertido),
-            "total_value": float(row.total_value)
-        }
-        for row in result.all()
-    ]
+async def _growth_series(db: AsyncSession, scope: str, params: dict):
+    """
+    Serie diaria de capital invertido y valor total en BASE_CURRENCY.
+    Se construyen matrices divisa × día y se multiplican por la matriz de tipos de cambio:
+    - capital: cada aportación al tipo de su día, acumulada
+    - valor: saldo de caja acumulado y posiciones, al tipo de cada día
+    """
+    result = await db.execute(_growth_query(scope), params)
+    rows = result.all()
+    if not rows:
+        return []
 
+    first_day, last_day = rows[0].first_day, rows[0].last_day
+    n_days = (last_day - first_day).days + 1
+    currencies = sorted({row.currency for row in rows})
+    currency_index = {currency: i for i, currency in enumerate(currencies)}
 
-async def get_account_growth(db: AsyncSession, account_id: int):
-    query = text("""
-    WITH RECURSIVE daily_series AS (
-        SELECT MIN(date)::date AS day, NOW()::date AS last_day
-        FROM transactions
-        WHERE account_id = :account_id
-        UNION ALL
-        SELECT (day + interval '1 day')::date, last_day
-        FROM daily_series
-        WHERE day < last_day
-    ),
-    raw_balances AS (
-        SELECT 
-            asset_id,
-            date::date as op_date,
-            SUM(SUM(CASE WHEN operation_type = 'buy' THEN quantity ELSE -quantity END)) 
-                OVER (PARTITION BY asset_id ORDER BY date::date) as qty
-        FROM operations
-        WHERE account_id = :account_id
-        GROUP BY asset_id, date::date
-    ),
-    price_steps AS (
-        SELECT 
-            d.day,
-            ast.asset_id,
-            ph.price,
-            COUNT(ph.price) OVER (PARTITION BY ast.asset_id ORDER BY d.day) as price_grp
-        FROM daily_series d
-        CROSS JOIN (
-            SELECT DISTINCT asset_id FROM operations 
-            WHERE account_id = :account_id
-        ) ast
-        LEFT JOIN price_history ph ON ph.asset_id = ast.asset_id AND ph.date::date = d.day
-    ),
-    filled_prices AS (
-        SELECT 
-            day, asset_id,
-            FIRST_VALUE(price) OVER (PARTITION BY asset_id, price_grp ORDER BY day) as price_ffill
-        FROM price_steps
-    ),
-    daily_portfolio_value AS (
-        SELECT 
-            d.day,
-            SUM(COALESCE(rb.qty, 0) * COALESCE(fp.price_ffill, 0)) as total_assets_value
-        FROM daily_series d
-        LEFT JOIN LATERAL (
-            SELECT DISTINCT ON (asset_id) qty, asset_id 
-            FROM raw_balances 
-            WHERE op_date <= d.day 
-            ORDER BY asset_id, op_date DESC
-        ) rb ON TRUE
-        LEFT JOIN filled_prices fp ON fp.day = d.day AND fp.asset_id = rb.asset_id
-        GROUP BY d.day
-    ),
-    cash_evolution AS (
-        SELECT 
-            d.day,
-            SUM(SUM(CASE 
-                WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount 
-                WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount 
-                ELSE 0 END)) OVER (ORDER BY d.day) as capital_invertido,
-            SUM(SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END)) 
-                OVER (ORDER BY d.day) as efectivo_total
-        FROM daily_series d
-        LEFT JOIN transactions t ON d.day = t.date::date AND t.account_id = :account_id
-        GROUP BY d.day
+    positions = (
+        np.array([currency_index[row.currency] for row in rows], dtype=np.intp),
+        np.array([(row.day - first_day).days for row in rows], dtype=np.intp),
     )
-    SELECT 
-        ce.day as date,
-        COALESCE(ce.capital_invertido, 0) as capital_invertido,
-        (COALESCE(dpv.total_assets_value, 0) + COALESCE(ce.efectivo_total, 0)) as total_value
-    FROM cash_evolution ce
-    LEFT JOIN daily_portfolio_value dpv ON ce.day = dpv.day
-    ORDER BY ce.day;
-    """)
+    capital_flows = np.zeros((len(currencies), n_days))
+    cash_flows = np.zeros((len(currencies), n_days))
+    assets_value = np.zeros((len(currencies), n_days))
+    np.add.at(capital_flows, positions, [float(row.capital_flow) for row in rows])
+    np.add.at(cash_flows, positions, [float(row.cash_flow) for row in rows])
+    np.add.at(assets_value, positions, [float(row.assets_value) for row in rows])
+
+    fx = await get_fx_matrix(db)
+    rates = fx.grid(currencies, first_day, n_days)
+    capital = np.cumsum((capital_flows * rates).sum(axis=0))
+    total_value = ((np.cumsum(cash_flows, axis=1) + assets_value) * rates).sum(axis=0)
 
-    result = await db.execute(query, {"account_id": account_id})
     return [
         {
-            "date": row.date,
-            "capital_invertido": float(row.capital_invertido),
-            "total_value": float(row.total_value)
+            "date": first_day + timedelta(days=i),
+            "capital_invertido": round(cap, 6),
+            "total_value": round(value, 6)
         }
-        for row in result.all()
-    ]
\ No newline at end of file
+        for i, (cap, value) in enumerate(zip(capital.tolist(), total_value.tolist()))
+    ]
+
+@single_flight
+async def get_portfolio_growth(db: AsyncSession, user_id: int):
+    return await _growth_series(db, "user", {"user_id": user_id})
+
+
+@single_flight
+async def get_account_growth(db: AsyncSession, account_id: int):
+    return await _growth_series(db, "account", {"account_id": account_id})
@@ -0,0 +1,173 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from app.models import Holding, Operation, TaxLot, LotRealization
+from app.services.lot_service import apply_operation_to_lots, replay_operations
+from app.services.fx_service import get_fx_matrix, to_base_currency
+
+async def apply_operation_to_holdings(db: AsyncSession, operation: Operation) -> Holding:
+    """
+    Actualiza la posición (account_id, asset_id) y sus lotes fiscales con una nueva operación.
+    No hace commit: se ejecuta en la misma transacción que create_operation.
+    """
+    # Necesitamos el operation_id para enlazar lotes y realizaciones
+    await db.flush()
+
+    # Garantiza que la fila existe y la bloquea para evitar carreras entre operaciones simultáneas
+    await db.execute(
+        insert(Holding)
+        .values(account_id=operation.account_id, asset_id=operation.asset_id, quantity=0, cost_basis=0, realized_gain=0)
+        .on_conflict_do_nothing(index_elements=['account_id', 'asset_id'])
+    )
+    result = await db.execute(
+        select(Holding)
+        .where(Holding.account_id == operation.account_id, Holding.asset_id == operation.asset_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    holding = result.scalar_one()
+
+    # Una operación con fecha anterior a otras de la misma posición cambia el orden de los lotes:
+    # se rehace solo esa posición
+    later = await db.execute(
+        select(Operation.operation_id)
+        .where(
+            Operation.account_id == operation.account_id,
+            Operation.asset_id == operation.asset_id,
+            Operation.date > operation.date
+        )
+        .limit(1)
+    )
+    if later.scalar_one_or_none() is not None:
+        return await rebuild_position(db, operation.account_id, operation.asset_id)
+
+    cost_delta, realized_gain = await apply_operation_to_lots(db, operation)
+
+    holding.quantity += operation.quantity if operation.operation_type == 'buy' else -operation.quantity
+    holding.cost_basis += cost_delta
+    holding.realized_gain += realized_gain
+    return holding
+
+async def _load_operations(db: AsyncSession, *filters):
+    result = await db.stream(
+        select(
+            Operation.operation_id, Operation.account_id, Operation.asset_id, Operation.date,
+            Operation.operation_type, Operation.quantity, Operation.price, Operation.fees
+        )
+        .where(*filters)
+        .order_by(Operation.date, Operation.operation_id)
+        .execution_options(yield_per=1000)
+    )
+    return [op async for op in result]
+
+async def _store_replay(db: AsyncSession, lots, realizations, positions):
+    if lots:
+        await db.execute(insert(TaxLot), lots)
+    if realizations:
+        await db.execute(insert(LotRealization), realizations)
+    if positions:
+        stmt = insert(Holding)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['account_id', 'asset_id'],
+                set_={
+                    "quantity": stmt.excluded.quantity,
+                    "cost_basis": stmt.excluded.cost_basis,
+                    "realized_gain": stmt.excluded.realized_gain,
+                }
+            ),
+            [
+                {"account_id": account_id, "asset_id": asset_id, **position}
+                for (account_id, asset_id), position in positions.items()
+            ]
+        )
+
+async def rebuild_position(db: AsyncSession, account_id: int, asset_id: int) -> Holding:
+    """
+    Rehace los lotes y la posición de un (account_id, asset_id) recorriendo sus operaciones.
+    No hace commit.
+    """
+    await db.execute(delete(LotRealization).where(LotRealization.account_id == account_id, LotRealization.asset_id == asset_id))
+    await db.execute(delete(TaxLot).where(TaxLot.account_id == account_id, TaxLot.asset_id == asset_id))
+
+    operations = await _load_operations(db, Operation.account_id == account_id, Operation.asset_id == asset_id)
+    lots, realizations, positions = replay_operations(operations)
+    await _store_replay(db, lots, realizations, positions)
+
+    result = await db.execute(
+        select(Holding)
+        .where(Holding.account_id == account_id, Holding.asset_id == asset_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+async def rebuild_positions(db: AsyncSession, keys) -> int:
+    """
+    Rehace lotes y posiciones de varios (account_id, asset_id) a la vez (p. ej. tras una importación):
+    un borrado, una lectura de sus operaciones y una escritura por lotes. No hace commit.
+    """
+    keys = list(keys)
+    if not keys:
+        return 0
+
+    await db.execute(delete(LotRealization).where(tuple_(LotRealization.account_id, LotRealization.asset_id).in_(keys)))
+    await db.execute(delete(TaxLot).where(tuple_(TaxLot.account_id, TaxLot.asset_id).in_(keys)))
+
+    operations = await _load_operations(db, tuple_(Operation.account_id, Operation.asset_id).in_(keys))
+    lots, realizations, positions = replay_operations(operations)
+    await _store_replay(db, lots, realizations, positions)
+    return len(positions)
+
+async def rebuild_holdings(db: AsyncSession) -> int:
+    """
+    Reconstruye desde cero las tablas holdings, tax_lots y lot_realizations
+    recorriendo todas las operaciones en orden. Devuelve el número de posiciones generadas.
+    """
+    operations = await _load_operations(db)
+    lots, realizations, positions = replay_operations(operations)
+
+    await db.execute(delete(LotRealization))
+    await db.execute(delete(TaxLot))
+    await db.execute(delete(Holding))
+    await _store_replay(db, lots, realizations, positions)
+    await db.commit()
+    return len(positions)
+
+async def get_position_gains(db: AsyncSession, user_id: int):
+    """
+    Ganancias realizadas y latentes por cuenta y activo, leídas de holdings (mantenida a partir de los lotes).
+    Incluye posiciones ya cerradas que tuvieron ventas. Importes en BASE_CURRENCY (último tipo de cambio).
+    """
+    query = text("""
+        SELECT
+            h.account_id,
+            ac.name AS account_name,
+            h.asset_id,
+            a.name,
+            a.ticker,
+            a.currency,
+            h.quantity,
+            h.cost_basis,
+            COALESCE(h.quantity * lp.price, 0) AS market_value,
+            COALESCE(h.quantity * lp.price, 0) - h.cost_basis AS unrealized_gain,
+            h.realized_gain
+        FROM holdings h
+        JOIN accounts ac ON ac.account_id = h.account_id
+        JOIN assets a ON a.asset_id = h.asset_id
+        LEFT JOIN LATERAL (
+            SELECT price
+            FROM price_history
+            WHERE asset_id = h.asset_id
+            ORDER BY date DESC
+            LIMIT 1
+        ) lp ON TRUE
+        WHERE ac.user_id = :user_id
+          AND (h.quantity <> 0 OR h.realized_gain <> 0)
+        ORDER BY ac.name, a.name
+    """)
+    result = await db.execute(query, {"user_id": user_id})
+
+    fx = await get_fx_matrix(db)
+    return to_base_currency(
+        fx, result.mappings().all(), ["cost_basis", "market_value", "unrealized_gain", "realized_gain"]
+    )
@@ -0,0 +1,513 @@
+import csv
+import io
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from functools import partial
+from decimal import Decimal, InvalidOperation
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import select, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from app.models import Account, Asset, Operation, PriceHistory, Transaction
+from app.schemas.operation import OperationCreate
+from app.services.transaction_service import operation_cash_values
+from app.services.cash_service import apply_transactions_to_balances
+from app.services.spending_service import apply_transactions_to_rollup
+from app.services.holdings_service import rebuild_positions
+from app.services.performance_service import invalidate_performance_cache
+from app.core.response_cache import notify_price_update
+
+# Filas que se validan e insertan juntas
+IMPORT_BATCH_SIZE = 1000
+# Errores de fila que se devuelven como máximo
+MAX_REPORTED_ERRORS = 50
+
+# Columnas del CSV de operaciones. El activo se identifica por una de asset_id, ticker o isin.
+TRADE_COLUMNS = ["date", "account_id", "operation_type", "quantity", "price"]
+ASSET_COLUMNS = ["asset_id", "ticker", "isin"]
+
+class ImportFileError(ValueError):
+    """Fichero de importación rechazado: ninguna fila se guarda. `errors` lleva el detalle por línea."""
+
+    def __init__(self, message: str, errors: list[str] | None = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+def _csv_rows(file, required: list[str]):
+    """
+    Lee el CSV fila a fila desde el fichero subido (sin cargarlo entero en memoria).
+    Devuelve (número de línea, fila) con las cabeceras en minúsculas.
+    Un fichero que no es UTF-8 o no es un CSV válido se rechaza con ImportFileError.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    try:
+        headers = [h.strip().lower() for h in reader.fieldnames or []]
+        missing = [column for column in required if column not in headers]
+        if missing:
+            raise ImportFileError(f"Faltan columnas en el CSV: {', '.join(missing)}")
+        reader.fieldnames = headers
+
+        for row in reader:
+            yield reader.line_num, {key: (value or "").strip() for key, value in row.items() if key}
+    except UnicodeDecodeError:
+        # El texto se decodifica por bloques: no se sabe en qué línea está el byte no válido
+        raise ImportFileError("El fichero no está codificado en UTF-8")
+    except csv.Error as e:
+        raise ImportFileError(f"CSV no válido después de la línea {reader.line_num}: {e}")
+
+def _batches(rows, size: int = IMPORT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _threaded_batches(rows, size: int = IMPORT_BATCH_SIZE):
+    """
+    Recorre por lotes un generador síncrono que lee y parsea el fichero subido, cada lote en el
+    pool de hilos: un fichero grande no bloquea el bucle de eventos (ni las demás peticiones).
+    """
+    batches = _batches(rows, size)
+    while (batch := await run_in_threadpool(next, batches, None)) is not None:
+        yield batch
+
+class _AssetResolver:
+    """
+    Traduce asset_id / ticker / isin a activos activos con una consulta por lote
+    para las claves que aún no se han visto (las ya resueltas se recuerdan).
+    """
+
+    def __init__(self):
+        self.by_key = {}
+
+    @staticmethod
+    def key(row: dict):
+        for column in ASSET_COLUMNS:
+            if row.get(column):
+                return column, row[column].upper() if column != "asset_id" else row[column]
+        return None
+
+    async def resolve(self, db: AsyncSession, rows: list[dict]):
+        pending = {self.key(row) for row in rows} - set(self.by_key) - {None}
+        if not pending:
+            return
+
+        ids = [int(value) for column, value in pending if column == "asset_id" and value.isdigit()]
+        tickers = [value for column, value in pending if column == "ticker"]
+        isins = [value for column, value in pending if column == "isin"]
+        result = await db.execute(
+            select(Asset.asset_id, Asset.ticker, Asset.isin, Asset.name)
+            .where(
+                Asset.is_active.is_not(False),
+                or_(Asset.asset_id.in_(ids), Asset.ticker.in_(tickers), Asset.isin.in_(isins))
+            )
+        )
+        for asset in result.all():
+            self.by_key[("asset_id", str(asset.asset_id))] = asset
+            if asset.ticker:
+                self.by_key.setdefault(("ticker", asset.ticker.upper()), asset)
+            if asset.isin:
+                self.by_key.setdefault(("isin", asset.isin.upper()), asset)
+
+        # Las claves que no existen también se recuerdan, para no volver a buscarlas
+        for key in pending:
+            self.by_key.setdefault(key, None)
+
+    def get(self, row: dict):
+        key = self.key(row)
+        return self.by_key.get(key) if key else None
+
+async def _owned_accounts(db: AsyncSession, user_id: int, account_ids: set[int], known: set[int]) -> set[int]:
+    pending = account_ids - known
+    if pending:
+        result = await db.execute(
+            select(Account.account_id).where(Account.user_id == user_id, Account.account_id.in_(pending))
+        )
+        known.update(result.scalars().all())
+    return known
+
+def _validate(line: int, row: dict, assets: _AssetResolver, accounts: set[int], errors: list[str]):
+    asset = assets.get(row)
+    if asset is None:
+        errors.append(f"Línea {line}: activo no encontrado")
+        return None
+    try:
+        operation = OperationCreate(
+            asset_id=asset.asset_id,
+            account_id=row["account_id"],
+            date=row["date"],
+            quantity=row["quantity"],
+            price=row["price"],
+            fees=row.get("fees") or "0",
+            operation_type=row["operation_type"],
+        )
+    except ValidationError as e:
+        detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        errors.append(f"Línea {line}: {detail}")
+        return None
+    if operation.account_id not in accounts:
+        errors.append(f"Línea {line}: cuenta no encontrada o no pertenece al usuario")
+        return None
+    return operation, asset
+
+async def _insert_batch(db: AsyncSession, valid: list):
+    """
+    Inserta un lote ya validado con sentencias multi-fila:
+    operaciones, transacciones de efectivo y precios (último precio por activo y fecha).
+    Devuelve los ids de las transacciones creadas.
+    """
+    await db.execute(insert(Operation), [operation.model_dump() for operation, _ in valid])
+
+    result = await db.execute(
+        insert(Transaction).returning(Transaction.transaction_id),
+        [operation_cash_values(operation, asset.name) for operation, asset in valid]
+    )
+    transaction_ids = result.scalars().all()
+
+    # ON CONFLICT no admite dos filas con la misma clave en una sentencia
+    prices = {(operation.asset_id, operation.date): operation.price for operation, _ in valid}
+    stmt = insert(PriceHistory)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['asset_id', 'date'],
+            set_={"price": stmt.excluded.price}
+        ),
+        [{"asset_id": asset_id, "date": date, "price": price} for (asset_id, date), price in prices.items()]
+    )
+    await notify_price_update(db)
+    return transaction_ids
+
+async def import_operations_csv(db: AsyncSession, user_id: int, file) -> dict:
+    """
+    Importa un histórico de operaciones de bróker desde CSV.
+    Columnas: date, account_id, operation_type, quantity, price, fees (opcional)
+    y una de asset_id, ticker o isin.
+
+    El fichero se procesa en lotes de IMPORT_BATCH_SIZE filas: cuentas y activos se validan
+    con una consulta por lote y las filas se insertan con sentencias multi-fila.
+    Al final se rehacen una sola vez las posiciones afectadas y se actualizan saldos de caja
+    y rollup mensual. Todo en una transacción: si alguna fila no es válida no se guarda nada.
+    """
+    assets = _AssetResolver()
+    accounts: set[int] = set()
+    errors: list[str] = []
+    transaction_ids: list[int] = []
+    positions = set()
+    first_date = None
+    imported = 0
+
+    async for batch in _threaded_batches(_csv_rows(file, TRADE_COLUMNS)):
+        await assets.resolve(db, [row for _, row in batch])
+        account_ids = {int(row["account_id"]) for _, row in batch if row["account_id"].isdigit()}
+        await _owned_accounts(db, user_id, account_ids, accounts)
+
+        valid = [
+            checked for line, row in batch
+            if (checked := _validate(line, row, assets, accounts, errors)) is not None
+        ]
+        # Con errores se sigue leyendo solo para informar de todos, sin insertar
+        if errors or not valid:
+            continue
+
+        transaction_ids += await _insert_batch(db, valid)
+        positions.update((operation.account_id, operation.asset_id) for operation, _ in valid)
+        batch_first = min(operation.date for operation, _ in valid)
+        first_date = batch_first if first_date is None else min(first_date, batch_first)
+        imported += len(valid)
+
+    if errors:
+        await db.rollback()
+        raise ImportFileError(
+            f"{len(errors)} filas con errores, no se ha importado nada",
+            errors[:MAX_REPORTED_ERRORS]
+        )
+    if not imported:
+        raise ImportFileError("El CSV no contiene operaciones")
+
+    await rebuild_positions(db, positions)
+    await apply_transactions_to_balances(db, transaction_ids)
+    await apply_transactions_to_rollup(db, transaction_ids)
+    await invalidate_performance_cache(db, user_id, first_date)
+    await db.commit()
+
+    return {
+        "operations_imported": imported,
+        "transactions_created": len(transaction_ids),
+        "positions_updated": len(positions),
+    }
+
+# ---------------------------------------------------------------------------
+# Extractos bancarios -> transactions
+# ---------------------------------------------------------------------------
+
+# Columnas del CSV de extracto; category y type son opcionales (sin type, el signo del importe decide)
+STATEMENT_COLUMNS = ["date", "amount", "description"]
+STATEMENT_DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y%m%d"]
+# Límites de las columnas de transactions: NUMERIC(15,6) y category VARCHAR(100)
+MAX_STATEMENT_AMOUNT = Decimal("1e9")
+MAX_CATEGORY_LENGTH = 100
+
+def _parse_amount(value: str) -> Decimal:
+    # Admite "1234.56", "1.234,56", "1,234.56" y "-12,5": el último separador es el decimal
+    value = value.replace(" ", "").replace("\u00a0", "")
+    if "," in value and ("." not in value or value.rfind(",") > value.rfind(".")):
+        value = value.replace(".", "").replace(",", ".")
+    else:
+        value = value.replace(",", "")
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"importe no válido: {value}")
+    # NaN e Infinity son Decimal válidos pero no importes; por encima del límite COPY fallaría
+    if not amount.is_finite() or abs(amount) >= MAX_STATEMENT_AMOUNT:
+        raise ValueError(f"importe no válido: {value}")
+    return amount
+
+def _parse_date(value: str) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        for date_format in STATEMENT_DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, date_format)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"fecha no válida: {value}")
+    # Las fechas sin zona horaria de los extractos se guardan como UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _statement_line(line: int, date: str, amount: str, description: str | None,
+                    category: str | None = None, type: str | None = None):
+    """
+    Normaliza una línea de extracto a una fila de staging:
+    (line, date, amount positivo, type, category, description).
+    """
+    if not amount:
+        raise ValueError("falta el importe")
+    if not date:
+        raise ValueError("falta la fecha")
+    value = _parse_amount(amount)
+    if category and len(category) > MAX_CATEGORY_LENGTH:
+        raise ValueError(f"la categoría supera {MAX_CATEGORY_LENGTH} caracteres")
+    if type:
+        type = type.lower()
+        if type not in ("income", "expense"):
+            raise ValueError('type debe ser "income" o "expense"')
+    else:
+        type = "income" if value > 0 else "expense"
+    value = abs(value)
+    if value == 0:
+        raise ValueError("el importe no puede ser cero")
+    return (line, _parse_date(date), value, type, category or "General", description or None)
+
+def _statement_csv(file):
+    for line, row in _csv_rows(file, STATEMENT_COLUMNS):
+        yield line, partial(
+            _statement_line, line, row["date"], row["amount"], row["description"], row.get("category"), row.get("type")
+        )
+
+def _statement_ofx(file):
+    """
+    OFX/QFX (SGML o XML): cada <STMTTRN> es un movimiento con DTPOSTED, TRNAMT y NAME/MEMO.
+    Se lee línea a línea; en SGML las etiquetas simples no se cierran.
+    """
+    tag = re.compile(r"<([A-Za-z0-9.]+)>([^<\r\n]*)")
+    current = None
+    for line_number, line in enumerate(io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace"), start=1):
+        for name, value in tag.findall(line):
+            name = name.upper()
+            if name == "STMTTRN":
+                current = {"line": line_number}
+            elif current is not None and name in ("DTPOSTED", "TRNAMT", "NAME", "MEMO"):
+                current[name] = value.strip()
+        if current is not None and "</STMTTRN>" in line.upper():
+            yield current["line"], partial(
+                _statement_line,
+                current["line"],
+                current.get("DTPOSTED", "")[:8],
+                current.get("TRNAMT", ""),
+                current.get("NAME") or current.get("MEMO"),
+            )
+            current = None
+    if current is not None:
+        yield current["line"], partial(_unclosed_entry, "</STMTTRN>")
+
+def _unclosed_entry(closing_tag: str):
+    raise ValueError(f"movimiento sin cerrar (falta {closing_tag})")
+
+def _statement_camt(file):
+    """
+    CAMT.053 (ISO 20022): cada <Ntry> es un apunte con Amt, CdtDbtInd (CRDT/DBIT), BookgDt
+    y la descripción en RmtInf/Ustrd o AddtlNtryInf. Se lee con iterparse, apunte a apunte.
+    """
+    def local(element):
+        return element.tag.rsplit("}", 1)[-1]
+
+    def find_text(element, *names):
+        # Primer descendiente (en orden del documento) con alguno de los nombres, por prioridad
+        for name in names:
+            for child in element.iter():
+                if local(child) == name and child.text:
+                    return child.text.strip()
+        return None
+
+    number = 0
+    for _, element in ET.iterparse(file, events=("end",)):
+        if local(element) != "Ntry":
+            continue
+        number += 1
+        booking = next((child for child in element.iter() if local(child) == "BookgDt"), None)
+        entry = (
+            number,
+            (find_text(booking, "Dt", "DtTm") if booking is not None else None) or "",
+            find_text(element, "Amt") or "",
+            find_text(element, "Ustrd", "AddtlNtryInf"),
+        )
+        indicator = find_text(element, "CdtDbtInd")
+        element.clear()
+        yield number, partial(
+            _statement_line, *entry, type="income" if indicator == "CRDT" else "expense"
+        )
+
+STATEMENT_FORMATS = {
+    "csv": _statement_csv,
+    "ofx": _statement_ofx,
+    "qfx": _statement_ofx,
+    "xml": _statement_camt,
+    "camt": _statement_camt,
+}
+# Cómo se identifica en los errores cada movimiento: por línea del fichero o, en CAMT, por número de apunte
+STATEMENT_ENTRY_LABELS = {"xml": "Apunte", "camt": "Apunte"}
+
+def statement_format(filename: str | None) -> str:
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    return extension if extension in STATEMENT_FORMATS else "csv"
+
+def _staging_records(file, file_format: str, errors: list[str]):
+    """
+    Genera las filas para COPY a medida que se lee el fichero.
+    Las líneas no válidas se anotan en `errors` y no se copian.
+    """
+    label = STATEMENT_ENTRY_LABELS.get(file_format, "Línea")
+    try:
+        for line, parse in STATEMENT_FORMATS[file_format](file):
+            try:
+                yield parse()
+            except (ValueError, ArithmeticError) as e:
+                errors.append(f"{label} {line}: {e}")
+    except ET.ParseError as e:
+        errors.append(f"XML no válido: {e}")
+
+async def _staging_stream(file, file_format: str, errors: list[str]):
+    # Lectura y parseo en el pool de hilos; COPY consume las filas a medida que llegan
+    async for batch in _threaded_batches(_staging_records(file, file_format, errors)):
+        for record in batch:
+            yield record
+
+async def import_statement(db: AsyncSession, user_id: int, account_id: int, file, file_format: str = "csv") -> dict:
+    """
+    Importa un extracto bancario (CSV, OFX o CAMT.053) en las transacciones de una cuenta.
+
+    Las líneas se leen en streaming y se cargan con COPY en una tabla temporal de staging;
+    después una sola sentencia inserta solo las que faltan. La deduplicación compara con las
+    transacciones activas por (account_id, date, amount, description), apoyada en
+    idx_transactions_dedupe: si una línea idéntica aparece n veces en el extracto y m en la
+    cuenta, se insertan n - m (reimportar el mismo extracto no duplica nada).
+    Saldos de caja y rollup mensual se actualizan por lotes en la misma transacción.
+    """
+    result = await db.execute(
+        select(Account.account_id).where(Account.account_id == account_id, Account.user_id == user_id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Cuenta no encontrada o no pertenece al usuario")
+
+    await db.execute(text("""
+        CREATE TEMP TABLE transaction_import_staging (
+            line INTEGER,
+            date TIMESTAMPTZ NOT NULL,
+            amount NUMERIC(15,6) NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            category VARCHAR(100),
+            description TEXT
+        ) ON COMMIT DROP
+    """))
+
+    errors: list[str] = []
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "transaction_import_staging",
+        records=_staging_stream(file, file_format, errors),
+        columns=["line", "date", "amount", "type", "category", "description"]
+    )
+
+    if errors:
+        await db.rollback()
+        raise ImportFileError(
+            f"{len(errors)} líneas con errores, no se ha importado nada",
+            errors[:MAX_REPORTED_ERRORS]
+        )
+
+    result = await db.execute(
+        text("""
+            WITH staged AS (
+                SELECT
+                    s.*,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY s.date, s.amount, s.type, s.description ORDER BY s.line
+                    ) AS occurrence
+                FROM transaction_import_staging s
+            ),
+            new_rows AS (
+                SELECT st.*
+                FROM staged st
+                WHERE st.occurrence > (
+                    SELECT COUNT(*)
+                    FROM transactions t
+                    WHERE t.account_id = :account_id
+                      AND t.date = st.date
+                      AND t.amount = st.amount
+                      AND t.description IS NOT DISTINCT FROM st.description
+                      AND t.type = st.type
+                      AND t.is_active = TRUE
+                )
+            ),
+            inserted AS (
+                INSERT INTO transactions (account_id, category, date, amount, type, description)
+                SELECT :account_id, category, date, amount, type, description
+                FROM new_rows
+                ORDER BY line
+                RETURNING transaction_id, date
+            )
+            SELECT
+                (SELECT COUNT(*) FROM transaction_import_staging) AS rows_read,
+                COALESCE(array_agg(transaction_id), '{}') AS transaction_ids,
+                MIN(date) AS first_date
+            FROM inserted
+        """),
+        {"account_id": account_id}
+    )
+    summary = result.one()
+    if summary.rows_read == 0:
+        raise ImportFileError("El extracto no contiene movimientos")
+
+    transaction_ids = list(summary.transaction_ids)
+    await apply_transactions_to_balances(db, transaction_ids)
+    await apply_transactions_to_rollup(db, transaction_ids)
+    if summary.first_date is not None:
+        await invalidate_performance_cache(db, user_id, summary.first_date)
+    await db.commit()
+
+    return {
+        "rows_read": summary.rows_read,
+        "imported": len(transaction_ids),
+        "duplicates": summary.rows_read - len(transaction_ids),
+    }
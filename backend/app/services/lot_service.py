@@ -0,0 +1,190 @@
+from decimal import Decimal
+from heapq import heappush, heappop
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.core.config import LOT_MATCHING_METHOD
+from app.models import TaxLot, LotRealization, Operation
+
+# Métodos de asignación de lotes. Cada método define:
+# - order_by: orden en base de datos (apoyado en el índice parcial idx_tax_lots_open)
+# - sort_key: la misma prioridad para la reconstrucción en memoria (heap)
+LOT_METHODS = {
+    "fifo": {
+        "order_by": lambda: (TaxLot.open_date.asc(), TaxLot.operation_id.asc()),
+        "sort_key": lambda lot: (lot["open_date"], lot["operation_id"]),
+    },
+    "lifo": {
+        "order_by": lambda: (TaxLot.open_date.desc(), TaxLot.operation_id.desc()),
+        "sort_key": lambda lot: (-lot["open_date"].timestamp(), -lot["operation_id"]),
+    },
+}
+
+# Lotes que se bloquean por consulta al casar una venta
+LOT_FETCH_SIZE = 50
+
+def get_lot_method(method: str):
+    if method not in LOT_METHODS:
+        raise ValueError(f"Lot matching method must be one of: {', '.join(LOT_METHODS)}")
+    return LOT_METHODS[method]
+
+def take_from_lot(remaining_quantity: Decimal, remaining_cost: Decimal, quantity: Decimal):
+    """
+    Consume hasta `quantity` unidades de un lote.
+    Devuelve (cantidad consumida, coste liberado). Si se cierra el lote se libera todo el coste restante.
+    """
+    taken = min(remaining_quantity, quantity)
+    if taken == remaining_quantity:
+        return taken, remaining_cost
+    return taken, (remaining_cost * taken / remaining_quantity).quantize(Decimal('0.000001'))
+
+def _buy_cost(operation) -> Decimal:
+    return operation.quantity * operation.price + (operation.fees or Decimal('0'))
+
+def _sell_proceeds(operation, quantity: Decimal) -> Decimal:
+    # Ingreso neto de la parte vendida (las comisiones se reparten en proporción)
+    net = operation.quantity * operation.price - (operation.fees or Decimal('0'))
+    return (net * quantity / operation.quantity).quantize(Decimal('0.000001'))
+
+def _realization(operation, lot_operation_id, quantity: Decimal, cost: Decimal) -> dict:
+    proceeds = _sell_proceeds(operation, quantity)
+    return {
+        "sell_operation_id": operation.operation_id,
+        "lot_operation_id": lot_operation_id,
+        "account_id": operation.account_id,
+        "asset_id": operation.asset_id,
+        "date": operation.date,
+        "quantity": quantity,
+        "proceeds": proceeds,
+        "cost": cost,
+        "realized_gain": proceeds - cost,
+    }
+
+async def apply_operation_to_lots(db: AsyncSession, operation: Operation, method: str = LOT_MATCHING_METHOD):
+    """
+    Aplica una operación ya insertada (con operation_id) a los lotes de su (account_id, asset_id).
+    BUY  -> abre un lote nuevo
+    SELL -> consume los lotes abiertos en el orden del método (FIFO por defecto);
+            cada lote se localiza por el índice parcial de lotes abiertos.
+    Devuelve (variación del coste de la posición, ganancia realizada).
+    """
+    lot_method = get_lot_method(method)
+
+    if operation.operation_type == 'buy':
+        cost = _buy_cost(operation)
+        db.add(TaxLot(
+            operation_id=operation.operation_id,
+            account_id=operation.account_id,
+            asset_id=operation.asset_id,
+            open_date=operation.date,
+            quantity=operation.quantity,
+            cost_basis=cost,
+            remaining_quantity=operation.quantity,
+            remaining_cost=cost
+        ))
+        return cost, Decimal('0')
+
+    pending = operation.quantity
+    released_cost = Decimal('0')
+    realized_gain = Decimal('0')
+
+    while pending > 0:
+        result = await db.execute(
+            select(TaxLot)
+            .where(
+                TaxLot.account_id == operation.account_id,
+                TaxLot.asset_id == operation.asset_id,
+                TaxLot.remaining_quantity > 0
+            )
+            .order_by(*lot_method["order_by"]())
+            .limit(LOT_FETCH_SIZE)
+            .with_for_update()
+        )
+        lots = result.scalars().all()
+        if not lots:
+            break
+
+        for lot in lots:
+            taken, cost = take_from_lot(lot.remaining_quantity, lot.remaining_cost, pending)
+            lot.remaining_quantity -= taken
+            lot.remaining_cost -= cost
+            realization = _realization(operation, lot.operation_id, taken, cost)
+            db.add(LotRealization(**realization))
+
+            pending -= taken
+            released_cost += cost
+            realized_gain += realization["realized_gain"]
+            if pending == 0:
+                break
+
+        # Los lotes cerrados salen del índice parcial en la siguiente consulta
+        await db.flush()
+
+    if pending > 0:
+        # Venta por encima de la cantidad abierta: no hay coste que casar
+        realization = _realization(operation, None, pending, Decimal('0'))
+        db.add(LotRealization(**realization))
+        realized_gain += realization["realized_gain"]
+
+    return -released_cost, realized_gain
+
+def replay_operations(operations, method: str = LOT_MATCHING_METHOD):
+    """
+    Reconstruye en memoria lotes, realizaciones y posiciones a partir de operaciones
+    ordenadas por fecha. Los lotes abiertos de cada posición viven en un heap ordenado
+    por la prioridad del método, así cada venta cuesta O(log n) por lote consumido.
+    Devuelve (lotes, realizaciones, posiciones {(account_id, asset_id): dict}).
+    """
+    sort_key = get_lot_method(method)["sort_key"]
+    lots = []
+    realizations = []
+    open_lots = {}
+    positions = {}
+
+    for operation in operations:
+        key = (operation.account_id, operation.asset_id)
+        position = positions.setdefault(
+            key, {"quantity": Decimal('0'), "cost_basis": Decimal('0'), "realized_gain": Decimal('0')}
+        )
+        heap = open_lots.setdefault(key, [])
+
+        if operation.operation_type == 'buy':
+            cost = _buy_cost(operation)
+            lot = {
+                "operation_id": operation.operation_id,
+                "account_id": operation.account_id,
+                "asset_id": operation.asset_id,
+                "open_date": operation.date,
+                "quantity": operation.quantity,
+                "cost_basis": cost,
+                "remaining_quantity": operation.quantity,
+                "remaining_cost": cost,
+            }
+            lots.append(lot)
+            heappush(heap, (sort_key(lot), operation.operation_id, lot))
+            position["quantity"] += operation.quantity
+            position["cost_basis"] += cost
+            continue
+
+        pending = operation.quantity
+        while pending > 0 and heap:
+            lot = heap[0][2]
+            taken, cost = take_from_lot(lot["remaining_quantity"], lot["remaining_cost"], pending)
+            lot["remaining_quantity"] -= taken
+            lot["remaining_cost"] -= cost
+            if lot["remaining_quantity"] == 0:
+                heappop(heap)
+
+            realization = _realization(operation, lot["operation_id"], taken, cost)
+            realizations.append(realization)
+            pending -= taken
+            position["cost_basis"] -= cost
+            position["realized_gain"] += realization["realized_gain"]
+
+        if pending > 0:
+            realization = _realization(operation, None, pending, Decimal('0'))
+            realizations.append(realization)
+            position["realized_gain"] += realization["realized_gain"]
+
+        position["quantity"] -= operation.quantity
+
+    return lots, realizations, positions
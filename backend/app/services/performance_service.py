@@ -1,125 +1,206 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from bisect import bisect_right
+import numpy as np
+from app.core.config import PERFORMANCE_CACHE_MAX_AGE_DAYS
+from app.services.fx_service import get_fx_matrix
+from app.services.history_chart_service import get_portfolio_growth
+from app.core.single_flight import single_flight
 
+@single_flight
 async def get_performance_metrics(db: AsyncSession, user_id: int):
+    """
+    Devuelve las métricas de rendimiento (1m, 3m, YTD, total) del usuario.
+    Los valores de referencia salen de performance_cache, que el worker rellena cada noche,
+    y el valor actual se calcula al momento con los últimos precios (delta intradía).
+    Si no hay caché reciente para el usuario se calcula todo bajo demanda.
+    """
+    references = await get_performance_references(db, user_id)
+    if references is None:
+        return await compute_performance_metrics(db, user_id)
+
+    return build_performance_metrics(await get_current_snapshot(db, user_id), references)
+
+async def get_performance_references(db: AsyncSession, user_id: int):
+    """
+    Valores de referencia (1m, 3m, YTD) precalculados por el worker, o None si no hay caché reciente.
+    """
+    cached = await db.execute(
+        text("""
+            SELECT val_1m, val_3m, val_ytd
+            FROM performance_cache
+            WHERE user_id = :user_id
+              AND as_of >= CURRENT_DATE - CAST(:max_age AS integer)
+        """),
+        {"user_id": user_id, "max_age": PERFORMANCE_CACHE_MAX_AGE_DAYS}
+    )
+    return cached.fetchone()
+
+def build_performance_metrics(snapshot: dict, references):
+    """
+    Métricas a partir de un valor actual ya calculado ({"current_val", "current_cap"}, en BASE_CURRENCY)
+    y de los valores de referencia de get_performance_references.
+    """
+    return _build_metrics(
+        snapshot["current_val"], snapshot["current_cap"],
+        references.val_1m, references.val_3m, references.val_ytd
+    )
+
+async def get_current_snapshot(db: AsyncSession, user_id: int):
+    """
+    Valor actual del patrimonio (efectivo + posiciones a último precio) y capital aportado, en BASE_CURRENCY.
+    Es una agregación simple sin serie diaria, pensada para servir el delta intradía.
+    El capital se convierte al tipo del día de cada aportación y el valor, al último tipo.
+    """
     query = text("""
-    WITH RECURSIVE daily_series AS (
-        SELECT MIN(date)::date AS day, NOW()::date AS last_day
-        FROM transactions t
-        JOIN accounts a ON t.account_id = a.account_id
-        WHERE a.user_id = :user_id
+        WITH user_accounts AS (
+            SELECT account_id, currency FROM accounts WHERE user_id = :user_id
+        ),
+        cash AS (
+            SELECT
+                ua.currency,
+                t.date::date AS day,
+                SUM(CASE
+                    WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount
+                    WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount
+                    ELSE 0 END) AS capital_flow,
+                SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END) AS cash_flow
+            FROM transactions t
+            JOIN user_accounts ua ON ua.account_id = t.account_id
+            WHERE t.is_active = TRUE
+            GROUP BY ua.currency, t.date::date
+        ),
+        positions AS (
+            SELECT h.asset_id, SUM(h.quantity) AS qty
+            FROM holdings h
+            JOIN user_accounts ua ON ua.account_id = h.account_id
+            GROUP BY h.asset_id
+        ),
+        assets_value AS (
+            SELECT a.currency, SUM(p.qty * lp.price) AS valor
+            FROM positions p
+            JOIN assets a ON a.asset_id = p.asset_id
+            JOIN LATERAL (
+                SELECT price
+                FROM price_history
+                WHERE asset_id = p.asset_id
+                ORDER BY date DESC
+                LIMIT 1
+            ) lp ON TRUE
+            GROUP BY a.currency
+        )
+        SELECT currency, day, capital_flow, cash_flow, 0 AS assets_value FROM cash
         UNION ALL
-        SELECT (day + interval '1 day')::date, last_day
-        FROM daily_series
-        WHERE day < last_day
-    ),
-    raw_balances AS (
-        SELECT 
-            o.asset_id,
-            o.date::date as op_date,
-            SUM(SUM(CASE WHEN o.operation_type = 'buy' THEN o.quantity ELSE -o.quantity END)) 
-                OVER (PARTITION BY o.asset_id ORDER BY o.date::date) as qty
-        FROM operations o
-        JOIN accounts a ON o.account_id = a.account_id
-        WHERE a.user_id = :user_id
-        GROUP BY o.asset_id, o.date::date
-    ),
-    price_steps AS (
-        SELECT 
-            d.day, ast.asset_id, ph.price,
-            COUNT(ph.price) OVER (PARTITION BY ast.asset_id ORDER BY d.day) as price_grp
-        FROM daily_series d
-        CROSS JOIN (
-            SELECT DISTINCT asset_id FROM operations o 
-            JOIN accounts a ON o.account_id = a.account_id 
-            WHERE a.user_id = :user_id
-        ) ast
-        LEFT JOIN price_history ph ON ph.asset_id = ast.asset_id AND ph.date::date = d.day
-    ),
-    filled_prices AS (
-        SELECT 
-            day, asset_id,
-            FIRST_VALUE(price) OVER (PARTITION BY asset_id, price_grp ORDER BY day) as price_ffill
-        FROM price_steps
-    ),
-    daily_portfolio_value AS (
-        SELECT 
-            d.day,
-            SUM(COALESCE(rb.qty, 0) * COALESCE(fp.price_ffill, 0)) as total_assets_value
-        FROM daily_series d
-        LEFT JOIN LATERAL (
-            SELECT DISTINCT ON (asset_id) qty, asset_id 
-            FROM raw_balances 
-            WHERE op_date <= d.day 
-            ORDER BY asset_id, op_date DESC
-        ) rb ON TRUE
-        LEFT JOIN filled_prices fp ON fp.day = d.day AND fp.asset_id = rb.asset_id
-        GROUP BY d.day
-    ),
-    cash_evolution AS (
-        SELECT 
-            d.day,
-            SUM(SUM(CASE 
-                WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount 
-                WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount 
-                ELSE 0 END)) OVER (ORDER BY d.day) as capital_invertido,
-            SUM(SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END)) 
-                OVER (ORDER BY d.day) as efectivo_total
-        FROM daily_series d
-        CROSS JOIN (SELECT account_id FROM accounts WHERE user_id = :user_id) a
-        LEFT JOIN transactions t ON d.day = t.date::date AND t.account_id = a.account_id
-        GROUP BY d.day
-    ),
-    portfolio_history AS (
-        SELECT 
-            ce.day,
-            ce.capital_invertido,
-            (COALESCE(dpv.total_assets_value, 0) + COALESCE(ce.efectivo_total, 0)) as total_value
-        FROM cash_evolution ce
-        LEFT JOIN daily_portfolio_value dpv ON ce.day = dpv.day
-    ),
-    first_record AS (
-        -- Buscamos el primer día que hubo actividad real
-        SELECT total_value as val_start 
-        FROM portfolio_history 
-        ORDER BY day ASC LIMIT 1
+        SELECT currency, NULL, 0, 0, valor FROM assets_value
+    """)
+    result = await db.execute(query, {"user_id": user_id})
+    rows = result.all()
+
+    fx = await get_fx_matrix(db)
+    current_cap = capital_in_base_currency(fx, [row for row in rows if row.day is not None])
+    current_val = np.dot(
+        [float(row.cash_flow) + float(row.assets_value) for row in rows],
+        fx.latest([row.currency for row in rows])
     )
-    SELECT 
-        (SELECT total_value FROM portfolio_history ORDER BY day DESC LIMIT 1) as current_val,
-        (SELECT capital_invertido FROM portfolio_history ORDER BY day DESC LIMIT 1) as current_cap,
-        -- Si no hay datos hace X tiempo, COALESCE usa el valor del primer día registrado
-        COALESCE(
-            (SELECT total_value FROM portfolio_history WHERE day <= NOW() - interval '1 month' ORDER BY day DESC LIMIT 1),
-            (SELECT val_start FROM first_record)
-        ) as val_1m,
-        COALESCE(
-            (SELECT total_value FROM portfolio_history WHERE day <= NOW() - interval '3 month' ORDER BY day DESC LIMIT 1),
-            (SELECT val_start FROM first_record)
-        ) as val_3m,
-        COALESCE(
-            (SELECT total_value FROM portfolio_history WHERE day <= DATE_TRUNC('year', NOW()) ORDER BY day DESC LIMIT 1),
-            (SELECT val_start FROM first_record)
-        ) as val_ytd
-    FROM portfolio_history, first_record
-    LIMIT 1;
+    return {"current_val": float(current_val), "current_cap": current_cap}
+
+async def get_capital_flows(db: AsyncSession, user_id: int):
+    """
+    Capital aportado por divisa y día (transacciones activas sin los movimientos de 'Inversión'),
+    para convertirlo con capital_in_base_currency.
+    """
+    query = text("""
+        SELECT
+            a.currency,
+            t.date::date AS day,
+            SUM(CASE
+                WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount
+                WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount
+                ELSE 0 END) AS capital_flow
+        FROM transactions t
+        JOIN accounts a ON a.account_id = t.account_id
+        WHERE a.user_id = :user_id
+          AND t.is_active = TRUE
+        GROUP BY a.currency, t.date::date
     """)
+    return (await db.execute(query, {"user_id": user_id})).all()
 
-    result = await db.execute(query, {"user_id": user_id})
-    row = result.fetchone()
+def capital_in_base_currency(fx, flows) -> float:
+    # Cada aportación al tipo de su día
+    return float(np.dot(
+        [float(row.capital_flow) for row in flows],
+        fx.on([row.currency for row in flows], [row.day for row in flows])
+    ))
+
+async def invalidate_performance_cache(db: AsyncSession, user_id: int, since):
+    """
+    Borra las métricas precalculadas si un movimiento con fecha `since` cambia el histórico ya consolidado.
+    Se ejecuta dentro de la transacción de la escritura; el endpoint recalcula bajo demanda hasta la próxima noche.
+    """
+    await db.execute(
+        text("""
+            DELETE FROM performance_cache
+            WHERE user_id = :user_id
+              AND as_of >= CAST(:since AS date)
+        """),
+        {"user_id": user_id, "since": since}
+    )
+
+async def compute_performance_metrics(db: AsyncSession, user_id: int):
+    """
+    Cálculo completo bajo demanda a partir de la serie diaria de crecimiento (ya en BASE_CURRENCY).
+    """
+    history = await get_portfolio_growth(db, user_id)
+    if not history:
+        return metrics_from_growth(history, None)
+    return metrics_from_growth(history, await get_reference_days(db))
+
+async def get_reference_days(db: AsyncSession):
+    """Días de referencia de 1 mes, 3 meses y YTD: los mismos que usa el precálculo del worker."""
+    result = await db.execute(text("""
+        SELECT
+            (NOW() - interval '1 month')::date AS day_1m,
+            (NOW() - interval '3 month')::date AS day_3m,
+            DATE_TRUNC('year', NOW())::date AS day_ytd
+    """))
+    return result.one()
+
+def metrics_from_growth(history, ref_days):
+    """
+    Métricas a partir de una serie de get_portfolio_growth ya calculada y de los días de get_reference_days.
+    """
+    if not history:
+        return _build_metrics(0.0, 0.0, None, None, None)
+
+    current = history[-1]
+    return _build_metrics(
+        current["total_value"], current["capital_invertido"],
+        _value_at(history, ref_days.day_1m),
+        _value_at(history, ref_days.day_3m),
+        _value_at(history, ref_days.day_ytd)
+    )
+
+def _value_at(history, day):
+    # Último valor en o antes de `day`; si no hay datos tan antiguos, el del primer día registrado
+    dates = [point["date"] for point in history]
+    position = bisect_right(dates, day)
+    return history[position - 1 if position else 0]["total_value"]
 
-    def calc_metrics(current, past):
-        if past is None or past == 0: 
-            return {"pct": 0.0, "abs": 0.0}
-        abs_val = float(current - past)
-        pct = (abs_val / float(past)) * 100
-        return {"pct": round(pct, 2), "abs": round(abs_val, 2)}
+def _calc_metrics(current, past):
+    if past is None or past == 0: 
+        return {"pct": 0.0, "abs": 0.0}
+    abs_val = float(current) - float(past)
+    pct = (abs_val / float(past)) * 100
+    return {"pct": round(pct, 2), "abs": round(abs_val, 2)}
 
+def _build_metrics(current_val, current_cap, val_1m, val_3m, val_ytd):
+    current_val, current_cap = float(current_val), float(current_cap)
     return {
-        "month": calc_metrics(row.current_val, row.val_1m),
-        "three_months": calc_metrics(row.current_val, row.val_3m),
-        "ytd": calc_metrics(row.current_val, row.val_ytd),
+        "month": _calc_metrics(current_val, val_1m),
+        "three_months": _calc_metrics(current_val, val_3m),
+        "ytd": _calc_metrics(current_val, val_ytd),
         "total": {
-            "pct": round(((row.current_val - row.current_cap) / row.current_cap * 100), 2) if row.current_cap > 0 else 0.0,
-            "abs": round(float(row.current_val - row.current_cap), 2)
+            "pct": round(((current_val - current_cap) / current_cap * 100), 2) if current_cap > 0 else 0.0,
+            "abs": round(float(current_val - current_cap), 2)
         }
     }
\ No newline at end of file
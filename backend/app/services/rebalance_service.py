@@ -1,12 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.dialects.postgresql import insert
-from app.models import Asset, Operation, Account, RebalanceSetting
+from sqlalchemy import select, delete, func, text, any_, all_, bindparam, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY
+import numpy as np
+from datetime import date
+from app.models import Asset, Holding, Account, RebalanceSetting
 from app.schemas.rebalance import RebalanceUpdate
+from app.services.fx_service import get_fx_matrix
+from app.services.history_chart_service import get_portfolio_growth
 from typing import List
 
 async def get_rebalance_status(db: AsyncSession, user_id: int):
-    # Query para traer Assets que tienen operaciones del usuario
+    # Query para traer Assets que tienen posición (holdings) del usuario
     # Cruzamos con rebalance_settings para traer el % objetivo
     stmt = (
         select(
@@ -16,8 +20,8 @@ async def get_rebalance_status(db: AsyncSession, user_id: int):
             func.coalesce(RebalanceSetting.rebalance_id, 0).label("rebalance_id"),
             func.coalesce(RebalanceSetting.target_percentage, 0).label("target_percentage")
         )
-        .join(Operation, Operation.asset_id == Asset.asset_id)
-        .join(Account, Account.account_id == Operation.account_id)
+        .join(Holding, Holding.asset_id == Asset.asset_id)
+        .join(Account, Account.account_id == Holding.account_id)
         .outerjoin(
             RebalanceSetting, 
             (RebalanceSetting.asset_id == Asset.asset_id) & (RebalanceSetting.user_id == user_id)
@@ -30,20 +34,444 @@ async def get_rebalance_status(db: AsyncSession, user_id: int):
     return result.mappings().all()
 
 async def update_rebalance_settings(db: AsyncSession, user_id: int, settings: List[RebalanceUpdate]):
-    for item in settings:
-        stmt = insert(RebalanceSetting).values(
-            user_id=user_id,
-            asset_id=item.asset_id,
-            target_percentage=item.target_percentage,
-            updated_at=func.now()
+    """
+    Sustituye la estrategia del usuario por la recibida, con un número fijo de consultas
+    sea cual sea el número de activos:
+    1. Comprueba de una vez que todos los activos están en alguna cuenta del usuario
+    2. Borra los objetivos de los activos que ya no vienen en la estrategia
+    3. Inserta o actualiza el resto con un único upsert sobre unnest de los arrays
+    """
+    # Parámetros array: las consultas son las mismas para 5 o 500 activos
+    asset_ids = bindparam("asset_ids", [item.asset_id for item in settings], type_=ARRAY(BigInteger))
+
+    owned = await db.execute(
+        select(Holding.asset_id)
+        .join(Account, Account.account_id == Holding.account_id)
+        .where(Account.user_id == user_id, Holding.asset_id == any_(asset_ids))
+        .distinct()
+    )
+    missing = {item.asset_id for item in settings} - set(owned.scalars().all())
+    if missing:
+        raise ValueError(f"Activos no encontrados en tus cuentas: {', '.join(map(str, sorted(missing)))}")
+
+    await db.execute(
+        delete(RebalanceSetting)
+        .where(RebalanceSetting.user_id == user_id, RebalanceSetting.asset_id != all_(asset_ids))
+    )
+
+    # Upsert: Si ya existe el % para ese user/asset, lo actualiza
+    await db.execute(
+        text("""
+            INSERT INTO rebalance_settings (user_id, asset_id, target_percentage, updated_at)
+            SELECT :user_id, s.asset_id, s.target_percentage, NOW()
+            FROM unnest(CAST(:asset_ids AS bigint[]), CAST(:targets AS numeric[])) AS s(asset_id, target_percentage)
+            ON CONFLICT ON CONSTRAINT uq_user_rebalance_asset
+            DO UPDATE SET target_percentage = EXCLUDED.target_percentage, updated_at = NOW()
+        """),
+        {
+            "user_id": user_id,
+            "asset_ids": [item.asset_id for item in settings],
+            "targets": [item.target_percentage for item in settings],
+        }
+    )
+
+    await db.commit()
+
+# Tipos de activo que se compran y venden en fracciones aunque se pida redondeo a acciones enteras
+FRACTIONAL_ASSET_TYPES = {"crypto"}
+
+async def _load_plan_positions(db: AsyncSession, user_id: int):
+    """
+    Activos del usuario con posición o con objetivo de rebalanceo: cantidad total (todas las cuentas),
+    último precio y % objetivo. Precios pasados a BASE_CURRENCY con el último tipo de cambio.
+    """
+    query = text("""
+        WITH positions AS (
+            SELECT h.asset_id, SUM(h.quantity) AS quantity
+            FROM holdings h
+            JOIN accounts ac ON ac.account_id = h.account_id
+            WHERE ac.user_id = :user_id
+            GROUP BY h.asset_id
+        ),
+        targets AS (
+            SELECT asset_id, target_percentage
+            FROM rebalance_settings
+            WHERE user_id = :user_id
+        )
+        SELECT
+            a.asset_id,
+            a.name AS asset_name,
+            a.ticker,
+            a.currency,
+            a.type,
+            COALESCE(p.quantity, 0) AS quantity,
+            COALESCE(t.target_percentage, 0) AS target_percentage,
+            lp.price
+        FROM positions p
+        FULL JOIN targets t ON t.asset_id = p.asset_id
+        JOIN assets a ON a.asset_id = COALESCE(p.asset_id, t.asset_id)
+        LEFT JOIN LATERAL (
+            SELECT price
+            FROM price_history
+            WHERE asset_id = a.asset_id
+            ORDER BY date DESC
+            LIMIT 1
+        ) lp ON TRUE
+        WHERE COALESCE(p.quantity, 0) > 0 OR COALESCE(t.target_percentage, 0) > 0
+        ORDER BY a.asset_id
+    """)
+    rows = (await db.execute(query, {"user_id": user_id})).mappings().all()
+    fx = await get_fx_matrix(db)
+    rates = fx.latest([row["currency"] for row in rows]) if rows else np.empty(0)
+    return rows, rates
+
+def compute_rebalance_trades(
+    quantities: np.ndarray,
+    prices: np.ndarray,
+    targets: np.ndarray,
+    cash: float = 0.0,
+    min_trade: float = 0.0,
+    whole_shares: bool = True,
+    allow_sells: bool = True,
+    fractional: np.ndarray | None = None
+):
+    """
+    Calcula, para todos los activos a la vez, las unidades a comprar (+) o vender (-)
+    para acercar la cartera a los pesos objetivo.
+
+    - targets: pesos objetivo (suman 1 sobre los activos con objetivo; el resto 0)
+    - cash: efectivo disponible además de la cartera; las compras nunca superan
+      cash + lo obtenido en ventas
+    - min_trade: las órdenes de menor importe se descartan
+    - whole_shares: redondea las unidades hacia cero (nunca se compra de más), salvo en
+      los activos marcados en `fractional` (p. ej. cripto)
+    - allow_sells: sin ventas, solo se reparte el efectivo entre los activos infraponderados
+
+    Los activos sin precio (NaN) no se operan. Devuelve el vector de unidades.
+    """
+    if fractional is None:
+        fractional = np.zeros(len(prices), dtype=bool)
+    tradable = ~np.isnan(prices)
+    whole = whole_shares & ~fractional
+    prices = np.where(tradable, prices, 0.0)
+    values = quantities * prices
+    total = values.sum() + cash
+
+    deltas = np.where(tradable, targets * total - values, 0.0)
+    if not allow_sells:
+        deltas = np.maximum(deltas, 0.0)
+    deltas[np.abs(deltas) < min_trade] = 0.0
+
+    def to_units(amounts):
+        units = np.divide(amounts, prices, out=np.zeros_like(amounts), where=prices > 0)
+        return np.where(whole, np.trunc(units), units)
+
+    units = to_units(deltas)
+    # No se vende más de lo que se tiene; un activo sin objetivo se vende entero (también la fracción)
+    units = np.maximum(units, -quantities)
+    units = np.where((targets == 0) & (deltas < 0), -quantities, units)
+    # Las ventas que tras redondear quedan bajo el mínimo no se hacen
+    units[(units < 0) & (np.abs(units * prices) < min_trade)] = 0.0
+
+    # Restricción de caja: si las compras superan el presupuesto se escalan por igual
+    sells = -np.minimum(units, 0) * prices
+    buys = np.maximum(units, 0) * prices
+    budget = cash + sells.sum()
+    if buys.sum() > budget > 0:
+        units = np.where(units > 0, to_units(buys * budget / buys.sum()), units)
+    elif budget <= 0:
+        units = np.minimum(units, 0)
+
+    # Al truncar a acciones enteras sobra caja: una pasada que completa los más infraponderados
+    if whole.any():
+        remaining = budget - (np.maximum(units, 0) * prices).sum()
+        gaps = deltas - units * prices
+        for i in np.argsort(-gaps):
+            if gaps[i] <= 0 or remaining <= 0:
+                break
+            if prices[i] <= 0 or units[i] < 0:
+                continue
+            extra = min(gaps[i], remaining) / prices[i]
+            extra = np.floor(extra) if whole[i] else extra
+            if extra > 0 and (units[i] + extra) * prices[i] >= min_trade:
+                units[i] += extra
+                remaining -= extra * prices[i]
+
+    # Tras escalar y redondear, una compra puede quedar por debajo del mínimo (quitarla solo libera caja)
+    units[(units > 0) & (units * prices < min_trade)] = 0.0
+    return units
+
+async def get_rebalance_plan(
+    db: AsyncSession,
+    user_id: int,
+    cash: float = 0.0,
+    min_trade: float = 0.0,
+    whole_shares: bool = True,
+    allow_sells: bool = True
+):
+    """
+    Plan de rebalanceo: posiciones actuales valoradas a último precio (BASE_CURRENCY),
+    pesos actuales y objetivo, y las órdenes de compra/venta para alcanzarlos.
+    """
+    rows, rates = await _load_plan_positions(db, user_id)
+    if not rows:
+        return {"total_value": 0.0, "cash_available": cash, "cash_used": 0.0, "cash_remaining": cash, "assets": []}
+
+    quantities = np.array([float(row["quantity"]) for row in rows])
+    prices = np.array([float(row["price"]) if row["price"] is not None else np.nan for row in rows]) * rates
+    targets = np.array([float(row["target_percentage"]) for row in rows]) / 100
+    fractional = np.array([row["type"] in FRACTIONAL_ASSET_TYPES for row in rows])
+
+    units = compute_rebalance_trades(
+        quantities, prices, targets, cash, min_trade, whole_shares, allow_sells, fractional
+    )
+
+    valued_prices = np.nan_to_num(prices)
+    values = quantities * valued_prices
+    trade_values = units * valued_prices
+    total = values.sum() + cash
+    post_values = values + trade_values
+    cash_used = float(trade_values.sum())
+
+    current_weights = values / total if total else np.zeros_like(values)
+    post_weights = post_values / total if total else np.zeros_like(values)
+
+    assets = []
+    for i, row in enumerate(rows):
+        assets.append({
+            "asset_id": row["asset_id"],
+            "asset_name": row["asset_name"],
+            "ticker": row["ticker"],
+            "price": None if np.isnan(prices[i]) else float(prices[i]),
+            "quantity": float(quantities[i]),
+            "current_value": float(values[i]),
+            "current_weight": float(current_weights[i]) * 100,
+            "target_weight": float(targets[i]) * 100,
+            "action": "buy" if units[i] > 0 else "sell" if units[i] < 0 else "hold",
+            "trade_quantity": float(abs(units[i])),
+            "trade_value": float(abs(trade_values[i])),
+            "post_trade_weight": float(post_weights[i]) * 100,
+        })
+
+    return {
+        "total_value": float(total),
+        "cash_available": cash,
+        "cash_used": cash_used,
+        "cash_remaining": cash - cash_used,
+        "assets": assets,
+    }
+
+# Estrategias del backtest -> cómo se eligen los días de rebalanceo
+BACKTEST_STRATEGIES = ("monthly", "quarterly", "threshold")
+# Días que se revisan de una vez buscando la siguiente desviación en la estrategia por umbral
+THRESHOLD_BLOCK_DAYS = 256
+
+def _calendar_rebalance_days(start: date, n_days: int, strategy: str) -> np.ndarray:
+    """Primer día de cada mes o trimestre dentro del rango (el primer día no cuenta)."""
+    months = (np.datetime64(start, "D") + np.arange(n_days)).astype("datetime64[M]").astype(int)
+    periods = months // 3 if strategy == "quarterly" else months
+    days = np.zeros(n_days, dtype=bool)
+    days[1:] = periods[1:] != periods[:-1]
+    return days
+
+def simulate_rebalance(
+    prices: np.ndarray,
+    targets: np.ndarray,
+    flows: np.ndarray,
+    rebalance_days: np.ndarray,
+    threshold: float | None = None
+):
+    """
+    Simula una cartera que invierte cada aportación según los pesos objetivo y se
+    rebalancea en los días marcados o, con `threshold`, cuando algún peso se desvía
+    más de ese tanto por uno de su objetivo.
+
+    - prices: matriz activo × día en BASE_CURRENCY (NaN antes del primer precio)
+    - targets: pesos objetivo de cada activo (suman 1)
+    - flows: aportación (+) o retirada (-) neta de cada día
+
+    Las unidades solo cambian en los días con evento (aportación o rebalanceo), así que
+    se opera únicamente esos días sobre el vector de activos y el valor diario sale de
+    una sola multiplicación matricial. Los activos sin precio todavía no se compran y
+    su peso se reparte entre el resto. Devuelve (valor diario, número de rebalanceos).
+    """
+    n_assets, n_days = prices.shape
+    available = ~np.isnan(prices)
+    prices = np.nan_to_num(prices)
+    # Pesos objetivo de cada día, repartidos entre los activos con precio
+    weights = targets[:, None] * available
+    weight_sums = weights.sum(axis=0)
+    weights = np.divide(weights, weight_sums, out=np.zeros_like(weights), where=weight_sums > 0)
+
+    units_at = np.zeros((n_days, n_assets))
+    cash_at = np.zeros(n_days)
+    changed = np.zeros(n_days, dtype=bool)
+    units = np.zeros(n_assets)
+    cash = 0.0
+    rebalances = 0
+
+    fixed_events = np.flatnonzero((flows != 0) | rebalance_days)
+    next_fixed = 0
+    day = fixed_events[0] if len(fixed_events) else n_days
+    rebalance = bool(rebalance_days[day]) if day < n_days else False
+
+    while day < n_days:
+        day_prices = prices[:, day]
+        held_value = units @ day_prices
+        cash += flows[day]
+        if cash < 0:
+            # Retirada: se vende a prorrata de lo que hay
+            scale = max(held_value + cash, 0.0) / held_value if held_value > 0 else 0.0
+            units *= scale
+            held_value *= scale
+            cash = 0.0
+
+        target = weights[:, day]
+        if target.any():
+            budget = held_value + cash if rebalance else cash
+            buy = np.divide(target * budget, day_prices, out=np.zeros(n_assets), where=day_prices > 0)
+            if rebalance:
+                rebalances += held_value > 0
+                units = buy
+            else:
+                units = units + buy
+            cash = 0.0
+
+        units_at[day], cash_at[day], changed[day] = units, cash, True
+
+        # Siguiente evento: el próximo día fijo o, por umbral, la primera desviación antes de él
+        while next_fixed < len(fixed_events) and fixed_events[next_fixed] <= day:
+            next_fixed += 1
+        next_day = fixed_events[next_fixed] if next_fixed < len(fixed_events) else n_days
+        rebalance = bool(rebalance_days[next_day]) if next_day < n_days else False
+
+        if threshold is not None and units.any():
+            for block_start in range(day + 1, next_day, THRESHOLD_BLOCK_DAYS):
+                block = slice(block_start, min(block_start + THRESHOLD_BLOCK_DAYS, next_day))
+                values = units[:, None] * prices[:, block]
+                totals = values.sum(axis=0) + cash
+                drift = np.abs(
+                    np.divide(values, totals, out=np.zeros_like(values), where=totals > 0) - weights[:, block]
+                ).max(axis=0)
+                breaches = np.flatnonzero(drift > threshold)
+                if len(breaches):
+                    next_day, rebalance = block_start + breaches[0], True
+                    break
+        day = next_day
+
+    # Unidades y caja vigentes cada día: las del último evento
+    last_event = np.maximum.accumulate(np.where(changed, np.arange(n_days), 0))
+    values = (units_at[last_event] * prices.T).sum(axis=1) + cash_at[last_event]
+    return values, int(rebalances)
+
+async def _load_backtest_prices(db: AsyncSession, user_id: int, start: date, n_days: int):
+    """
+    Activos con objetivo de rebalanceo y su matriz de precios diarios en BASE_CURRENCY
+    desde `start`. Cada activo arranca con su último precio anterior a `start`; los días
+    sin cotización llevan el último precio conocido.
+    """
+    targets_query = text("""
+        SELECT rs.asset_id, rs.target_percentage, a.currency
+        FROM rebalance_settings rs
+        JOIN assets a ON a.asset_id = rs.asset_id
+        WHERE rs.user_id = :user_id
+          AND rs.target_percentage > 0
+        ORDER BY rs.asset_id
+    """)
+    targets = (await db.execute(targets_query, {"user_id": user_id})).all()
+    if not targets:
+        return targets, np.empty((0, n_days))
+
+    prices_query = text("""
+        WITH wanted AS (
+            SELECT unnest(CAST(:asset_ids AS bigint[])) AS asset_id
+        ),
+        prices AS (
+            SELECT ph.asset_id, ph.date, ph.price
+            FROM price_history ph
+            WHERE ph.asset_id = ANY(CAST(:asset_ids AS bigint[]))
+              AND ph.date >= :start
+            UNION ALL
+            SELECT w.asset_id, lp.date, lp.price
+            FROM wanted w
+            JOIN LATERAL (
+                SELECT date, price
+                FROM price_history
+                WHERE asset_id = w.asset_id
+                  AND date < :start
+                ORDER BY date DESC
+                LIMIT 1
+            ) lp ON TRUE
         )
-        
-        # Upsert: Si ya existe el % para ese user/asset, lo actualiza
-        stmt = stmt.on_conflict_do_update(
-            constraint='uq_user_rebalance_asset',
-            set_={"target_percentage": item.target_percentage, "updated_at": func.now()}
+        SELECT DISTINCT ON (asset_id, GREATEST(date::date, CAST(:start AS date)))
+            asset_id,
+            GREATEST(date::date, CAST(:start AS date)) AS day,
+            price
+        FROM prices
+        ORDER BY asset_id, GREATEST(date::date, CAST(:start AS date)), date DESC
+    """)
+    asset_ids = [row.asset_id for row in targets]
+    rows = (await db.execute(prices_query, {"asset_ids": asset_ids, "start": start})).all()
+    rows = [row for row in rows if (row.day - start).days < n_days]
+
+    index = {asset_id: i for i, asset_id in enumerate(asset_ids)}
+    prices = np.full((len(asset_ids), n_days), np.nan)
+    prices[
+        [index[row.asset_id] for row in rows],
+        [(row.day - start).days for row in rows]
+    ] = [float(row.price) for row in rows]
+
+    # Relleno hacia delante; antes del primer precio se queda en NaN (el activo aún no existe)
+    last_known = np.where(~np.isnan(prices), np.arange(n_days), 0)
+    np.maximum.accumulate(last_known, axis=1, out=last_known)
+    prices = prices[np.arange(len(asset_ids))[:, None], last_known]
+
+    fx = await get_fx_matrix(db)
+    return targets, prices * fx.grid([row.currency for row in targets], start, n_days)
+
+async def get_rebalance_backtest(db: AsyncSession, user_id: int, strategy: str = "monthly", threshold: float = 5.0):
+    """
+    Qué habría pasado con la estrategia de rebalanceo guardada: mismas aportaciones
+    (capital invertido) que la cartera real, invertidas según los % objetivo y
+    rebalanceadas cada mes, cada trimestre o al desviarse `threshold` puntos.
+    Se compara día a día con la serie de crecimiento real.
+    """
+    if strategy not in BACKTEST_STRATEGIES:
+        raise ValueError(f"Strategy must be one of: {', '.join(BACKTEST_STRATEGIES)}")
+
+    growth = await get_portfolio_growth(db, user_id)
+    empty = {"strategy": strategy, "rebalance_count": 0, "final_value": 0.0, "real_final_value": 0.0,
+             "capital_invertido": 0.0, "history": []}
+    if not growth:
+        return empty
+
+    start, n_days = growth[0]["date"], len(growth)
+    targets, prices = await _load_backtest_prices(db, user_id, start, n_days)
+    if not targets:
+        raise ValueError("No hay porcentajes objetivo guardados")
+
+    capital = np.array([point["capital_invertido"] for point in growth])
+    flows = np.diff(capital, prepend=0.0)
+    weights = np.array([float(row.target_percentage) for row in targets])
+    weights /= weights.sum()
+
+    if strategy == "threshold":
+        values, rebalances = simulate_rebalance(
+            prices, weights, flows, np.zeros(n_days, dtype=bool), threshold / 100
         )
-        
-        await db.execute(stmt)
-    
-    await db.commit()
\ No newline at end of file
+    else:
+        values, rebalances = simulate_rebalance(
+            prices, weights, flows, _calendar_rebalance_days(start, n_days, strategy)
+        )
+
+    return {
+        **empty,
+        "rebalance_count": rebalances,
+        "final_value": round(float(values[-1]), 6),
+        "real_final_value": growth[-1]["total_value"],
+        "capital_invertido": growth[-1]["capital_invertido"],
+        "history": [
+            {**point, "simulated_value": round(value, 6)}
+            for point, value in zip(growth, values.tolist())
+        ],
+    }
@@ -0,0 +1,224 @@
+from datetime import date
+from sqlalchemy import text, cast, func, Date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from app.models import Transaction, TransactionMonthlyRollup
+from app.services.fx_service import get_fx_matrix
+
+def rollup_category(category: str | None) -> str:
+    # La categoría forma parte de la clave: las transacciones sin categoría van a 'General'
+    return category if category is not None else "General"
+
+async def apply_transaction_to_rollup(db: AsyncSession, transaction: Transaction, direction: int = 1):
+    """
+    Suma una transacción nueva a su fila (cuenta, mes, categoría, tipo) de transaction_monthly_rollup
+    (con direction=-1 la resta, al desactivarla). Incremento atómico con upsert, como cash_balances.
+    No hace commit.
+    """
+    if direction == 1 and transaction.is_active is False:
+        return
+
+    stmt = insert(TransactionMonthlyRollup).values(
+        account_id=transaction.account_id,
+        # Mismo corte de mes que la reconstrucción en SQL
+        month=cast(func.date_trunc('month', transaction.date), Date),
+        category=rollup_category(transaction.category),
+        type=transaction.type,
+        total=direction * transaction.amount,
+        transaction_count=direction
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['account_id', 'month', 'category', 'type'],
+            set_={
+                "total": TransactionMonthlyRollup.total + stmt.excluded.total,
+                "transaction_count": TransactionMonthlyRollup.transaction_count + stmt.excluded.transaction_count,
+                "updated_at": text("NOW()"),
+            }
+        )
+    )
+
+async def apply_transactions_to_rollup(db: AsyncSession, transaction_ids: list[int]):
+    """
+    Versión por lotes de apply_transaction_to_rollup para importaciones:
+    agrega en SQL las transacciones recién insertadas y actualiza el rollup en una sentencia.
+    No hace commit.
+    """
+    if not transaction_ids:
+        return
+    await db.execute(
+        text("""
+            INSERT INTO transaction_monthly_rollup (account_id, month, category, type, total, transaction_count)
+            SELECT
+                account_id,
+                date_trunc('month', date)::date,
+                COALESCE(category, 'General'),
+                type,
+                SUM(amount),
+                COUNT(*)
+            FROM transactions
+            WHERE transaction_id = ANY(:transaction_ids)
+              AND is_active = TRUE
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (account_id, month, category, type) DO UPDATE SET
+                total = transaction_monthly_rollup.total + EXCLUDED.total,
+                transaction_count = transaction_monthly_rollup.transaction_count + EXCLUDED.transaction_count,
+                updated_at = NOW()
+        """),
+        {"transaction_ids": transaction_ids}
+    )
+
+async def reconcile_transaction_rollup(db: AsyncSession, fix: bool = False):
+    """
+    Compara transaction_monthly_rollup con la agregación de las transacciones activas.
+    Devuelve las filas que no cuadran; con fix=True además las corrige (sin commit).
+    """
+    query = text("""
+        WITH ledger AS (
+            SELECT
+                account_id,
+                date_trunc('month', date)::date AS month,
+                COALESCE(category, 'General') AS category,
+                type,
+                SUM(amount) AS total,
+                COUNT(*) AS transaction_count
+            FROM transactions
+            WHERE is_active = TRUE
+            GROUP BY 1, 2, 3, 4
+        )
+        SELECT
+            COALESCE(l.account_id, r.account_id) AS account_id,
+            COALESCE(l.month, r.month) AS month,
+            COALESCE(l.category, r.category) AS category,
+            COALESCE(l.type, r.type) AS type,
+            COALESCE(l.total, 0) AS ledger_total,
+            COALESCE(l.transaction_count, 0) AS ledger_count,
+            r.total AS stored_total,
+            r.transaction_count AS stored_count
+        FROM ledger l
+        FULL JOIN transaction_monthly_rollup r
+            ON r.account_id = l.account_id
+           AND r.month = l.month
+           AND r.category = l.category
+           AND r.type = l.type
+        WHERE COALESCE(r.total, 0) <> COALESCE(l.total, 0)
+           OR COALESCE(r.transaction_count, 0) <> COALESCE(l.transaction_count, 0)
+        ORDER BY 1, 2, 3, 4
+    """)
+    result = await db.execute(query)
+    mismatches = result.mappings().all()
+
+    if fix and mismatches:
+        stmt = insert(TransactionMonthlyRollup)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['account_id', 'month', 'category', 'type'],
+                set_={
+                    "total": stmt.excluded.total,
+                    "transaction_count": stmt.excluded.transaction_count,
+                    "updated_at": text("NOW()"),
+                }
+            ),
+            [
+                {
+                    "account_id": row["account_id"],
+                    "month": row["month"],
+                    "category": row["category"],
+                    "type": row["type"],
+                    "total": row["ledger_total"],
+                    "transaction_count": row["ledger_count"],
+                }
+                for row in mismatches
+            ]
+        )
+
+    return mismatches
+
+def _month_starts(months: int) -> list[date]:
+    # Primer día de cada uno de los últimos `months` meses, del más antiguo al actual
+    today = date.today()
+    index = today.year * 12 + today.month - 1
+    return [date((i // 12), (i % 12) + 1, 1) for i in range(index - months + 1, index + 1)]
+
+async def _rollup_totals(db: AsyncSession, user_id: int, month_list: list[date], account_id: int | None, type: str | None = None):
+    """
+    Lee del rollup los totales por mes, categoría y tipo de los meses de `month_list`, en BASE_CURRENCY.
+    Cada total se convierte con el tipo de cambio del primer día de su mes.
+    """
+    query = text("""
+        SELECT r.month, r.category, r.type, a.currency, SUM(r.total) AS total
+        FROM transaction_monthly_rollup r
+        JOIN accounts a ON a.account_id = r.account_id
+        WHERE a.user_id = :user_id
+          AND r.month BETWEEN :first_month AND :last_month
+          AND r.transaction_count > 0
+          AND (CAST(:account_id AS bigint) IS NULL OR r.account_id = :account_id)
+          AND (CAST(:type AS varchar) IS NULL OR r.type = :type)
+        GROUP BY r.month, r.category, r.type, a.currency
+    """)
+    result = await db.execute(query, {
+        "user_id": user_id,
+        "first_month": month_list[0],
+        "last_month": month_list[-1],
+        "account_id": account_id,
+        "type": type,
+    })
+    rows = result.all()
+    if not rows:
+        return []
+
+    fx = await get_fx_matrix(db)
+    rates = fx.on([row.currency for row in rows], [row.month for row in rows]).tolist()
+    return [
+        (row.month, row.category, row.type, float(row.total) * rate)
+        for row, rate in zip(rows, rates)
+    ]
+
+def _change_pct(current: float, previous: float):
+    return round((current - previous) / previous * 100, 2) if previous else None
+
+async def get_monthly_trend(db: AsyncSession, user_id: int, months: int = 12, account_id: int | None = None):
+    """
+    Ingresos, gastos y neto de cada uno de los últimos `months` meses (también los vacíos),
+    con la variación porcentual respecto al mes anterior. Solo lee transaction_monthly_rollup.
+    """
+    month_list = _month_starts(months)
+    totals = {month: {"income": 0.0, "expense": 0.0} for month in month_list}
+    for month, _, type, amount in await _rollup_totals(db, user_id, month_list, account_id):
+        totals[month][type] += amount
+
+    trend = []
+    previous = None
+    for month in month_list:
+        income, expense = totals[month]["income"], totals[month]["expense"]
+        point = {"month": month, "income": income, "expense": expense, "net": income - expense}
+        point["income_change_pct"] = _change_pct(income, previous["income"]) if previous else None
+        point["expense_change_pct"] = _change_pct(expense, previous["expense"]) if previous else None
+        trend.append(point)
+        previous = point
+    return trend
+
+async def get_category_trend(
+    db: AsyncSession,
+    user_id: int,
+    type: str = "expense",
+    months: int = 12,
+    account_id: int | None = None
+):
+    """
+    Serie mensual por categoría (ingresos o gastos) de los últimos `months` meses,
+    con los meses vacíos a cero. Categorías ordenadas por total del periodo. Solo lee el rollup.
+    """
+    month_list = _month_starts(months)
+    position = {month: i for i, month in enumerate(month_list)}
+
+    categories = {}
+    for month, category, _, amount in await _rollup_totals(db, user_id, month_list, account_id, type):
+        categories.setdefault(category, [0.0] * len(month_list))[position[month]] += amount
+
+    series = [
+        {"category": category, "totals": totals, "total": sum(totals)}
+        for category, totals in categories.items()
+    ]
+    series.sort(key=lambda entry: -entry["total"])
+    return {"months": month_list, "categories": series}
@@ -1,42 +1,92 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, tuple_, true
 from app.models import Operation, Asset, Account, PriceHistory
+from app.core.response_cache import notify_price_update
 from app.schemas.operation import OperationCreate
+from app.core.pagination import DEFAULT_PAGE_SIZE, encode_cursor, decode_cursor
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import insert
+from app.services.performance_service import invalidate_performance_cache
+from app.services.holdings_service import apply_operation_to_holdings
 
 
-async def get_trade_history(db: AsyncSession, user_id: int):
+async def get_trade_history(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    account_id: int | None = None,
+    asset_id: int | None = None,
+    operation_type: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None
+):
     """
-    Obtiene el historial completo de operaciones de un usuario
+    Obtiene una página del historial de operaciones de un usuario, de la más reciente a la más antigua.
     Incluye: ticker, isin, nombre, currency, fecha, cantidad, precio, tipo, comisiones, cuenta
+
+    Paginación por cursor (keyset) sobre (date, operation_id): cada página continúa después de la
+    última fila de la anterior, así el coste no crece con la profundidad como con OFFSET.
+    Por cada cuenta del usuario se leen como mucho `limit` filas del índice
+    idx_operations_account_date (LATERAL) y se mezclan; devuelve (operaciones, siguiente cursor).
     """
-    
+    filters = [Operation.account_id == Account.account_id]
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        filters.append(tuple_(Operation.date, Operation.operation_id) < tuple_(cursor_date, cursor_id))
+    if asset_id is not None:
+        filters.append(Operation.asset_id == asset_id)
+    if operation_type is not None:
+        filters.append(Operation.operation_type == operation_type)
+    if date_from is not None:
+        filters.append(Operation.date >= date_from)
+    if date_to is not None:
+        filters.append(Operation.date <= date_to)
+
+    per_account = (
+        select(Operation)
+        .where(*filters)
+        .order_by(Operation.date.desc(), Operation.operation_id.desc())
+        .limit(limit + 1)
+        .lateral()
+    )
+
+    account_filters = [Account.user_id == user_id]
+    if account_id is not None:
+        account_filters.append(Account.account_id == account_id)
+
     stmt = (
         select(
+            per_account.c.operation_id,
             Asset.ticker,
             Asset.isin,
             Asset.name.label("asset_name"),
             Asset.currency,
-            Operation.date,
-            Operation.quantity,
-            Operation.price,
-            Operation.operation_type,
-            Operation.fees,
+            per_account.c.date,
+            per_account.c.quantity,
+            per_account.c.price,
+            per_account.c.operation_type,
+            per_account.c.fees,
             Account.name.label("account_name")
         )
-        .select_from(Operation)
-        .join(Asset, Operation.asset_id == Asset.asset_id)
-        .join(Account, Operation.account_id == Account.account_id)
-        .where(Account.user_id == user_id)
-        .order_by(Operation.date.desc(), Operation.operation_id.desc())
-        .limit(100)
+        .select_from(Account)
+        .join(per_account, true())
+        .join(Asset, per_account.c.asset_id == Asset.asset_id)
+        .where(*account_filters)
+        .order_by(per_account.c.date.desc(), per_account.c.operation_id.desc())
+        .limit(limit + 1)
     )
-    
+
     result = await db.execute(stmt)
     trades = result.all()
-    
-    return trades
+
+    # Se pide una fila de más para saber si hay otra página
+    next_cursor = None
+    if len(trades) > limit:
+        trades = trades[:limit]
+        next_cursor = encode_cursor(trades[-1].date, trades[-1].operation_id)
+
+    return trades, next_cursor
 
 async def create_operation(db: AsyncSession, operation_data: OperationCreate, user_id: int) -> Operation:
     # Verificar que la cuenta pertenece al usuario
@@ -61,6 +111,9 @@ async def create_operation(db: AsyncSession, operation_data: OperationCreate, us
     # Crear operación
     db_operation = Operation(**operation_data.model_dump())
     db.add(db_operation)
+
+    # Mantener la posición materializada en la misma transacción
+    await apply_operation_to_holdings(db, db_operation)
     
     # Preparar el Upsert
     stmt_upsert = insert(PriceHistory).values(
@@ -73,5 +126,10 @@ async def create_operation(db: AsyncSession, operation_data: OperationCreate, us
     )
 
     await db.execute(stmt_upsert)
+    # El precio es de todos: invalida las respuestas cacheadas de cualquier usuario con el activo
+    await notify_price_update(db)
+
+    # Una operación con fecha pasada invalida las métricas precalculadas
+    await invalidate_performance_cache(db, user_id, operation_data.date)
     
     return db_operation, asset
\ No newline at end of file
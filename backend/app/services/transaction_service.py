@@ -1,11 +1,20 @@
 from app.models.transaction import Transaction
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, text, tuple_, true
 from app.models.account import Account
 from app.schemas.transaction import TransactionCreate
+from app.core.pagination import DEFAULT_PAGE_SIZE, encode_cursor, decode_cursor
+from app.services.fx_service import get_fx_matrix
+from datetime import datetime
+from app.services.performance_service import invalidate_performance_cache
+from app.services.cash_service import apply_transaction_to_balance
+from app.services.spending_service import apply_transaction_to_rollup
 from fastapi import HTTPException
 
-async def create_transaction_from_operation(db: AsyncSession, operation, asset_name: str):
+def operation_cash_values(operation, asset_name: str) -> dict:
+    """
+    Columnas de la transacción de efectivo que genera una operación.
+    """
     # Lógica de efectivo: 
     # BUY -> Gasto (precio * cant + fees)
     # SELL -> Ingreso (precio * cant - fees)
@@ -14,16 +23,21 @@ async def create_transaction_from_operation(db: AsyncSession, operation, asset_n
     net_amount = operation.quantity * operation.price
     total_amount = (net_amount + operation.fees) if is_buy else (net_amount - operation.fees)
     
-    new_transaction = Transaction(
-        account_id=operation.account_id,
-        category="Inversión",
-        date=operation.date,
-        amount=total_amount,
-        type="expense" if is_buy else "income",
-        description=f"{operation.operation_type.upper()} {operation.quantity} {asset_name}"
-    )
+    return {
+        "account_id": operation.account_id,
+        "category": "Inversión",
+        "date": operation.date,
+        "amount": total_amount,
+        "type": "expense" if is_buy else "income",
+        "description": f"{operation.operation_type.upper()} {operation.quantity} {asset_name}",
+    }
+
+async def create_transaction_from_operation(db: AsyncSession, operation, asset_name: str):
+    new_transaction = Transaction(**operation_cash_values(operation, asset_name))
     
     db.add(new_transaction)
+    await apply_transaction_to_balance(db, new_transaction)
+    await apply_transaction_to_rollup(db, new_transaction)
     return new_transaction
 
 
@@ -50,17 +64,161 @@ async def create_transaction(db: AsyncSession, transaction_data: TransactionCrea
     )
     
     db.add(new_transaction)
+    await apply_transaction_to_balance(db, new_transaction)
+    await apply_transaction_to_rollup(db, new_transaction)
+    await invalidate_performance_cache(db, user_id, transaction_data.date)
     await db.commit()
     await db.refresh(new_transaction)
     return new_transaction
 
-async def get_user_transactions(db: AsyncSession, user_id: int):
-    # Join con accounts para asegurar que solo vemos lo del usuario
+async def deactivate_transaction(db: AsyncSession, transaction_id: int, user_id: int):
+    """
+    Baja lógica de una transacción del usuario (is_active = FALSE).
+    Resta su importe de cash_balances y de transaction_monthly_rollup en la misma transacción.
+    Las transacciones generadas por operaciones (categoría 'Inversión') no se pueden dar de baja aquí.
+    """
     stmt = (
         select(Transaction)
         .join(Account)
-        .where(Account.user_id == user_id)
-        .order_by(Transaction.date.desc())
+        .where(Transaction.transaction_id == transaction_id, Account.user_id == user_id)
+        .with_for_update(of=Transaction)
+    )
+    result = await db.execute(stmt)
+    transaction = result.scalar_one_or_none()
+
+    if not transaction:
+        raise HTTPException(status_code=404, detail="Transacción no encontrada o no pertenece al usuario")
+    if transaction.category == "Inversión":
+        raise HTTPException(status_code=400, detail="Las transacciones de una operación no se pueden eliminar")
+    if transaction.is_active is False:
+        return transaction
+
+    await apply_transaction_to_balance(db, transaction, direction=-1)
+    await apply_transaction_to_rollup(db, transaction, direction=-1)
+    transaction.is_active = False
+    await invalidate_performance_cache(db, user_id, transaction.date)
+    await db.commit()
+    return transaction
+
+async def get_user_transactions(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    account_id: int | None = None,
+    category: str | None = None,
+    type: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None
+):
+    """
+    Obtiene una página de las transacciones del usuario, de la más reciente a la más antigua.
+
+    Paginación por cursor (keyset) sobre (date, transaction_id), igual que el historial de operaciones:
+    por cada cuenta del usuario se leen como mucho `limit` filas de idx_transactions_account_date
+    (LATERAL) y se mezclan. Devuelve (transacciones, siguiente cursor).
+    """
+    filters = [Transaction.account_id == Account.account_id, Transaction.is_active.is_(True)]
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        filters.append(tuple_(Transaction.date, Transaction.transaction_id) < tuple_(cursor_date, cursor_id))
+    if category is not None:
+        filters.append(Transaction.category == category)
+    if type is not None:
+        filters.append(Transaction.type == type)
+    if date_from is not None:
+        filters.append(Transaction.date >= date_from)
+    if date_to is not None:
+        filters.append(Transaction.date <= date_to)
+
+    per_account = (
+        select(Transaction)
+        .where(*filters)
+        .order_by(Transaction.date.desc(), Transaction.transaction_id.desc())
+        .limit(limit + 1)
+        .lateral()
+    )
+
+    account_filters = [Account.user_id == user_id]
+    if account_id is not None:
+        account_filters.append(Account.account_id == account_id)
+
+    stmt = (
+        select(per_account)
+        .select_from(Account)
+        .join(per_account, true())
+        .where(*account_filters)
+        .order_by(per_account.c.date.desc(), per_account.c.transaction_id.desc())
+        .limit(limit + 1)
     )
     result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    transactions = result.all()
+
+    # Se pide una fila de más para saber si hay otra página
+    next_cursor = None
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        next_cursor = encode_cursor(transactions[-1].date, transactions[-1].transaction_id)
+
+    return transactions, next_cursor
+
+async def get_transaction_summary(
+    db: AsyncSession,
+    user_id: int,
+    account_id: int | None = None,
+    type: str | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None
+):
+    """
+    Totales de las transacciones del usuario por mes, categoría y tipo, agregados en la base de datos.
+    La suma se hace por divisa de la cuenta y cada total se pasa a BASE_CURRENCY
+    con el tipo de cambio del primer día del mes.
+    """
+    query = text("""
+        SELECT
+            date_trunc('month', t.date)::date AS month,
+            COALESCE(t.category, 'General') AS category,
+            t.type,
+            a.currency,
+            SUM(t.amount) AS total,
+            COUNT(*) AS transaction_count
+        FROM transactions t
+        JOIN accounts a ON a.account_id = t.account_id
+        WHERE a.user_id = :user_id
+          AND t.is_active = TRUE
+          AND (CAST(:account_id AS bigint) IS NULL OR t.account_id = :account_id)
+          AND (CAST(:type AS varchar) IS NULL OR t.type = :type)
+          AND (CAST(:date_from AS timestamptz) IS NULL OR t.date >= :date_from)
+          AND (CAST(:date_to AS timestamptz) IS NULL OR t.date <= :date_to)
+        GROUP BY 1, 2, 3, 4
+    """)
+    result = await db.execute(query, {
+        "user_id": user_id,
+        "account_id": account_id,
+        "type": type,
+        "date_from": date_from,
+        "date_to": date_to,
+    })
+    rows = result.all()
+    if not rows:
+        return []
+
+    fx = await get_fx_matrix(db)
+    rates = fx.on([row.currency for row in rows], [row.month for row in rows]).tolist()
+
+    # Varias divisas pueden caer en el mismo (mes, categoría, tipo)
+    summary = {}
+    for row, rate in zip(rows, rates):
+        entry = summary.setdefault((row.month, row.category, row.type), {
+            "month": row.month,
+            "category": row.category,
+            "type": row.type,
+            "total": 0.0,
+            "transaction_count": 0,
+        })
+        entry["total"] += float(row.total) * rate
+        entry["transaction_count"] += row.transaction_count
+
+    # Meses más recientes primero; dentro de cada mes, por tipo e importe descendente
+    return sorted(summary.values(), key=lambda entry: (-entry["month"].toordinal(), entry["type"], -entry["total"]))
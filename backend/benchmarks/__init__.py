@@ -0,0 +1 @@
+"""Benchmarks de la API: generador de datos sintéticos y harness de latencia (python -m benchmarks.run)."""
@@ -0,0 +1,267 @@
+"""
+Generador de datos sintéticos reproducibles (misma semilla, mismos datos) para los benchmarks.
+
+Crea N usuarios × M cuentas con K operaciones y K transacciones por cuenta repartidas en Y años,
+sobre un catálogo de activos con precios diarios (paseo aleatorio) y tipos de cambio USD.
+Las tablas base se cargan con COPY; las derivadas (holdings, lotes, saldos de caja y rollup
+mensual) se calculan con las mismas funciones que usa la aplicación.
+"""
+import asyncio
+import random
+import time
+from collections import namedtuple
+from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, ROUND_DOWN
+from pathlib import Path
+
+import asyncpg
+import numpy as np
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.engine import make_url
+
+from app.core.config import BASE_CURRENCY
+from app.core.database import AsyncSessionLocal
+from app.services.lot_service import replay_operations
+from app.services.cash_service import reconcile_cash_balances
+from app.services.spending_service import reconcile_transaction_rollup
+
+ALEMBIC_INI = Path(__file__).resolve().parents[1] / "alembic.ini"
+
+# Hash de "hashed_password" (el mismo que el usuario demo): todos los usuarios pueden hacer login
+PASSWORD_HASH = "$2b$12$1fcoQ5bToypnjRbAYlMNBOfxAd.uwdvZLyQF9yMvZI1Cyj6KfRFqS"
+PASSWORD = "hashed_password"
+
+ASSET_TYPES = ["stock", "stock", "etf", "fund", "crypto", "bond", "reit"]
+THEMES = ["Global Equity", "Emerging Markets", "Tech", "Dividend", "Fixed Income", None]
+ACCOUNT_TYPES = ["broker", "bank", "crypto"]
+EXPENSE_CATEGORIES = ["Alimentación", "Transporte", "Ocio", "Vivienda", "Suscripciones", "Inversión"]
+INCOME_CATEGORIES = ["Salario", "Dividendos", "Inversión"]
+
+# Usuarios que se generan y cargan de una vez (acota la memoria en los tamaños grandes)
+USER_BATCH = 20
+
+@dataclass(frozen=True)
+class DatasetSize:
+    users: int
+    accounts: int
+    operations: int
+    years: int
+    assets: int = 40
+
+# Tamaños predefinidos: operaciones y transacciones son por cuenta
+DATASET_SIZES = {
+    "small": DatasetSize(users=10, accounts=3, operations=100, years=2),
+    "medium": DatasetSize(users=50, accounts=4, operations=500, years=5),
+    "large": DatasetSize(users=100, accounts=5, operations=2000, years=10, assets=80),
+}
+
+GeneratedOperation = namedtuple(
+    "GeneratedOperation",
+    "operation_id asset_id account_id date quantity price fees operation_type"
+)
+
+def _money(value: float) -> Decimal:
+    return Decimal(f"{value:.6f}")
+
+def _at(start: date, day: int, hour: int = 0) -> datetime:
+    return datetime(start.year, start.month, start.day, hour, tzinfo=timezone.utc) + timedelta(days=day)
+
+def asyncpg_dsn(database_url: str) -> str:
+    """URL de SQLAlchemy (postgresql+asyncpg://...) a DSN de asyncpg."""
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+class _Market:
+    """Catálogo de activos con su serie diaria de precios y la de tipos de cambio USD."""
+
+    def __init__(self, rng: random.Random, size: DatasetSize, start: date, n_days: int):
+        np_rng = np.random.default_rng(rng.randrange(2**32))
+        self.start = start
+        self.n_days = n_days
+        self.assets = []
+        self.prices = {}
+        for asset_id in range(1, size.assets + 1):
+            asset_type = ASSET_TYPES[asset_id % len(ASSET_TYPES)]
+            currency = "USD" if rng.random() < 0.3 else BASE_CURRENCY
+            self.assets.append((
+                asset_id, f"BENCH{asset_id:04d}", f"XX{asset_id:010d}", f"Bench asset {asset_id}",
+                currency, THEMES[asset_id % len(THEMES)], asset_type
+            ))
+            volatility = 0.04 if asset_type == "crypto" else 0.012
+            returns = np_rng.normal(0.0003, volatility, n_days)
+            self.prices[asset_id] = rng.uniform(10, 500) * np.exp(np.cumsum(returns))
+        self.crypto = {asset[0] for asset in self.assets if asset[6] == "crypto"}
+        self.fx = 0.9 * np.exp(np.cumsum(np_rng.normal(0, 0.004, n_days)))
+
+    def price_rows(self):
+        # Las criptomonedas cotizan todos los días; el resto, de lunes a viernes
+        for asset_id, series in self.prices.items():
+            for day, price in enumerate(series.tolist()):
+                moment = _at(self.start, day)
+                if asset_id in self.crypto or moment.weekday() < 5:
+                    yield (asset_id, moment, _money(price))
+
+    def fx_rows(self):
+        if BASE_CURRENCY == "USD":
+            return []
+        return [("USD", self.start + timedelta(days=day), Decimal(f"{rate:.10f}")) for day, rate in enumerate(self.fx.tolist())]
+
+class _Ids:
+    def __init__(self):
+        self.account = 0
+        self.operation = 0
+        self.transaction = 0
+
+def _user_rows(rng: random.Random, size: DatasetSize, market: _Market, user_id: int, ids: _Ids):
+    """Cuentas, operaciones, transacciones y objetivos de rebalanceo de un usuario."""
+    accounts, operations, transactions = [], [], []
+    asset_ids = [asset[0] for asset in market.assets]
+    for n in range(size.accounts):
+        ids.account += 1
+        account_id = ids.account
+        currency = "USD" if rng.random() < 0.2 else BASE_CURRENCY
+        accounts.append((account_id, user_id, f"Cuenta {n + 1}", ACCOUNT_TYPES[n % len(ACCOUNT_TYPES)], currency, True))
+
+        # Operaciones: compras y ventas de parte de la posición, siempre sin vender más de lo que hay
+        portfolio = rng.sample(asset_ids, k=min(len(asset_ids), rng.randint(3, 12)))
+        held = dict.fromkeys(portfolio, Decimal("0"))
+        for day in sorted(rng.randrange(market.n_days) for _ in range(size.operations)):
+            asset_id = rng.choice(portfolio)
+            price = _money(market.prices[asset_id][day])
+            if held[asset_id] > 0 and rng.random() < 0.3:
+                operation_type = "sell"
+                quantity = (held[asset_id] * Decimal(str(rng.uniform(0.1, 1)))).quantize(Decimal("0.000001"), ROUND_DOWN)
+                if quantity <= 0:
+                    continue
+                held[asset_id] -= quantity
+            else:
+                operation_type = "buy"
+                quantity = (Decimal(str(rng.uniform(100, 3000))) / price).quantize(Decimal("0.000001"), ROUND_DOWN)
+                if quantity <= 0:
+                    continue
+                held[asset_id] += quantity
+            ids.operation += 1
+            operations.append(GeneratedOperation(
+                ids.operation, asset_id, account_id, _at(market.start, day, 12),
+                quantity, price, _money(rng.uniform(0, 5)), operation_type
+            ))
+
+        # Transacciones: una aportación inicial y después ingresos y gastos variados
+        for i, day in enumerate(sorted(rng.randrange(market.n_days) for _ in range(size.operations))):
+            if i == 0:
+                row = ("Aportación", _money(rng.uniform(5000, 50000)), "income")
+            elif rng.random() < 0.25:
+                row = (rng.choice(INCOME_CATEGORIES), _money(rng.uniform(50, 3000)), "income")
+            else:
+                row = (rng.choice(EXPENSE_CATEGORIES), _money(rng.uniform(5, 800)), "expense")
+            ids.transaction += 1
+            transactions.append((
+                ids.transaction, account_id, row[0], _at(market.start, day, rng.randrange(24)),
+                row[1], row[2], f"Movimiento {ids.transaction}", rng.random() >= 0.02
+            ))
+
+    # Objetivos de rebalanceo sobre algunos activos con los que ha operado (suman 100)
+    traded = sorted({op.asset_id for op in operations})
+    targets = rng.sample(traded, k=min(len(traded), 5))
+    rebalance = []
+    for i, asset_id in enumerate(targets):
+        share = 100 // len(targets) + (100 % len(targets) if i == 0 else 0)
+        rebalance.append((user_id, asset_id, Decimal(share)))
+    return accounts, operations, transactions, rebalance
+
+async def _copy(conn, table: str, columns: list[str], records):
+    records = list(records)
+    if records:
+        await conn.copy_records_to_table(table, records=records, columns=columns)
+    return len(records)
+
+def _upgrade_schema(database_url: str):
+    # Mismo esquema que la aplicación: todas las migraciones (el env.py de Alembic abre su propio bucle)
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+    command.upgrade(config, "head")
+
+async def _reset_schema(conn, database_url: str):
+    await conn.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+    await asyncio.to_thread(_upgrade_schema, database_url)
+
+async def load_dataset(database_url: str, size: DatasetSize, seed: int) -> dict:
+    """
+    Vacía la base de datos de `database_url`, crea el esquema (migraciones de Alembic) y carga un conjunto de datos
+    generado con `seed`. Devuelve el número de filas de cada tabla y los segundos de carga.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    n_days = size.years * 365
+    start = date.today() - timedelta(days=n_days - 1)
+    market = _Market(rng, size, start, n_days)
+    ids = _Ids()
+    counts = dict.fromkeys(
+        ["users", "accounts", "assets", "price_history", "fx_rates", "operations",
+         "transactions", "rebalance_settings", "tax_lots", "lot_realizations", "holdings"], 0
+    )
+
+    conn = await asyncpg.connect(asyncpg_dsn(database_url))
+    try:
+        await _reset_schema(conn, database_url)
+        counts["assets"] = await _copy(conn, "assets", ["asset_id", "ticker", "isin", "name", "currency", "theme", "type"], market.assets)
+        counts["price_history"] = await _copy(conn, "price_history", ["asset_id", "date", "price"], market.price_rows())
+        counts["fx_rates"] = await _copy(conn, "fx_rates", ["currency", "date", "rate"], market.fx_rows())
+
+        for first_user in range(1, size.users + 1, USER_BATCH):
+            users, accounts, operations, transactions, rebalance = [], [], [], [], []
+            for user_id in range(first_user, min(first_user + USER_BATCH, size.users + 1)):
+                users.append((user_id, f"bench{user_id}@example.com", PASSWORD_HASH))
+                rows = _user_rows(rng, size, market, user_id, ids)
+                accounts += rows[0]
+                operations += rows[1]
+                transactions += rows[2]
+                rebalance += rows[3]
+
+            # Lotes y posiciones con la misma reconstrucción que rebuild_holdings
+            lots, realizations, positions = replay_operations(operations)
+
+            counts["users"] += await _copy(conn, "users", ["user_id", "email", "password_hash"], users)
+            counts["accounts"] += await _copy(conn, "accounts", ["account_id", "user_id", "name", "type", "currency", "is_active"], accounts)
+            counts["operations"] += await _copy(conn, "operations", list(GeneratedOperation._fields), operations)
+            counts["transactions"] += await _copy(
+                conn, "transactions",
+                ["transaction_id", "account_id", "category", "date", "amount", "type", "description", "is_active"],
+                transactions
+            )
+            counts["rebalance_settings"] += await _copy(conn, "rebalance_settings", ["user_id", "asset_id", "target_percentage"], rebalance)
+            lot_columns = ["operation_id", "account_id", "asset_id", "open_date", "quantity", "cost_basis", "remaining_quantity", "remaining_cost"]
+            counts["tax_lots"] += await _copy(conn, "tax_lots", lot_columns, [tuple(lot[c] for c in lot_columns) for lot in lots])
+            realization_columns = ["sell_operation_id", "lot_operation_id", "account_id", "asset_id", "date", "quantity", "proceeds", "cost", "realized_gain"]
+            counts["lot_realizations"] += await _copy(
+                conn, "lot_realizations", realization_columns,
+                [tuple(r[c] for c in realization_columns) for r in realizations]
+            )
+            counts["holdings"] += await _copy(
+                conn, "holdings", ["account_id", "asset_id", "quantity", "cost_basis", "realized_gain"],
+                [(key[0], key[1], p["quantity"], p["cost_basis"], p["realized_gain"]) for key, p in positions.items()]
+            )
+
+        # Los ids se han fijado a mano: las secuencias continúan desde el máximo
+        for table, column in [("users", "user_id"), ("accounts", "account_id"), ("assets", "asset_id"),
+                              ("operations", "operation_id"), ("transactions", "transaction_id")]:
+            await conn.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), (SELECT COALESCE(MAX({column}), 1) FROM {table}))"
+            )
+    finally:
+        await conn.close()
+
+    # Saldos de caja y rollup mensual desde las transacciones, como los comandos de reconciliación
+    async with AsyncSessionLocal() as db:
+        counts["cash_balances"] = len(await reconcile_cash_balances(db, fix=True))
+        counts["transaction_monthly_rollup"] = len(await reconcile_transaction_rollup(db, fix=True))
+        await db.commit()
+
+    conn = await asyncpg.connect(asyncpg_dsn(database_url))
+    try:
+        await conn.execute("ANALYZE")
+    finally:
+        await conn.close()
+
+    return {"size": asdict(size), "seed": seed, "rows": counts, "load_seconds": round(time.perf_counter() - started, 3)}
@@ -0,0 +1,160 @@
+"""
+Harness asyncio que mide latencia (p50/p95/p99) y throughput de los endpoints de la API.
+
+Cada escenario es una petición de un router de app/api/v1/router.py. Las peticiones se
+reparten entre los usuarios generados (cada una con el token y los ids de ese usuario) y
+se lanzan con `concurrency` peticiones en vuelo a la vez.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+import httpx
+import numpy as np
+
+from app.core.jwt import create_access_token
+from benchmarks.generator import PASSWORD, asyncpg_dsn
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    # Parámetros de la URL y cuerpo; los valores {account_id}, {asset_id}... salen del usuario
+    params: dict = field(default_factory=dict)
+    json: dict | None = None
+    form: dict | None = None
+    # Fracción de las peticiones del tamaño que se lanzan (login es CPU pura por bcrypt)
+    share: float = 1.0
+    # Las escrituras cambian los datos: se miden después de todas las lecturas
+    writes: bool = False
+
+SCENARIOS = [
+    Scenario("auth.login", "POST", "/api/v1/auth/login", form={"username": "{email}", "password": PASSWORD}, share=0.1),
+    Scenario("accounts.user_accounts", "GET", "/api/v1/accounts/user-accounts"),
+    Scenario("assets.user_assets", "GET", "/api/v1/assets/user-assets"),
+    Scenario("portfolio.dashboard", "GET", "/api/v1/portfolio/dashboard"),
+    Scenario("portfolio.accounts", "GET", "/api/v1/portfolio/accounts"),
+    Scenario("portfolio.account", "GET", "/api/v1/portfolio/accounts/{account_id}"),
+    Scenario("portfolio.assets_all", "GET", "/api/v1/portfolio/assets/all"),
+    Scenario("portfolio.gains", "GET", "/api/v1/portfolio/assets/gains"),
+    Scenario("portfolio.allocation", "GET", "/api/v1/portfolio/allocation"),
+    Scenario("portfolio.assets_by_theme", "GET", "/api/v1/portfolio/assets/theme"),
+    Scenario("portfolio.account_assets_by_type", "GET", "/api/v1/portfolio/assets/type/{account_id}"),
+    Scenario("portfolio.performance", "GET", "/api/v1/portfolio/performance"),
+    Scenario("trades.history", "GET", "/api/v1/trades/history", params={"limit": 50}),
+    Scenario("trades.history_by_account", "GET", "/api/v1/trades/history", params={"limit": 50, "account_id": "{account_id}"}),
+    Scenario("history_chart.growth", "GET", "/api/v1/history_chart/growth"),
+    Scenario("history_chart.account_growth", "GET", "/api/v1/history_chart/growth/account/{account_id}"),
+    Scenario("transactions.me", "GET", "/api/v1/transactions/me", params={"limit": 50}),
+    Scenario("transactions.summary", "GET", "/api/v1/transactions/summary"),
+    Scenario("transactions.monthly_trend", "GET", "/api/v1/transactions/trends/monthly", params={"months": 24}),
+    Scenario("transactions.category_trend", "GET", "/api/v1/transactions/trends/categories", params={"months": 24}),
+    Scenario("rebalance.status", "GET", "/api/v1/rebalance/"),
+    Scenario("rebalance.plan", "GET", "/api/v1/rebalance/plan", params={"cash": 1000}),
+    Scenario("rebalance.backtest", "GET", "/api/v1/rebalance/backtest", params={"strategy": "threshold"}),
+    Scenario("export.operations_csv", "GET", "/api/v1/export/operations", params={"format": "csv"}, share=0.2),
+    Scenario(
+        "trades.create", "POST", "/api/v1/trades/create", writes=True,
+        json={"account_id": "{account_id}", "asset_id": "{asset_id}", "date": "{now}", "quantity": 1, "price": 100, "fees": 0, "operation_type": "buy"}
+    ),
+    Scenario(
+        "transactions.create", "POST", "/api/v1/transactions/create", writes=True,
+        json={"account_id": "{account_id}", "category": "Ocio", "date": "{now}", "amount": 25, "type": "expense", "description": "bench"}
+    ),
+]
+
+async def load_users(database_url: str) -> list[dict]:
+    """Usuario, email, una de sus cuentas con posiciones y uno de sus activos, para rellenar los escenarios."""
+    conn = await asyncpg.connect(asyncpg_dsn(database_url))
+    try:
+        rows = await conn.fetch("""
+            SELECT DISTINCT ON (u.user_id) u.user_id, u.email, h.account_id, h.asset_id
+            FROM users u
+            JOIN accounts ac ON ac.user_id = u.user_id
+            JOIN holdings h ON h.account_id = ac.account_id
+            WHERE h.quantity > 0
+            ORDER BY u.user_id, h.account_id, h.asset_id
+        """)
+    finally:
+        await conn.close()
+    return [
+        {**dict(row), "token": create_access_token({"sub": str(row["user_id"])}, expires_delta=timedelta(days=1))}
+        for row in rows
+    ]
+
+def _fill(value, user: dict):
+    if isinstance(value, dict):
+        return {key: _fill(item, user) for key, item in value.items()}
+    if isinstance(value, str) and value.startswith("{") and value.endswith("}"):
+        return user[value[1:-1]] if value != "{now}" else datetime.now(timezone.utc).isoformat()
+    return value
+
+async def _request(client: httpx.AsyncClient, scenario: Scenario, user: dict) -> tuple[float, bool]:
+    start = time.perf_counter()
+    response = await client.request(
+        scenario.method,
+        scenario.path.format(**user),
+        params=_fill(scenario.params, user),
+        json=_fill(scenario.json, user) if scenario.json else None,
+        data=_fill(scenario.form, user) if scenario.form else None,
+        headers={"Authorization": f"Bearer {user['token']}"},
+    )
+    # Lee el cuerpo completo (incluidas las respuestas por trozos de /export)
+    await response.aread()
+    return time.perf_counter() - start, response.is_success
+
+def _summary(latencies: list[float], errors: int, wall_seconds: float) -> dict:
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "max_ms": round(float(values.max()), 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 3),
+    }
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, users: list[dict], requests: int, concurrency: int, warmup: int, seed: int) -> dict:
+    """
+    Lanza `requests` peticiones del escenario (tras `warmup` sin medir) con `concurrency` en vuelo.
+    Los usuarios de cada petición se eligen con `seed`, así dos ejecuciones piden lo mismo.
+    """
+    rng = random.Random(seed)
+    total = max(1, int(requests * scenario.share))
+    plan = [rng.choice(users) for _ in range(warmup + total)]
+    for user in plan[:warmup]:
+        await _request(client, scenario, user)
+
+    queue = iter(plan[warmup:])
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for user in queue:
+            elapsed, ok = await _request(client, scenario, user)
+            latencies.append(elapsed)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    return _summary(latencies, errors, time.perf_counter() - started)
+
+async def run_scenarios(client: httpx.AsyncClient, users: list[dict], requests: int, concurrency: int, warmup: int, seed: int, only: set[str] | None = None) -> dict:
+    # Primero todas las lecturas, después las escrituras
+    scenarios = sorted((s for s in SCENARIOS if not only or s.name in only), key=lambda s: s.writes)
+    results = {}
+    for scenario in scenarios:
+        result = results[scenario.name] = await run_scenario(client, scenario, users, requests, concurrency, warmup, seed)
+        print(
+            f"  {scenario.name:36s} p50 {result['p50_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms  "
+            f"{result['throughput_rps']:8.1f} req/s  {result['errors']} errores"
+        )
+    return results
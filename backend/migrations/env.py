@@ -0,0 +1,56 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import DATABASE_URL
+from app.core.database import Base
+import app.models  # noqa: F401  registra las tablas en Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+def _database_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Los índices del esquema base que no están declarados en los modelos no se proponen para borrar
+    if type_ == "index" and reflected and compare_to is None:
+        return False
+    return True
+
+def run_migrations_offline():
+    """Genera el SQL de las migraciones sin conectarse (alembic upgrade head --sql)."""
+    context.configure(
+        url=_database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def _run_migrations(connection):
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_migrations_online():
+    # Conexión propia (sin el pool de la aplicación): las migraciones pueden cambiar tipos y tablas
+    engine = create_async_engine(_database_url(), poolclass=pool.NullPool)
+    async with engine.connect() as connection:
+        # Las migraciones de datos reutilizan los servicios (asíncronos) sobre esta misma conexión
+        config.attributes["connection"] = connection
+        await connection.run_sync(_run_migrations)
+    await engine.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
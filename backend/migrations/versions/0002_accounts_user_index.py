@@ -0,0 +1,47 @@
+"""Índice de cuentas por usuario
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+Todas las consultas por usuario empiezan por las cuentas del usuario (accounts.user_id), que no
+tenía índice: cada una recorría la tabla entera. Con account_id, currency e is_active incluidos,
+los filtros de cuentas activas y las uniones con la divisa se resuelven solo con el índice.
+
+Medido con benchmarks.generator (2000 usuarios, 3 cuentas y 50 operaciones y transacciones por
+cuenta, 3 años de precios, semilla 11; usuario 1000), mejor de 3 EXPLAIN ANALYZE tras VACUUM ANALYZE.
+
+Antes:
+    ->  Seq Scan on accounts  (cost=0.00..137.00 rows=3 width=44) (actual time=0.249..0.528 rows=3 loops=1)
+Después:
+    ->  Index Scan using idx_accounts_user on accounts  (cost=0.28..8.34 rows=3 width=44) (actual time=0.004..0.005 rows=3 loops=1)
+    ->  Index Only Scan using idx_accounts_user on accounts a  (cost=0.28..4.33 rows=3 width=8) (actual time=0.003..0.004 rows=3 loops=1)
+
+    account_service.get_user_accounts            0.55 ms -> 0.01 ms
+    account_service.get_accounts_with_balance    0.38 ms -> 0.03 ms
+    transaction_service.get_transaction_summary  0.71 ms -> 0.19 ms
+    transaction_service.get_user_transactions    0.61 ms -> 0.16 ms
+    trade_service.get_trade_history              0.81 ms -> 0.21 ms
+    holdings_service.get_position_gains          0.68 ms -> 0.19 ms
+    assets_service.get_user_assets               0.33 ms -> 0.07 ms
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_accounts_user", "accounts", ["user_id"],
+            postgresql_include=["account_id", "currency", "is_active"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("idx_accounts_user", table_name="accounts", postgresql_concurrently=True)
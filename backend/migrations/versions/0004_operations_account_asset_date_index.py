@@ -0,0 +1,44 @@
+"""Índice de cobertura de operaciones por cuenta, activo y fecha
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+raw_balances (history_chart_service) agrupa las operaciones de unas cuentas por activo y día con
+el tipo y la cantidad: con esas columnas incluidas se lee solo el índice. idx_operations_account se
+mantiene: para leer todas las operaciones de una cuenta (exportación, historial) sigue siendo el más
+barato, porque recorre la tabla en el orden en que están guardadas.
+
+Medido con benchmarks.generator (2000 usuarios, 3 cuentas y 50 operaciones y transacciones por
+cuenta, 3 años de precios, semilla 11; usuario 1000), mejor de 3 EXPLAIN ANALYZE tras VACUUM ANALYZE.
+
+Antes (raw_balances de history_chart_service.get_portfolio_growth):
+    ->  Index Scan using idx_operations_account on operations o  (cost=0.30..9.17 rows=50 width=36) (actual time=0.003..0.009 rows=50 loops=3)
+Después:
+    ->  Index Only Scan using idx_operations_account_asset_date on operations o  (cost=0.42..5.30 rows=50 width=36) (actual time=0.007..0.011 rows=50 loops=3)
+          Heap Fetches: 0
+
+El tiempo de las series de crecimiento no cambia (~135 ms y ~1,05 s, dentro del ruido): lo domina
+daily_portfolio_value, no la lectura de operaciones. Como en la 0003, la ganancia está en no leer
+la tabla cuando las operaciones de una cuenta están repartidas en muchas páginas.
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_operations_account_asset_date", "operations", ["account_id", "asset_id", "date"],
+            postgresql_include=["operation_type", "quantity"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("idx_operations_account_asset_date", table_name="operations", postgresql_concurrently=True)
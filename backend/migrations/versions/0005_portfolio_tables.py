@@ -0,0 +1,176 @@
+"""Tablas de posiciones, lotes fiscales, caja, tipos de cambio y totales mensuales
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+Las tablas derivadas (holdings, tax_lots, lot_realizations, cash_balances, transaction_monthly_rollup)
+y las de apoyo (performance_cache, fx_rates) se añadieron a db/schema.sql después del esquema de la
+0001, así que una base de datos creada con el esquema original no las tiene. Cada objeto se crea con
+IF NOT EXISTS: sobre una base de datos inicializada con el db/schema.sql actual la migración no hace
+nada. Los índices de operations y transactions se crean con CONCURRENTLY, como en la 0002-0004.
+
+Las tablas se crean vacías; la 0006 las rellena a partir de operations y transactions.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Mismas definiciones que en db/schema.sql
+SCHEMA = """
+-- Métricas de rendimiento precalculadas cada noche por el worker
+-- (valores de referencia a 1 mes, 3 meses y YTD por usuario)
+CREATE TABLE IF NOT EXISTS performance_cache (
+    user_id BIGINT PRIMARY KEY,
+    as_of DATE NOT NULL,
+    current_val NUMERIC(20,6) NOT NULL DEFAULT 0,
+    current_cap NUMERIC(20,6) NOT NULL DEFAULT 0,
+    val_1m NUMERIC(20,6) NOT NULL DEFAULT 0,
+    val_3m NUMERIC(20,6) NOT NULL DEFAULT 0,
+    val_ytd NUMERIC(20,6) NOT NULL DEFAULT 0,
+    computed_at TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT fk_performance_cache_user
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+);
+
+-- Posiciones materializadas por cuenta y activo (se actualizan con cada operación)
+CREATE TABLE IF NOT EXISTS holdings (
+    account_id BIGINT NOT NULL,
+    asset_id BIGINT NOT NULL,
+    quantity NUMERIC(20,6) NOT NULL DEFAULT 0,
+    cost_basis NUMERIC(20,6) NOT NULL DEFAULT 0,
+    realized_gain NUMERIC(20,6) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (account_id, asset_id),
+
+    CONSTRAINT fk_holding_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id),
+
+    CONSTRAINT fk_holding_asset
+        FOREIGN KEY (asset_id) REFERENCES assets(asset_id)
+);
+
+-- Lotes fiscales: cada compra abre un lote que las ventas van consumiendo (FIFO por defecto)
+CREATE TABLE IF NOT EXISTS tax_lots (
+    operation_id BIGINT PRIMARY KEY,
+    account_id BIGINT NOT NULL,
+    asset_id BIGINT NOT NULL,
+    open_date TIMESTAMPTZ NOT NULL,
+    quantity NUMERIC(15,6) NOT NULL,
+    cost_basis NUMERIC(20,6) NOT NULL,
+    remaining_quantity NUMERIC(15,6) NOT NULL,
+    remaining_cost NUMERIC(20,6) NOT NULL,
+
+    CONSTRAINT fk_tax_lot_operation
+        FOREIGN KEY (operation_id) REFERENCES operations(operation_id),
+
+    CONSTRAINT fk_tax_lot_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id),
+
+    CONSTRAINT fk_tax_lot_asset
+        FOREIGN KEY (asset_id) REFERENCES assets(asset_id)
+);
+
+-- Solo los lotes abiertos: localizar el siguiente lote a consumir es O(log n)
+CREATE INDEX IF NOT EXISTS idx_tax_lots_open ON tax_lots(account_id, asset_id, open_date, operation_id)
+    WHERE remaining_quantity > 0;
+
+-- Detalle de ganancias realizadas: qué parte de qué lote cerró cada venta
+CREATE TABLE IF NOT EXISTS lot_realizations (
+    realization_id BIGSERIAL PRIMARY KEY,
+    sell_operation_id BIGINT NOT NULL,
+    lot_operation_id BIGINT,
+    account_id BIGINT NOT NULL,
+    asset_id BIGINT NOT NULL,
+    date TIMESTAMPTZ NOT NULL,
+    quantity NUMERIC(15,6) NOT NULL,
+    proceeds NUMERIC(20,6) NOT NULL,
+    cost NUMERIC(20,6) NOT NULL,
+    realized_gain NUMERIC(20,6) NOT NULL,
+
+    CONSTRAINT fk_realization_sell_operation
+        FOREIGN KEY (sell_operation_id) REFERENCES operations(operation_id),
+
+    CONSTRAINT fk_realization_lot
+        FOREIGN KEY (lot_operation_id) REFERENCES tax_lots(operation_id),
+
+    CONSTRAINT fk_realization_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id),
+
+    CONSTRAINT fk_realization_asset
+        FOREIGN KEY (asset_id) REFERENCES assets(asset_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_lot_realizations_sell ON lot_realizations(sell_operation_id);
+
+-- Saldo de caja por cuenta (transacciones activas), mantenido al insertar cada transacción
+CREATE TABLE IF NOT EXISTS cash_balances (
+    account_id BIGINT PRIMARY KEY,
+    balance NUMERIC(20,6) NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT fk_cash_balance_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+);
+
+-- Tipos de cambio diarios: valor en la divisa base de una unidad de `currency` (los descarga el worker)
+CREATE TABLE IF NOT EXISTS fx_rates (
+    currency VARCHAR(3) NOT NULL,
+    date DATE NOT NULL,
+    rate NUMERIC(20,10) NOT NULL,
+
+    PRIMARY KEY (currency, date)
+);
+
+-- Totales de transacciones activas por cuenta, mes, categoría y tipo, mantenidos al insertar y al desactivar
+CREATE TABLE IF NOT EXISTS transaction_monthly_rollup (
+    account_id BIGINT NOT NULL,
+    month DATE NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    type VARCHAR(10) NOT NULL,
+    total NUMERIC(20,6) NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (account_id, month, category, type),
+    CONSTRAINT fk_rollup_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+);
+"""
+
+# En orden inverso al de creación (por las claves foráneas)
+TABLES = ('transaction_monthly_rollup', 'fx_rates', 'cash_balances', 'lot_realizations', 'tax_lots', 'holdings', 'performance_cache')
+
+# Paginación por cursor de historial y listados, y deduplicación de extractos importados
+INDEXES = (
+    ("idx_operations_account_date", "operations", ["account_id", sa.text("date DESC"), sa.text("operation_id DESC")]),
+    ("idx_transactions_account_date", "transactions", ["account_id", sa.text("date DESC"), sa.text("transaction_id DESC")]),
+    ("idx_transactions_dedupe", "transactions", ["account_id", "date", "amount", "description"]),
+)
+
+
+def upgrade() -> None:
+    # asyncpg no admite varias sentencias en una sola ejecución
+    for statement in SCHEMA.split(";"):
+        if statement.strip():
+            op.execute(statement)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    for table in TABLES:
+        op.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
@@ -0,0 +1,73 @@
+"""Rellena posiciones, lotes fiscales, saldos de caja y totales mensuales
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Una base de datos que venía del esquema original tiene operaciones y transacciones pero, tras la
+0005, las tablas derivadas vacías: las posiciones, la caja y los resúmenes mensuales saldrían a cero.
+Se rellenan con los mismos servicios que los comandos de app/commands:
+
+- holdings, tax_lots y lot_realizations: con replay_operations. Si holdings está vacía se recorren
+  todas las operaciones (rebuild_holdings); si no, solo las posiciones (cuenta, activo) que tienen
+  operaciones y no tienen fila en holdings (rebuild_positions).
+- cash_balances y transaction_monthly_rollup: reconcile_cash_balances y reconcile_transaction_rollup
+  con fix=True, que solo escriben las filas que no cuadran.
+
+Es idempotente: sobre una base de datos ya mantenida por la aplicación no cambia nada. Sin conexión
+(--sql) no se genera SQL; después de aplicar el script hay que ejecutar los tres comandos (los de
+reconciliación con --fix).
+"""
+from alembic import op
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
+
+from app.services.holdings_service import rebuild_holdings, rebuild_positions
+from app.services.cash_service import reconcile_cash_balances
+from app.services.spending_service import reconcile_transaction_rollup
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Posiciones por lote: cada clave son dos parámetros y asyncpg admite como máximo 32767
+POSITIONS_PER_BATCH = 5000
+
+
+async def _backfill(connection) -> None:
+    # La sesión se une a la transacción de la migración: su commit (el de rebuild_holdings) no la
+    # confirma, se confirma todo junto al final de la migración
+    db = AsyncSession(bind=connection, join_transaction_mode="rollback_only")
+    has_holdings = await db.execute(text("SELECT EXISTS (SELECT 1 FROM holdings)"))
+    if not has_holdings.scalar_one():
+        await rebuild_holdings(db)
+
+    result = await db.execute(text("""
+        SELECT DISTINCT o.account_id, o.asset_id
+        FROM operations o
+        WHERE NOT EXISTS (
+            SELECT 1 FROM holdings h
+            WHERE h.account_id = o.account_id AND h.asset_id = o.asset_id
+        )
+        ORDER BY o.account_id, o.asset_id
+    """))
+    keys = [tuple(row) for row in result]
+    for start in range(0, len(keys), POSITIONS_PER_BATCH):
+        await rebuild_positions(db, keys[start:start + POSITIONS_PER_BATCH])
+
+    await reconcile_cash_balances(db, fix=True)
+    await reconcile_transaction_rollup(db, fix=True)
+    await db.close()
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        return
+    await_only(_backfill(op.get_context().config.attributes["connection"]))
+
+
+def downgrade() -> None:
+    # Los datos se borran con las tablas al deshacer la 0005
+    pass
@@ -0,0 +1,53 @@
+"""Índices de lotes fiscales y realizaciones por posición
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+Rehacer una posición (holdings_service.rebuild_position, al registrar una operación con fecha
+anterior a otras de la misma posición, y rebuild_positions tras una importación) borra sus lotes y
+realizaciones por (account_id, asset_id). idx_tax_lots_open es parcial (solo lotes abiertos) y
+lot_realizations solo tenía índice por venta: los dos borrados recorrían la tabla entera. Además, cada
+lote borrado comprueba la clave foránea fk_realization_lot, que sin índice en lot_operation_id
+recorría lot_realizations una vez por lote. Lo detectaron los casos de escritura de
+tests/test_query_plans.py.
+
+Medido con benchmarks.generator (2000 usuarios, 3 cuentas y 50 operaciones y transacciones por
+cuenta, 3 años de precios, semilla 11; cuenta 2998, activo 1), mejor de 3 EXPLAIN ANALYZE tras VACUUM ANALYZE.
+
+Antes:
+    ->  Seq Scan on lot_realizations  (cost=0.00..4411.54 rows=1 width=6) (actual time=3.524..7.918 rows=2 loops=1)
+    ->  Seq Scan on tax_lots  (cost=0.00..5936.93 rows=1 width=6) (actual time=5.033..10.367 rows=4 loops=1)
+    Trigger for constraint fk_realization_lot: time=29.166 calls=4
+Después:
+    ->  Index Scan using idx_lot_realizations_position on lot_realizations  (cost=0.42..8.44 rows=1 width=6) (actual time=0.027..0.028 rows=2 loops=1)
+    ->  Index Scan using idx_tax_lots_position on tax_lots  (cost=0.42..8.44 rows=1 width=6) (actual time=0.015..0.016 rows=4 loops=1)
+    Trigger for constraint fk_realization_lot: time=0.272 calls=4
+
+    DELETE FROM lot_realizations (una posición)  7.99 ms -> 0.08 ms
+    DELETE FROM tax_lots (una posición)          32.77 ms -> 0.35 ms
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("idx_tax_lots_position", "tax_lots", ["account_id", "asset_id"]),
+    ("idx_lot_realizations_position", "lot_realizations", ["account_id", "asset_id"]),
+    ("idx_lot_realizations_lot", "lot_realizations", ["lot_operation_id"]),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
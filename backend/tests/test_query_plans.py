@@ -0,0 +1,289 @@
+"""
+Regresiones de planes de las consultas de los servicios.
+
+Se carga un conjunto de datos sintético (benchmarks.generator), se ejecuta cada función de
+servicio (lecturas y escrituras; las escrituras se deshacen) capturando las sentencias que lanza
+y se pide su EXPLAIN (FORMAT JSON) con los mismos parámetros. Cada sentencia debe:
+- no recorrer secuencialmente tablas grandes (salvo las excepciones anotadas en el fichero de presupuestos)
+- tener un coste estimado dentro de su presupuesto (más la tolerancia del fichero)
+
+Para registrar los costes actuales (tras cambiar una consulta o un índice a propósito):
+    UPDATE_QUERY_PLAN_BUDGETS=1 TEST_DATABASE_URL=... pytest tests/test_query_plans.py
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL no está definida", allow_module_level=True)
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine, AsyncSessionLocal
+from app.models import Operation
+from app.schemas.operation import OperationCreate
+from app.schemas.rebalance import RebalanceUpdate
+from app.services import (
+    account_service, allocation_service, assets_service, dashboard_service, export_service,
+    fx_service, history_chart_service, holdings_service, import_service, performance_service,
+    rebalance_service, spending_service, trade_service, transaction_service,
+)
+from benchmarks.generator import DatasetSize, load_dataset
+from benchmarks.harness import load_users
+
+BUDGETS_PATH = Path(__file__).with_name("query_plan_budgets.json")
+UPDATE_BUDGETS = os.getenv("UPDATE_QUERY_PLAN_BUDGETS") == "1"
+
+# Muchos usuarios con pocas filas cada uno: las consultas de un usuario son selectivas
+# y el planificador debe preferir los índices cuando existen
+DATASET = DatasetSize(users=120, accounts=3, operations=100, years=3)
+DATASET_SEED = 7
+
+# Tablas que crecen con el uso: un Seq Scan sobre ellas es una regresión.
+# Por debajo de SEQ_SCAN_MIN_ROWS filas en el conjunto de prueba el Seq Scan es legítimo.
+LARGE_TABLES = {
+    "operations", "transactions", "price_history", "holdings",
+    "tax_lots", "lot_realizations", "transaction_monthly_rollup",
+}
+SEQ_SCAN_MIN_ROWS = 2000
+
+PLANNED_STATEMENT = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+async def _consume(stream):
+    async for _ in stream:
+        pass
+
+# Función de servicio -> llamada con el usuario de prueba (user_id, account_id, asset_id)
+CASES = {
+    "account_service.get_user_accounts": lambda db, u: account_service.get_user_accounts(db, u["user_id"]),
+    "account_service.get_accounts_with_balance": lambda db, u: account_service.get_accounts_with_balance(db, u["user_id"]),
+    "account_service.get_selected_account_with_balance":
+        lambda db, u: account_service.get_selected_account_with_balance(db, u["user_id"], u["account_id"]),
+    "allocation_service.get_asset_allocation":
+        lambda db, u: allocation_service.get_asset_allocation(db, u["account_id"], u["user_id"], "theme"),
+    "allocation_service.get_global_asset_allocation":
+        lambda db, u: allocation_service.get_global_asset_allocation(db, u["user_id"], "type"),
+    "allocation_service.get_allocation_overview": lambda db, u: allocation_service.get_allocation_overview(db, u["user_id"]),
+    "assets_service.get_user_assets": lambda db, u: assets_service.get_user_assets(db, u["user_id"]),
+    "assets_service.get_all_assets": lambda db, u: assets_service.get_all_assets(db, u["user_id"]),
+    "dashboard_service.get_dashboard": lambda db, u: dashboard_service.get_dashboard(db, u["user_id"]),
+    "export_service.operations": lambda db, u: _consume(export_service.export_stream("operations", u["user_id"], "csv")),
+    "export_service.transactions": lambda db, u: _consume(export_service.export_stream("transactions", u["user_id"], "csv")),
+    "export_service.prices": lambda db, u: _consume(export_service.export_stream("prices", u["user_id"], "csv")),
+    "fx_service.load_fx_matrix": lambda db, u: fx_service.load_fx_matrix(db),
+    "history_chart_service.get_portfolio_growth": lambda db, u: history_chart_service.get_portfolio_growth(db, u["user_id"]),
+    "history_chart_service.get_account_growth": lambda db, u: history_chart_service.get_account_growth(db, u["account_id"]),
+    "holdings_service.get_position_gains": lambda db, u: holdings_service.get_position_gains(db, u["user_id"]),
+    "performance_service.compute_performance_metrics":
+        lambda db, u: performance_service.compute_performance_metrics(db, u["user_id"]),
+    "performance_service.get_current_snapshot": lambda db, u: performance_service.get_current_snapshot(db, u["user_id"]),
+    "rebalance_service.get_rebalance_status": lambda db, u: rebalance_service.get_rebalance_status(db, u["user_id"]),
+    "rebalance_service.get_rebalance_plan": lambda db, u: rebalance_service.get_rebalance_plan(db, u["user_id"], cash=1000),
+    "rebalance_service.get_rebalance_backtest":
+        lambda db, u: rebalance_service.get_rebalance_backtest(db, u["user_id"], "threshold"),
+    "spending_service.get_monthly_trend": lambda db, u: spending_service.get_monthly_trend(db, u["user_id"], 24),
+    "spending_service.get_category_trend": lambda db, u: spending_service.get_category_trend(db, u["user_id"], "expense", 24),
+    "trade_service.get_trade_history": lambda db, u: trade_service.get_trade_history(db, u["user_id"]),
+    "trade_service.get_trade_history_by_account":
+        lambda db, u: trade_service.get_trade_history(db, u["user_id"], account_id=u["account_id"]),
+    "transaction_service.get_user_transactions": lambda db, u: transaction_service.get_user_transactions(db, u["user_id"]),
+    "transaction_service.get_transaction_summary": lambda db, u: transaction_service.get_transaction_summary(db, u["user_id"]),
+}
+
+def _new_operation(u: dict, operation_type: str, date: datetime) -> dict:
+    return {
+        "account_id": u["account_id"], "asset_id": u["asset_id"], "date": date,
+        "operation_type": operation_type, "quantity": Decimal("0.5"), "price": Decimal("10"), "fees": Decimal("0"),
+    }
+
+async def _apply_to_holdings(db, u: dict, date: datetime):
+    operation = Operation(**_new_operation(u, "buy", date))
+    db.add(operation)
+    await holdings_service.apply_operation_to_holdings(db, operation)
+
+STATEMENT_CSV = (
+    "date,amount,description\n"
+    "2026-01-05,-12.50,Supermercado\n"
+    "2026-01-05,-12.50,Supermercado\n"
+    "2026-01-31,1500,Nómina\n"
+).encode()
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+# Escrituras: se ejecutan en una transacción que se deshace al terminar (el commit de los servicios no
+# la confirma) y se explican dentro de ella, porque algunas usan tablas temporales de la transacción.
+# La venta consume lotes abiertos (FOR UPDATE de lot_service); la compra con fecha pasada rehace la posición.
+WRITE_CASES = {
+    "trade_service.create_operation":
+        lambda db, u: trade_service.create_operation(db, OperationCreate(**_new_operation(u, "sell", _now())), u["user_id"]),
+    "holdings_service.apply_operation_to_holdings": lambda db, u: _apply_to_holdings(db, u, _now()),
+    "holdings_service.apply_operation_to_holdings_backdated":
+        lambda db, u: _apply_to_holdings(db, u, _now() - timedelta(days=365)),
+    "performance_service.invalidate_performance_cache":
+        lambda db, u: performance_service.invalidate_performance_cache(db, u["user_id"], _now() - timedelta(days=30)),
+    "transaction_service.deactivate_transaction":
+        lambda db, u: transaction_service.deactivate_transaction(db, u["transaction_id"], u["user_id"]),
+    "rebalance_service.update_rebalance_settings": lambda db, u: rebalance_service.update_rebalance_settings(
+        db, u["user_id"], [RebalanceUpdate(asset_id=u["asset_id"], target_percentage=100)]
+    ),
+    "import_service.import_statement":
+        lambda db, u: import_service.import_statement(db, u["user_id"], u["account_id"], io.BytesIO(STATEMENT_CSV)),
+}
+
+ALL_CASES = {**CASES, **WRITE_CASES}
+
+async def _explain(conn, statement: str, parameters: tuple):
+    # Directamente sobre asyncpg, con los mismos parámetros posicionales que la ejecución
+    raw = await conn.get_raw_connection()
+    plan = await raw.driver_connection.fetchval(f"EXPLAIN (FORMAT JSON) {statement}", *parameters)
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+async def _explain_all(conn, case: str, statements: dict):
+    return {
+        _statement_key(case, statement): {"statement": statement, "plan": await _explain(conn, statement, parameters)}
+        for statement, parameters in statements.items()
+    }
+
+def _statement_key(case: str, statement: str) -> str:
+    # Por texto y no por orden: los casos con tareas concurrentes (dashboard) no tienen un orden fijo.
+    # Cambiar el SQL de una consulta le da una clave nueva, sin presupuesto hasta registrarlo.
+    return f"{case}@{hashlib.blake2b(statement.encode(), digest_size=4).hexdigest()}"
+
+async def _capture_plans(case: str, user: dict):
+    """Ejecuta el caso, guarda sus sentencias (una vez cada una) y devuelve sus planes por clave."""
+    statements = {}
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and PLANNED_STATEMENT.match(statement):
+            statements.setdefault(statement, tuple(parameters or ()))
+
+    if case in WRITE_CASES:
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            try:
+                event.listen(engine.sync_engine, "before_cursor_execute", _before_execute)
+                try:
+                    async with AsyncSession(bind=conn, join_transaction_mode="rollback_only", expire_on_commit=False) as db:
+                        await WRITE_CASES[case](db, user)
+                finally:
+                    event.remove(engine.sync_engine, "before_cursor_execute", _before_execute)
+                return await _explain_all(conn, case, statements)
+            finally:
+                await transaction.rollback()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_execute)
+    try:
+        async with AsyncSessionLocal() as db:
+            await CASES[case](db, user)
+            await db.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _before_execute)
+
+    async with engine.connect() as conn:
+        return await _explain_all(conn, case, statements)
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+async def _deactivatable_transaction(user_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            text("""
+                SELECT MAX(t.transaction_id)
+                FROM transactions t
+                JOIN accounts a ON a.account_id = t.account_id
+                WHERE a.user_id = :user_id AND t.is_active = TRUE AND t.category <> 'Inversión'
+            """),
+            {"user_id": user_id}
+        )
+        return result.scalar_one()
+
+@pytest.fixture(scope="session")
+def runner():
+    with asyncio.Runner() as runner:
+        yield runner
+        runner.run(engine.dispose())
+
+@pytest.fixture(scope="session")
+def plan_user(runner):
+    database_url = os.environ["TEST_DATABASE_URL"]
+    dataset = runner.run(load_dataset(database_url, DATASET, DATASET_SEED))
+    small = sorted(table for table in LARGE_TABLES if dataset["rows"].get(table, 0) < SEQ_SCAN_MIN_ROWS)
+    assert not small, f"Conjunto de prueba demasiado pequeño para comprobar los Seq Scan: {small}"
+    # Siempre el mismo usuario para la misma semilla
+    users = runner.run(load_users(database_url))
+    user = users[len(users) // 2]
+    return {**user, "transaction_id": runner.run(_deactivatable_transaction(user["user_id"]))}
+
+@pytest.fixture(autouse=True)
+def warm_fx_cache(runner, plan_user):
+    """
+    get_fx_matrix guarda la matriz de tipos en una caché del proceso: sin fijarla, la carga de fx_rates
+    solo se captura en el primer caso que la usa y los presupuestos dependen del orden de los casos.
+    Se vacía y se vuelve a cargar antes de cada caso, fuera de la captura: todos los casos encuentran
+    la caché caliente y la sentencia de carga solo es del caso fx_service.load_fx_matrix.
+    """
+    async def load():
+        fx_service._fx_cache.update(matrix=None, loaded_at=0.0)
+        async with AsyncSessionLocal() as db:
+            await fx_service.get_fx_matrix(db)
+
+    runner.run(load())
+
+@pytest.fixture(scope="session")
+def budgets():
+    budgets = json.loads(BUDGETS_PATH.read_text(encoding="utf-8"))
+    yield budgets
+    if UPDATE_BUDGETS:
+        BUDGETS_PATH.write_text(json.dumps(budgets, indent=2, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+
+@pytest.fixture(scope="session")
+def case_plans(runner, plan_user):
+    plans = {}
+
+    def get(case: str):
+        if case not in plans:
+            plans[case] = runner.run(_capture_plans(case, plan_user))
+        return plans[case]
+    return get
+
+@pytest.mark.parametrize("case", sorted(ALL_CASES))
+def test_no_seq_scans_on_large_tables(case, case_plans, budgets):
+    allowed = budgets["allowed_seq_scans"]
+    failures = []
+    for key, captured in case_plans(case).items():
+        for node in _nodes(captured["plan"]):
+            table = node.get("Relation Name")
+            if node["Node Type"] == "Seq Scan" and table in LARGE_TABLES and table not in allowed.get(key, []):
+                failures.append(f"{key}: Seq Scan on {table}\n{captured['statement']}")
+    assert not failures, "\n\n".join(failures)
+
+@pytest.mark.parametrize("case", sorted(ALL_CASES))
+def test_cost_within_budget(case, case_plans, budgets):
+    costs = budgets["costs"]
+    tolerance = budgets["tolerance"]
+    failures = []
+    if UPDATE_BUDGETS:
+        for key in [key for key in costs if key.startswith(f"{case}@")]:
+            del costs[key]
+    for key, captured in case_plans(case).items():
+        cost = captured["plan"]["Total Cost"]
+        if UPDATE_BUDGETS:
+            costs[key] = round(cost, 2)
+        elif key not in costs:
+            failures.append(f"{key}: sin presupuesto (coste {cost:.2f}); regístralo con UPDATE_QUERY_PLAN_BUDGETS=1")
+        elif cost > costs[key] * (1 + tolerance):
+            failures.append(f"{key}: coste {cost:.2f} > presupuesto {costs[key]:.2f} (+{tolerance:.0%})\n{captured['statement']}")
+    assert not failures, "\n\n".join(failures)
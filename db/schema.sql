@@ -1,3 +1,7 @@
+-- Esquema con el que Docker inicializa una base de datos nueva (hasta la revisión 0005 de
+-- backend/migrations, sin los índices de la 0002-0004). No se modifica: los cambios de esquema
+-- posteriores son migraciones de Alembic, que el backend aplica al arrancar (alembic upgrade head).
+
 -- Tipos de datos utilizados en este schema:
 -- TIMESTAMP WITH TIME ZONE (TIMESTAMPTZ) para fechas con zona horaria
 -- NUMERIC(15,6) para valores monetarios con 6 decimales
@@ -118,3 +122,134 @@ CREATE INDEX idx_operations_asset ON operations(asset_id);
 CREATE INDEX idx_operations_account ON operations(account_id);
 
 CREATE INDEX idx_price_asset_date ON price_history(asset_id, date DESC);
+
+-- Métricas de rendimiento precalculadas cada noche por el worker
+-- (valores de referencia a 1 mes, 3 meses y YTD por usuario)
+CREATE TABLE performance_cache (
+    user_id BIGINT PRIMARY KEY,
+    as_of DATE NOT NULL,
+    current_val NUMERIC(20,6) NOT NULL DEFAULT 0,
+    current_cap NUMERIC(20,6) NOT NULL DEFAULT 0,
+    val_1m NUMERIC(20,6) NOT NULL DEFAULT 0,
+    val_3m NUMERIC(20,6) NOT NULL DEFAULT 0,
+    val_ytd NUMERIC(20,6) NOT NULL DEFAULT 0,
+    computed_at TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT fk_performance_cache_user
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+);
+
+-- Posiciones materializadas por cuenta y activo (se actualizan con cada operación)
+CREATE TABLE holdings (
+    account_id BIGINT NOT NULL,
+    asset_id BIGINT NOT NULL,
+    quantity NUMERIC(20,6) NOT NULL DEFAULT 0,
+    cost_basis NUMERIC(20,6) NOT NULL DEFAULT 0,
+    realized_gain NUMERIC(20,6) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (account_id, asset_id),
+
+    CONSTRAINT fk_holding_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id),
+
+    CONSTRAINT fk_holding_asset
+        FOREIGN KEY (asset_id) REFERENCES assets(asset_id)
+);
+
+-- Lotes fiscales: cada compra abre un lote que las ventas van consumiendo (FIFO por defecto)
+CREATE TABLE tax_lots (
+    operation_id BIGINT PRIMARY KEY,
+    account_id BIGINT NOT NULL,
+    asset_id BIGINT NOT NULL,
+    open_date TIMESTAMPTZ NOT NULL,
+    quantity NUMERIC(15,6) NOT NULL,
+    cost_basis NUMERIC(20,6) NOT NULL,
+    remaining_quantity NUMERIC(15,6) NOT NULL,
+    remaining_cost NUMERIC(20,6) NOT NULL,
+
+    CONSTRAINT fk_tax_lot_operation
+        FOREIGN KEY (operation_id) REFERENCES operations(operation_id),
+
+    CONSTRAINT fk_tax_lot_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id),
+
+    CONSTRAINT fk_tax_lot_asset
+        FOREIGN KEY (asset_id) REFERENCES assets(asset_id)
+);
+
+-- Solo los lotes abiertos: localizar el siguiente lote a consumir es O(log n)
+CREATE INDEX idx_tax_lots_open ON tax_lots(account_id, asset_id, open_date, operation_id)
+    WHERE remaining_quantity > 0;
+
+-- Detalle de ganancias realizadas: qué parte de qué lote cerró cada venta
+CREATE TABLE lot_realizations (
+    realization_id BIGSERIAL PRIMARY KEY,
+    sell_operation_id BIGINT NOT NULL,
+    lot_operation_id BIGINT,
+    account_id BIGINT NOT NULL,
+    asset_id BIGINT NOT NULL,
+    date TIMESTAMPTZ NOT NULL,
+    quantity NUMERIC(15,6) NOT NULL,
+    proceeds NUMERIC(20,6) NOT NULL,
+    cost NUMERIC(20,6) NOT NULL,
+    realized_gain NUMERIC(20,6) NOT NULL,
+
+    CONSTRAINT fk_realization_sell_operation
+        FOREIGN KEY (sell_operation_id) REFERENCES operations(operation_id),
+
+    CONSTRAINT fk_realization_lot
+        FOREIGN KEY (lot_operation_id) REFERENCES tax_lots(operation_id),
+
+    CONSTRAINT fk_realization_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id),
+
+    CONSTRAINT fk_realization_asset
+        FOREIGN KEY (asset_id) REFERENCES assets(asset_id)
+);
+
+CREATE INDEX idx_lot_realizations_sell ON lot_realizations(sell_operation_id);
+
+-- Saldo de caja por cuenta (transacciones activas), mantenido al insertar cada transacción
+CREATE TABLE cash_balances (
+    account_id BIGINT PRIMARY KEY,
+    balance NUMERIC(20,6) NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT fk_cash_balance_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+);
+
+-- Tipos de cambio diarios: valor en la divisa base de una unidad de `currency` (los descarga el worker)
+CREATE TABLE fx_rates (
+    currency VARCHAR(3) NOT NULL,
+    date DATE NOT NULL,
+    rate NUMERIC(20,10) NOT NULL,
+
+    PRIMARY KEY (currency, date)
+);
+
+-- Historial de operaciones paginado por cursor: orden (date DESC, operation_id DESC) dentro de cada cuenta
+CREATE INDEX idx_operations_account_date ON operations(account_id, date DESC, operation_id DESC);
+
+-- Listado de transacciones paginado por cursor: orden (date DESC, transaction_id DESC) dentro de cada cuenta
+CREATE INDEX idx_transactions_account_date ON transactions(account_id, date DESC, transaction_id DESC);
+
+-- Totales de transacciones activas por cuenta, mes, categoría y tipo, mantenidos al insertar y al desactivar
+CREATE TABLE transaction_monthly_rollup (
+    account_id BIGINT NOT NULL,
+    month DATE NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    type VARCHAR(10) NOT NULL,
+    total NUMERIC(20,6) NOT NULL DEFAULT 0,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (account_id, month, category, type),
+    CONSTRAINT fk_rollup_account
+        FOREIGN KEY (account_id) REFERENCES accounts(account_id)
+);
+
+-- Deduplicación de extractos importados: misma cuenta, fecha, importe y descripción
+CREATE INDEX idx_transactions_dedupe ON transactions(account_id, date, amount, description);
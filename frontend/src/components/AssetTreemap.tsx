@@ -1,23 +1,14 @@
-import { useEffect, useState } from 'react'
-import { getAllAssets } from '../services/assetService'
 import { AssetTableRow } from '../types/asset'
 
-export default function AssetsTreemapPremium() {
-  const [assets, setAssets] = useState<AssetTableRow[]>([])
-  const [loading, setLoading] = useState(true)
-
-  useEffect(() => {
-    getAllAssets()
-      .then(data => {
-        const sorted = data
-          .filter(a => a.total_value > 0)
-          .sort((a, b) => b.total_value - a.total_value)
-
-        setAssets(sorted)
-        setLoading(false)
-      })
-      .catch(() => setLoading(false))
-  }, [])
+interface Props {
+  assets: AssetTableRow[]
+  loading: boolean
+}
+
+export default function AssetsTreemapPremium({ assets: allAssets, loading }: Props) {
+  const assets = allAssets
+    .filter(a => a.total_value > 0)
+    .sort((a, b) => b.total_value - a.total_value)
 
   if (loading)
     return (
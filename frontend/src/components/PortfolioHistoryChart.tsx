@@ -1,13 +1,15 @@
 import { useEffect, useState } from 'react';
 import { AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { getAccountGrowth, getPortfolioGrowth } from '../services/historyService';
-import { ChartDataPoint } from '../types/history_chart';
+import { ChartDataPoint, PortfolioPoint } from '../types/history_chart';
 
 interface Props {
   accountId: number | 'all';
+  // Serie general ya cargada por el dashboard; solo se pide a la API la de cada cuenta
+  portfolioGrowth: PortfolioPoint[] | null;
 }
 
-export default function PortfolioHistoryChart({ accountId }: Props) {
+export default function PortfolioHistoryChart({ accountId, portfolioGrowth }: Props) {
   const [data, setData] = useState<ChartDataPoint[]>([]);
   const [loading, setLoading] = useState(true);
 
@@ -16,11 +18,11 @@ export default function PortfolioHistoryChart({ accountId }: Props) {
       try {
         setLoading(true);
         // Decisión de servicio según el selector
-        const response = accountId === 'all' 
-          ? await getPortfolioGrowth() 
-          : await getAccountGrowth(accountId);
+        const history = accountId === 'all'
+          ? portfolioGrowth ?? (await getPortfolioGrowth()).history
+          : (await getAccountGrowth(accountId)).history;
         
-        const formattedData: ChartDataPoint[] = response.history.map((point: any) => {
+        const formattedData: ChartDataPoint[] = history.map((point: any) => {
           const totalValue = parseFloat(point.total_value);
           const capital = parseFloat(point.capital_invertido);
           
@@ -45,7 +47,7 @@ export default function PortfolioHistoryChart({ accountId }: Props) {
     };
 
     fetchHistory();
-  }, [accountId]); // Se recarga cuando cambia el ID de cuenta
+  }, [accountId, portfolioGrowth]); // Se recarga cuando cambia el ID de cuenta
 
   if (loading) return <div className="h-80 flex items-center justify-center text-gray-400">Cargando historial...</div>;
 
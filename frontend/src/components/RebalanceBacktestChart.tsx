@@ -0,0 +1,108 @@
+import { useEffect, useState } from 'react';
+import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
+import { getRebalanceBacktest } from '../services/rebalanceService';
+import { RebalanceBacktest, RebalanceStrategy } from '../types/rebalance';
+
+const STRATEGIES: { value: RebalanceStrategy; label: string }[] = [
+  { value: 'monthly', label: 'Mensual' },
+  { value: 'quarterly', label: 'Trimestral' },
+  { value: 'threshold', label: 'Por desviación' },
+];
+
+const formatEur = (value: number) =>
+  new Intl.NumberFormat('es-ES', { style: 'currency', currency: 'EUR' }).format(value);
+
+export default function RebalanceBacktestChart() {
+  const [strategy, setStrategy] = useState<RebalanceStrategy>('monthly');
+  const [threshold, setThreshold] = useState<number>(5);
+  const [backtest, setBacktest] = useState<RebalanceBacktest | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    const fetchBacktest = async () => {
+      try {
+        setLoading(true);
+        setError(null);
+        setBacktest(await getRebalanceBacktest(strategy, threshold));
+      } catch (err) {
+        setError(err instanceof Error ? err.message : 'Error al simular el rebalanceo');
+      } finally {
+        setLoading(false);
+      }
+    };
+
+    fetchBacktest();
+  }, [strategy, threshold]);
+
+  const data = (backtest?.history ?? []).map((point) => ({
+    ...point,
+    displayDate: new Date(point.date).toLocaleDateString('es-ES', { month: 'short', year: '2-digit' }),
+  }));
+
+  return (
+    <div className="rounded-xl bg-[#11162A] border border-white/10 p-6 space-y-6">
+      <div className="flex flex-wrap justify-between items-end gap-4">
+        <div>
+          <h2 className="text-xl font-bold">¿Y si hubiera rebalanceado?</h2>
+          <p className="text-sm text-gray-400">Mismas aportaciones que tu cartera, invertidas con la estrategia guardada</p>
+        </div>
+        <div className="flex items-center gap-4 text-sm">
+          <select
+            value={strategy}
+            onChange={(e) => setStrategy(e.target.value as RebalanceStrategy)}
+            className="px-3 py-2 bg-[#0B0F1A] border border-white/10 rounded-lg text-white focus:border-purple-500 outline-none"
+          >
+            {STRATEGIES.map((s) => <option key={s.value} value={s.value}>{s.label}</option>)}
+          </select>
+          {strategy === 'threshold' && (
+            <label className="flex items-center gap-2 text-gray-400">
+              Desviación
+              <input
+                type="number"
+                min={1}
+                max={50}
+                value={threshold}
+                onChange={(e) => setThreshold(parseFloat(e.target.value) || 5)}
+                className="w-16 px-2 py-1 bg-[#0B0F1A] border border-white/10 rounded text-center text-white focus:border-purple-500 outline-none"
+              />
+              %
+            </label>
+          )}
+        </div>
+      </div>
+
+      {loading ? (
+        <div className="h-80 flex items-center justify-center text-gray-400">Simulando...</div>
+      ) : error ? (
+        <div className="h-80 flex items-center justify-center text-red-400">{error}</div>
+      ) : backtest && (
+        <>
+          <div className="grid grid-cols-1 md:grid-cols-4 gap-4 text-sm">
+            <div><p className="text-gray-400">Capital invertido</p><p className="text-lg font-bold font-mono">{formatEur(backtest.capital_invertido)}</p></div>
+            <div><p className="text-gray-400">Valor real</p><p className="text-lg font-bold font-mono">{formatEur(backtest.real_final_value)}</p></div>
+            <div><p className="text-gray-400">Valor simulado</p><p className="text-lg font-bold font-mono text-emerald-400">{formatEur(backtest.final_value)}</p></div>
+            <div><p className="text-gray-400">Rebalanceos</p><p className="text-lg font-bold font-mono">{backtest.rebalance_count}</p></div>
+          </div>
+          <div className="h-80">
+            <ResponsiveContainer width="100%" height="100%">
+              <LineChart data={data} margin={{ top: 10, right: 10, left: 0, bottom: 0 }}>
+                <CartesianGrid strokeDasharray="3 3" vertical={false} stroke="#ffffff10" />
+                <XAxis dataKey="displayDate" axisLine={false} tickLine={false} tick={{ fill: '#9ca3af', fontSize: 12 }} minTickGap={40} />
+                <YAxis hide={true} domain={['auto', 'auto']} />
+                <Tooltip
+                  contentStyle={{ backgroundColor: '#11162A', border: '1px solid #ffffff20', borderRadius: '8px', fontSize: '12px' }}
+                  formatter={(value: number | any) => formatEur(value)}
+                />
+                <Legend />
+                <Line type="stepAfter" dataKey="capital_invertido" name="Capital Invertido" stroke="#94a3b8" strokeWidth={1} strokeDasharray="5 5" dot={false} />
+                <Line type="monotone" dataKey="total_value" name="Cartera Real" stroke="#8b5cf6" strokeWidth={2} dot={false} />
+                <Line type="monotone" dataKey="simulated_value" name="Con Rebalanceo" stroke="#34d399" strokeWidth={2} dot={false} />
+              </LineChart>
+            </ResponsiveContainer>
+          </div>
+        </>
+      )}
+    </div>
+  );
+}
@@ -1,43 +1,26 @@
-import { useEffect, useState } from 'react'
 import { PieChart, Pie, Cell, ResponsiveContainer, Tooltip } from 'recharts'
-import { AssetAllocation } from '../../types/asset'
-import { getAccountAssetAllocation, getGlobalAssetAllocation } from '../../services/assetService'
+import { AssetAllocation, AllocationOverview } from '../../types/asset'
 import DonutTooltip from './DonutToolTip'
 
 const COLORS = ['#8b5cf6', '#22c55e', '#f97316', '#06b6d4', '#ef4444', '#eab308']
 
 interface Props {
+  overview: AllocationOverview | null
+  loading: boolean
   selectedAccountId: number | 'all'
   groupBy: 'type' | 'theme' | 'asset'
 }
 
-export default function AssetsDonut({selectedAccountId,groupBy}: Props) {
-  const [data, setData] = useState<AssetAllocation[]>([])
-  const [loading, setLoading] = useState(false)
-
-  useEffect(() => {
-    const fetchData = async () => {
-      setLoading(true)
-      try {
-        let response: AssetAllocation[]
-        
-        if (selectedAccountId === 'all') {
-          response = await getGlobalAssetAllocation(groupBy)
-        } else {
-          response = await getAccountAssetAllocation(selectedAccountId, groupBy)
-        }
-        
-        setData(response || [])
-      } catch (error) {
-        console.error('Error fetching asset allocation:', error)
-        setData([])
-      } finally {
-        setLoading(false)
-      }
+export default function AssetsDonut({overview,loading,selectedAccountId,groupBy}: Props) {
+  // El overview trae todas las agrupaciones; cambiar de cuenta o agrupación no vuelve a llamar a la API
+  let data: AssetAllocation[] = []
+  if (overview) {
+    if (selectedAccountId === 'all') {
+      data = overview.portfolio[groupBy]
+    } else {
+      data = overview.accounts.find(acc => acc.account_id === selectedAccountId)?.[groupBy] || []
     }
-
-    fetchData()
-  }, [selectedAccountId, groupBy])
+  }
 
   if (loading) {
     return (
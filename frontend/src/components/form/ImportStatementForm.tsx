@@ -0,0 +1,89 @@
+import { useState, useEffect } from 'react';
+import { Upload, Loader2 } from 'lucide-react';
+import { importStatement } from '../../services/transactionService';
+import { getUserAccounts } from '../../services/accountService';
+import { Account } from '../../types/account';
+import Toast from '../Toast';
+
+interface ImportStatementFormProps {
+  onSuccess?: () => void;
+}
+
+export default function ImportStatementForm({ onSuccess }: ImportStatementFormProps) {
+  const [accounts, setAccounts] = useState<Account[]>([]);
+  const [accountId, setAccountId] = useState<number>(0);
+  const [file, setFile] = useState<File | null>(null);
+  const [loading, setLoading] = useState(false);
+  const [toast, setToast] = useState<{message: string, type: 'error' | 'success'} | null>(null);
+
+  useEffect(() => {
+    getUserAccounts()
+      .then(data => {
+        setAccounts(data);
+        if (data.length > 0) setAccountId(data[0].account_id);
+      })
+      .catch(() => setToast({ message: 'Error al cargar las cuentas', type: 'error' }));
+  }, []);
+
+  const handleSubmit = async (e: React.FormEvent) => {
+    e.preventDefault();
+    if (!file || !accountId) return;
+    try {
+      setLoading(true);
+      const result = await importStatement(accountId, file);
+      setToast({
+        message: `${result.imported} movimientos importados (${result.duplicates} ya existían)`,
+        type: 'success'
+      });
+      setFile(null);
+      onSuccess?.();
+    } catch (err) {
+      setToast({ message: err instanceof Error ? err.message : 'Error al importar el extracto', type: 'error' });
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <div className="rounded-xl bg-[#11162A] border border-white/10 p-6 mb-6">
+      <h2 className="text-xl font-semibold text-white mb-2">Importar Extracto Bancario</h2>
+      <p className="text-sm text-gray-400 mb-4">
+        CSV (date, amount, description y opcionalmente category, type), OFX/QFX o CAMT.053 (.xml)
+      </p>
+
+      <form onSubmit={handleSubmit} className="flex flex-col md:flex-row gap-4 items-start md:items-center">
+        <select
+          value={accountId}
+          onChange={(e) => setAccountId(Number(e.target.value))}
+          className="px-4 py-2 bg-[#0B0F1A] border border-white/10 rounded-lg text-white"
+        >
+          {accounts.map(account => (
+            <option key={account.account_id} value={account.account_id}>{account.name}</option>
+          ))}
+        </select>
+        <input
+          type="file"
+          accept=".csv,.ofx,.qfx,.xml,text/csv"
+          onChange={(e) => setFile(e.target.files?.[0] ?? null)}
+          className="text-sm text-gray-300 file:mr-4 file:px-4 file:py-2 file:rounded-lg file:border-0 file:bg-purple-600/20 file:text-purple-300"
+        />
+        <button
+          type="submit"
+          disabled={!file || !accountId || loading}
+          className="flex items-center gap-2 px-4 py-2 bg-purple-600 hover:bg-purple-700 rounded-lg transition-colors disabled:opacity-50"
+        >
+          {loading ? <Loader2 className="w-4 h-4 animate-spin" /> : <Upload className="w-4 h-4" />}
+          Importar
+        </button>
+      </form>
+
+      {toast && (
+        <Toast
+          message={toast.message}
+          type={toast.type}
+          onClose={() => setToast(null)}
+        />
+      )}
+    </div>
+  );
+}
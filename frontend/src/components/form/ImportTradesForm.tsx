@@ -0,0 +1,64 @@
+import { useState } from 'react';
+import { Upload, Loader2 } from 'lucide-react';
+import { importTrades } from '../../services/tradeService';
+import Toast from '../Toast';
+
+interface ImportTradesFormProps {
+  onSuccess?: () => void;
+}
+
+export default function ImportTradesForm({ onSuccess }: ImportTradesFormProps) {
+  const [file, setFile] = useState<File | null>(null);
+  const [loading, setLoading] = useState(false);
+  const [toast, setToast] = useState<{message: string, type: 'error' | 'success'} | null>(null);
+
+  const handleSubmit = async (e: React.FormEvent) => {
+    e.preventDefault();
+    if (!file) return;
+    try {
+      setLoading(true);
+      const result = await importTrades(file);
+      setToast({ message: `${result.operations_imported} operaciones importadas`, type: 'success' });
+      setFile(null);
+      onSuccess?.();
+    } catch (err) {
+      setToast({ message: err instanceof Error ? err.message : 'Error al importar el CSV', type: 'error' });
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <div className="rounded-xl bg-[#11162A] border border-white/10 p-6 mb-6">
+      <h2 className="text-xl font-semibold text-white mb-2">Importar Operaciones (CSV)</h2>
+      <p className="text-sm text-gray-400 mb-4">
+        Columnas: date, account_id, operation_type, quantity, price, fees y asset_id, ticker o isin
+      </p>
+
+      <form onSubmit={handleSubmit} className="flex flex-col md:flex-row gap-4 items-start md:items-center">
+        <input
+          type="file"
+          accept=".csv,text/csv"
+          onChange={(e) => setFile(e.target.files?.[0] ?? null)}
+          className="text-sm text-gray-300 file:mr-4 file:px-4 file:py-2 file:rounded-lg file:border-0 file:bg-purple-600/20 file:text-purple-300"
+        />
+        <button
+          type="submit"
+          disabled={!file || loading}
+          className="flex items-center gap-2 px-4 py-2 bg-purple-600 hover:bg-purple-700 rounded-lg transition-colors disabled:opacity-50"
+        >
+          {loading ? <Loader2 className="w-4 h-4 animate-spin" /> : <Upload className="w-4 h-4" />}
+          Importar
+        </button>
+      </form>
+
+      {toast && (
+        <Toast
+          message={toast.message}
+          type={toast.type}
+          onClose={() => setToast(null)}
+        />
+      )}
+    </div>
+  );
+}
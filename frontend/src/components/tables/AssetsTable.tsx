@@ -1,6 +1,5 @@
-import { useEffect, useState } from 'react'
+import { useState } from 'react'
 import { AssetTableRow } from '../../types/asset'
-import { getAllAssets } from '../../services/assetService'
 import { TrendingUp, TrendingDown, ChevronUp, ChevronDown } from 'lucide-react'
 
 interface AssetWithExtras extends AssetTableRow {
@@ -8,27 +7,15 @@ interface AssetWithExtras extends AssetTableRow {
   profit: number
 }
 
-export default function AssetsTable() {
-  const [assets, setAssets] = useState<AssetTableRow[]>([])
-  const [loading, setLoading] = useState(true)
+interface Props {
+  assets: AssetTableRow[]
+  loading: boolean
+}
+
+export default function AssetsTable({ assets, loading }: Props) {
   const [sortField, setSortField] = useState<keyof AssetWithExtras>('total_value')
   const [sortDirection, setSortDirection] = useState<'asc' | 'desc'>('desc')
 
-  useEffect(() => { loadAssets() }, [])
-
-  const loadAssets = async () => {
-    try {
-      setLoading(true)
-      const data = await getAllAssets()
-      setAssets(data || [])
-    } catch (error) {
-      console.error('Error:', error)
-      setAssets([])
-    } finally {
-      setLoading(false)
-    }
-  }
-
   const totalPortfolioValue = assets.reduce((sum, asset) => sum + (asset.total_value || 0), 0)
 
   const assetsWithExtras: AssetWithExtras[] = assets.map(asset => ({
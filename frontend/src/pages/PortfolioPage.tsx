@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import KPICard from '../components/KPICard'
-import { getAccountsWithBalance } from '../services/accountService'
+import { getDashboard } from '../services/dashboardService'
 import { AccountWithBalance } from '../types/account'
 import { PieChart, TrendingUp, Wallet } from 'lucide-react'
 import AccountsDonut from '../components/donuts/AccountsDonut'
@@ -10,8 +10,7 @@ import GroupBySelector from '../components/selectors/GroupSelector'
 import AssetsTable from '../components/tables/AssetsTable'
 import AssetsTreemap from '../components/AssetTreemap'
 import PortfolioHistoryChart from '../components/PortfolioHistoryChart'
-import { getPerformanceMetrics } from '../services/performanceService'
-import { PerformanceResponse } from '../types/performance'
+import { DashboardResponse } from '../types/dashboard'
 
 
 const formatCurrency = (value: number) => {
@@ -28,21 +27,22 @@ export default function PortfolioPage() {
   const [selectedAssetAccountId, setSelectedAssetAccountId] = useState<number | 'all'>('all')
   const [groupBy, setGroupBy] = useState<'type' | 'theme' | 'asset'>('type')
   const [historyAccountId, setHistoryAccountId] = useState<number | 'all'>('all');
-  const [metrics, setMetrics] = useState<PerformanceResponse | null>(null)
+  const [dashboard, setDashboard] = useState<DashboardResponse | null>(null)
   const [loading, setLoading] = useState(true)
   useEffect(() => {
-      loadAccounts()
+      loadDashboard()
   }, []);
 
-  const loadAccounts = async () => {
+  // Una sola petición trae cuentas, activos, asignaciones, métricas y crecimiento
+  const loadDashboard = async () => {
     try {
       setLoading(true)
-      const data = await getAccountsWithBalance()
-      setAccounts(data)
-      const metricsData = await getPerformanceMetrics()
-      setMetrics(metricsData)
+      const data = await getDashboard()
+      setDashboard(data)
+      setAccounts(data.accounts)
     } catch (error) {
-      console.error('Error al obtener cuentas:', error)
+      console.error('Error al obtener el dashboard:', error)
+      setDashboard(null)
       setAccounts([])
     } finally {
       setLoading(false)
@@ -64,6 +64,7 @@ export default function PortfolioPage() {
   )
 
   // Calcular rendimiento
+  const metrics = dashboard?.performance
   const monthlyPerformance = metrics?.month?.pct || 0
   const ytdPerformance = metrics?.ytd?.pct || 0
   const totalPerformance = metrics?.total?.pct || 0
@@ -183,6 +184,8 @@ export default function PortfolioPage() {
           </div>
           <div className="flex justify-center items-center">
             <AssetsDonut
+              overview={dashboard?.allocation ?? null}
+              loading={loading}
               selectedAccountId={selectedAssetAccountId}
               groupBy={groupBy}
             />
@@ -198,7 +201,7 @@ export default function PortfolioPage() {
             <p className="text-sm text-gray-400">Tamaño por valor total | Color por rendimiento</p>
           </div>
         </div>
-          <AssetsTreemap />
+          <AssetsTreemap assets={dashboard?.assets ?? []} loading={loading} />
       </div>
 
       {/* Line chart */}
@@ -238,7 +241,13 @@ export default function PortfolioPage() {
         </div>
 
         <div className="h-80 w-full">
-          <PortfolioHistoryChart accountId={historyAccountId} />
+          {/* Se monta tras el dashboard para no pedir dos veces la serie general */}
+          {!loading && (
+            <PortfolioHistoryChart
+              accountId={historyAccountId}
+              portfolioGrowth={dashboard?.growth ?? null}
+            />
+          )}
         </div>
       </div>
       {/* Tabla */}
@@ -249,7 +258,7 @@ export default function PortfolioPage() {
             <p className="text-sm text-gray-400">Detalle individual, pesos de cartera y beneficio acumulado</p>
           </div>
         </div>
-        <AssetsTable />
+        <AssetsTable assets={dashboard?.assets ?? []} loading={loading} />
       </div>
 
     </div>
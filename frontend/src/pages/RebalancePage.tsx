@@ -1,11 +1,12 @@
 import { useState, useEffect } from 'react'
 import { Scale, Save, AlertCircle, Info, Calculator, ArrowRight, Wallet, TrendingUp } from 'lucide-react'
-import { RebalanceSetting } from '../types/rebalance'
+import { RebalanceSetting, RebalancePlan } from '../types/rebalance'
 import { AssetTableRow } from '../types/asset'
-import { getRebalanceTable, saveRebalanceSettings } from '../services/rebalanceService'
+import { getRebalanceTable, saveRebalanceSettings, getRebalancePlan } from '../services/rebalanceService'
 import { getAllAssets } from '../services/assetService'
 import KPICard from '../components/KPICard'
 import Toast from '../components/Toast'
+import RebalanceBacktestChart from '../components/RebalanceBacktestChart'
 
 export default function RebalancePage() {
   const [rebalanceData, setRebalanceData] = useState<RebalanceSetting[]>([])
@@ -16,6 +17,11 @@ export default function RebalancePage() {
   const [isSaving, setIsSaving] = useState(false)
   const [saveSuccess, setSaveSuccess] = useState(false)
   const [toast, setToast] = useState<{ message: string; type: 'success' | 'error' } | null>(null)
+  const [plan, setPlan] = useState<RebalancePlan | null>(null)
+  const [minTrade, setMinTrade] = useState<number>(0)
+  const [wholeShares, setWholeShares] = useState(true)
+  const [allowSells, setAllowSells] = useState(false)
+  const [isPlanning, setIsPlanning] = useState(false)
 
   useEffect(() => {
     fetchInitialData()
@@ -66,6 +72,7 @@ export default function RebalancePage() {
     try {
       const payload = rebalanceData.map(({ asset_id, target_percentage }) => ({ asset_id, target_percentage }))
       await saveRebalanceSettings(payload)
+      setPlan(null)
       setToast({ message: 'Configuración guardada correctamente', type: 'success' })
     } catch (err) {
       setToast({ message: 'Error al guardar configuración', type: 'error' })
@@ -74,6 +81,21 @@ export default function RebalancePage() {
     }
   }
 
+  // Órdenes calculadas en el servidor con la estrategia guardada
+  const handlePlan = async () => {
+    setIsPlanning(true)
+    try {
+      const data = await getRebalancePlan({ cash: dcaAmount, minTrade, wholeShares, allowSells })
+      setPlan(data)
+    } catch (err) {
+      setToast({ message: 'Error al calcular las órdenes', type: 'error' })
+    } finally {
+      setIsPlanning(false)
+    }
+  }
+
+  const formatEur = (value: number) => value.toLocaleString('es-ES', { minimumFractionDigits: 2, maximumFractionDigits: 2 })
+
   if (loading) return <div className="flex justify-center items-center min-h-[60vh] text-purple-400">Calculando pesos de cartera...</div>
 
   return (
@@ -235,6 +257,95 @@ export default function RebalancePage() {
           </button>
         </div>
       </div>
+      {/* Plan de órdenes */}
+      <div className="rounded-xl bg-[#11162A] border border-white/10 overflow-hidden">
+        <div className="p-6 flex flex-wrap justify-between items-end gap-4 border-b border-white/10">
+          <div>
+            <h2 className="text-xl font-bold">Órdenes de rebalanceo</h2>
+            <p className="text-sm text-gray-400">Compras y ventas para acercarse a la estrategia guardada con el monto DCA disponible</p>
+          </div>
+          <div className="flex flex-wrap items-center gap-4 text-sm">
+            <label className="flex items-center gap-2 text-gray-400">
+              Orden mínima €
+              <input
+                type="number"
+                min={0}
+                value={minTrade || ''}
+                placeholder="0"
+                onChange={(e) => setMinTrade(parseFloat(e.target.value) || 0)}
+                className="w-20 px-2 py-1 bg-[#0B0F1A] border border-white/10 rounded text-white focus:border-purple-500 outline-none"
+              />
+            </label>
+            <label className="flex items-center gap-2 text-gray-400">
+              <input type="checkbox" checked={wholeShares} onChange={(e) => setWholeShares(e.target.checked)} />
+              Acciones enteras
+            </label>
+            <label className="flex items-center gap-2 text-gray-400">
+              <input type="checkbox" checked={allowSells} onChange={(e) => setAllowSells(e.target.checked)} />
+              Permitir ventas
+            </label>
+            <button
+              onClick={handlePlan}
+              disabled={isPlanning}
+              className="flex items-center gap-2 px-5 py-2 rounded-xl font-bold bg-purple-600 hover:bg-purple-500 disabled:bg-gray-800 disabled:text-gray-500 transition-all"
+            >
+              <Calculator className="w-4 h-4" />
+              {isPlanning ? 'Calculando...' : 'Calcular órdenes'}
+            </button>
+          </div>
+        </div>
+
+        {plan && (
+          <>
+            <table className="w-full text-left">
+              <thead className="bg-[#0B0F1A] border-b border-white/10 text-gray-400 text-xs uppercase tracking-widest">
+                <tr>
+                  <th className="p-4">Activo</th>
+                  <th className="p-4 text-center">Orden</th>
+                  <th className="p-4 text-right">Cantidad</th>
+                  <th className="p-4 text-right">Importe</th>
+                  <th className="p-4 text-center">Peso Actual</th>
+                  <th className="p-4 text-center">Peso Final</th>
+                  <th className="p-4 text-center">Peso Objetivo</th>
+                </tr>
+              </thead>
+              <tbody>
+                {plan.assets.map((asset) => (
+                  <tr key={asset.asset_id} className="border-b border-white/5 hover:bg-white/5 transition-colors">
+                    <td className="p-4 font-semibold text-white">
+                      {asset.asset_name}
+                      {asset.ticker && <span className="ml-2 text-xs text-gray-500 font-mono">{asset.ticker}</span>}
+                    </td>
+                    <td className="p-4 text-center">
+                      <span className={`px-2 py-1 rounded text-xs font-bold uppercase ${
+                        asset.action === 'buy' ? 'bg-green-500/10 text-green-400'
+                          : asset.action === 'sell' ? 'bg-red-500/10 text-red-400'
+                          : 'bg-white/5 text-gray-500'
+                      }`}>
+                        {asset.action === 'buy' ? 'Comprar' : asset.action === 'sell' ? 'Vender' : 'Mantener'}
+                      </span>
+                    </td>
+                    <td className="p-4 text-right font-mono">
+                      {asset.trade_quantity.toLocaleString('es-ES', { maximumFractionDigits: 6 })}
+                    </td>
+                    <td className="p-4 text-right font-mono">€ {formatEur(asset.trade_value)}</td>
+                    <td className="p-4 text-center text-gray-500 text-sm">{asset.current_weight.toFixed(2)}%</td>
+                    <td className="p-4 text-center text-white text-sm font-bold">{asset.post_trade_weight.toFixed(2)}%</td>
+                    <td className="p-4 text-center text-gray-500 text-sm">{asset.target_weight.toFixed(2)}%</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+            <div className="p-6 bg-[#0B0F1A]/50 flex flex-wrap gap-8 text-sm text-gray-400">
+              <span>Efectivo disponible: <span className="text-white font-mono">€ {formatEur(plan.cash_available)}</span></span>
+              <span>Efectivo usado: <span className="text-white font-mono">€ {formatEur(plan.cash_used)}</span></span>
+              <span>Efectivo restante: <span className="text-white font-mono">€ {formatEur(plan.cash_remaining)}</span></span>
+            </div>
+          </>
+        )}
+      </div>
+
+      <RebalanceBacktestChart />
     </div>
   )
 }
\ No newline at end of file
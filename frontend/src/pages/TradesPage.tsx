@@ -1,13 +1,17 @@
 import { useState, useEffect } from 'react'
 import { TradeHistory } from '../types/trade'
 import { getTradeHistory } from '../services/tradeService'
+import { downloadExport } from '../services/exportService'
 import { Filter, Search, Download } from 'lucide-react'
 import { Wallet, TrendingUp, PieChart } from 'lucide-react'
 import KPICard from '../components/KPICard'
 import AddTradeForm from '../components/form/AddTradeForm';
+import ImportTradesForm from '../components/form/ImportTradesForm';
 
 export default function TradesPage() {
   const [trades, setTrades] = useState<TradeHistory[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [filter, setFilter] = useState({
@@ -16,16 +20,22 @@ export default function TradesPage() {
     operationType: 'all'
   })
 
+  // El tipo de operación se filtra en el servidor; activo y cuenta, sobre las páginas ya cargadas
   useEffect(() => {
     fetchTradeHistory()
-  }, [])
+  }, [filter.operationType])
+
+  const serverFilters = () => (
+    filter.operationType === 'all' ? {} : { operation_type: filter.operationType as 'buy' | 'sell' }
+  )
 
   const fetchTradeHistory = async () => {
     setLoading(true)
     setError(null)
     try {
-      const data = await getTradeHistory()
-      setTrades(data)
+      const page = await getTradeHistory(null, serverFilters())
+      setTrades(page.items)
+      setNextCursor(page.next_cursor)
     } catch (err) {
       setError('Error al cargar el historial de operaciones')
       console.error(err)
@@ -34,6 +44,21 @@ export default function TradesPage() {
     }
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await getTradeHistory(nextCursor, serverFilters())
+      setTrades(prev => [...prev, ...page.items])
+      setNextCursor(page.next_cursor)
+    } catch (err) {
+      setError('Error al cargar más operaciones')
+      console.error(err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   // Filtrar trades
   const filteredTrades = trades.filter(trade => {
     if (filter.ticker && trade.asset_name) {
@@ -70,37 +95,14 @@ export default function TradesPage() {
     )
   }
 
-  const handleExport = () => {
-  if (filteredTrades.length === 0) return;
-
-  // 1. Definir cabeceras
-  const headers = ["Fecha,Ticker,Activo,Cantidad,Precio,Tipo,Cuenta,Total"];
-  
-  // 2. Formatear las filas
-  const rows = filteredTrades.map(t => [
-    new Date(t.date).toISOString(),
-    t.ticker || t.isin ||'N/A',
-    t.asset_name,
-    t.quantity,
-    t.price,
-    t.operation_type,
-    t.account_name,
-    (t.quantity * t.price).toFixed(2)
-  ].join(","));
-
-  // 3. Crear el Blob y descargar
-  const csvContent = headers.concat(rows).join("\n");
-  const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-  const url = URL.createObjectURL(blob);
-  const link = document.createElement("a");
-  
-  link.setAttribute("href", url);
-  link.setAttribute("download", `trades_${new Date().getTime()}.csv`);
-  link.style.visibility = 'hidden';
-  document.body.appendChild(link);
-  link.click();
-  document.body.removeChild(link);
-};
+  // Exporta todas las operaciones (no solo las páginas cargadas) desde el servidor
+  const handleExport = async () => {
+    try {
+      await downloadExport('operations', 'csv')
+    } catch (err) {
+      setError('Error al exportar las operaciones')
+    }
+  }
 
   return (
     <div className="space-y-8">
@@ -168,6 +170,7 @@ export default function TradesPage() {
           fetchTradeHistory();
         }}
       />
+      <ImportTradesForm onSuccess={fetchTradeHistory} />
       {/* Filtros */}
       <div className="rounded-xl bg-[#11162A] border border-white/10 p-6">
         <div className="flex items-center gap-3 mb-6">
@@ -294,7 +297,7 @@ export default function TradesPage() {
                 <tbody>
                   {filteredTrades.map((trade, index) => (
                     <tr 
-                      key={index}
+                      key={trade.operation_id}
                       className={`border-b border-white/5 hover:bg-white/5 transition-colors
                         ${index % 2 === 0 ? 'bg-[#11162A]/50' : ''}`}
                     >
@@ -365,6 +368,18 @@ export default function TradesPage() {
                 </tbody>
               </table>
             </div>
+            {nextCursor && (
+              <div className="p-4 text-center border-t border-white/5">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="px-4 py-2 bg-purple-600/20 hover:bg-purple-600/30 
+                    border border-purple-500/30 rounded-lg transition-colors disabled:opacity-50"
+                >
+                  {loadingMore ? 'Cargando...' : 'Cargar más'}
+                </button>
+              </div>
+            )}
           </>
         )}
       </div>
@@ -1,36 +1,81 @@
 import { useState, useEffect } from 'react'
-import { Transaction } from '../types/transaction'
-import { getTransactions } from '../services/transactionService'
-import { Filter, Search, Download, Wallet, ArrowUpCircle, ArrowDownCircle } from 'lucide-react'
+import { Transaction, TransactionSummaryRow, MonthlyTrendPoint } from '../types/transaction'
+import { getTransactions, getTransactionSummary, deleteTransaction, getMonthlyTrend } from '../services/transactionService'
+import { downloadExport } from '../services/exportService'
+import { Filter, Search, Download, Wallet, ArrowUpCircle, ArrowDownCircle, Trash2 } from 'lucide-react'
 import KPICard from '../components/KPICard'
 import AddTransactionForm from '../components/form/AddTransactionForm'
+import ImportStatementForm from '../components/form/ImportStatementForm'
 
 export default function TransactionsPage() {
   const [transactions, setTransactions] = useState<Transaction[]>([])
+  const [summary, setSummary] = useState<TransactionSummaryRow[]>([])
+  const [trend, setTrend] = useState<MonthlyTrendPoint[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [filter, setFilter] = useState({ description: '', type: 'all' })
 
-  useEffect(() => { fetchHistory() }, [])
+  // El tipo se filtra en el servidor; la descripción, sobre las páginas ya cargadas
+  useEffect(() => { fetchHistory() }, [filter.type])
+
+  const serverFilters = () => (
+    filter.type === 'all' ? {} : { type: filter.type as 'income' | 'expense' }
+  )
 
   const fetchHistory = async () => {
     setLoading(true)
     try {
-      const data = await getTransactions()
-      setTransactions(data)
+      const [page, totals, monthly] = await Promise.all([
+        getTransactions(null, serverFilters()),
+        getTransactionSummary(serverFilters()),
+        getMonthlyTrend(6)
+      ])
+      setTransactions(page.items)
+      setNextCursor(page.next_cursor)
+      setSummary(totals)
+      setTrend(monthly)
     } catch (err) {
       setError('Error al cargar transacciones')
     } finally { setLoading(false) }
   }
 
-  const filtered = transactions.filter(t => {
-    const matchDesc = t.description?.toLowerCase().includes(filter.description.toLowerCase()) || true
-    const matchType = filter.type === 'all' || t.type === filter.type
-    return matchDesc && matchType
-  })
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await getTransactions(nextCursor, serverFilters())
+      setTransactions(prev => [...prev, ...page.items])
+      setNextCursor(page.next_cursor)
+    } catch (err) {
+      setError('Error al cargar más transacciones')
+    } finally { setLoadingMore(false) }
+  }
+
+  const handleDelete = async (transactionId: number) => {
+    if (!window.confirm('¿Eliminar esta transacción?')) return
+    try {
+      await deleteTransaction(transactionId)
+      await fetchHistory()
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Error al eliminar la transacción')
+    }
+  }
+
+  const filtered = transactions.filter(t =>
+    !filter.description || (t.description ?? '').toLowerCase().includes(filter.description.toLowerCase())
+  )
+
+  // Totales de todo el histórico, agregados en el servidor
+  const totalIn = summary.filter(r => r.type === 'income').reduce((s, r) => s + r.total, 0)
+  const totalOut = summary.filter(r => r.type === 'expense').reduce((s, r) => s + r.total, 0)
 
-  const totalIn = filtered.filter(t => t.type === 'income').reduce((s, t) => s + t.amount, 0)
-  const totalOut = filtered.filter(t => t.type === 'expense').reduce((s, t) => s + t.amount, 0)
+  const expensesByCategory = Object.entries(
+    summary
+      .filter(r => r.type === 'expense')
+      .reduce<Record<string, number>>((acc, r) => ({ ...acc, [r.category]: (acc[r.category] ?? 0) + r.total }), {})
+  ).sort((a, b) => b[1] - a[1])
 
   if (loading) return <div className="flex justify-center p-20 text-gray-400">Cargando caja...</div>
 
@@ -42,6 +87,14 @@ export default function TransactionsPage() {
             <h1 className="text-3xl font-bold">Movimientos de Efectivo</h1>
             <p className="text-gray-400">Gestiona tus entradas y salidas de capital</p>
           </div>
+          <button
+            onClick={() => downloadExport('transactions', 'csv').catch(() => setError('Error al exportar las transacciones'))}
+            className="flex items-center gap-2 px-4 py-2 bg-purple-600/20 hover:bg-purple-600/30 
+              border border-purple-500/30 rounded-lg transition-all hover:border-purple-400/50 cursor-pointer"
+          >
+            <Download className="w-4 h-4" />
+            Exportar CSV
+          </button>
         </div>
 
         <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
@@ -52,6 +105,44 @@ export default function TransactionsPage() {
       </div>
 
       <AddTransactionForm onSuccess={fetchHistory} />
+      <ImportStatementForm onSuccess={fetchHistory} />
+
+      {error && <div className="p-4 rounded-xl bg-red-500/10 border border-red-500/30 text-red-400">{error}</div>}
+
+      {trend.length > 0 && (
+        <div className="rounded-xl bg-[#11162A] border border-white/10 p-6">
+          <h2 className="text-lg font-semibold mb-4">Últimos meses</h2>
+          <div className="grid grid-cols-2 md:grid-cols-6 gap-4">
+            {trend.map(point => (
+              <div key={point.month} className="p-4 rounded-lg bg-[#0B0F1A] border border-white/5">
+                <p className="text-gray-400 text-sm">
+                  {new Date(point.month).toLocaleDateString(undefined, { month: 'short', year: 'numeric' })}
+                </p>
+                <p className={`font-bold ${point.net >= 0 ? 'text-green-400' : 'text-red-400'}`}>
+                  € {point.net.toLocaleString(undefined, { maximumFractionDigits: 2 })}
+                </p>
+                {point.expense_change_pct !== null && (
+                  <p className="text-xs text-gray-500">Gastos {point.expense_change_pct > 0 ? '+' : ''}{point.expense_change_pct}%</p>
+                )}
+              </div>
+            ))}
+          </div>
+        </div>
+      )}
+
+      {expensesByCategory.length > 0 && (
+        <div className="rounded-xl bg-[#11162A] border border-white/10 p-6">
+          <h2 className="text-lg font-semibold mb-4">Gastos por categoría</h2>
+          <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
+            {expensesByCategory.map(([category, total]) => (
+              <div key={category} className="p-4 rounded-lg bg-[#0B0F1A] border border-white/5">
+                <p className="text-gray-400 text-sm">{category}</p>
+                <p className="font-bold">€ {total.toLocaleString(undefined, { maximumFractionDigits: 2 })}</p>
+              </div>
+            ))}
+          </div>
+        </div>
+      )}
 
       <div className="rounded-xl bg-[#11162A] border border-white/10 overflow-hidden">
         <table className="w-full">
@@ -62,6 +153,7 @@ export default function TransactionsPage() {
               <th className="text-left p-4 text-gray-400 text-sm uppercase">Descripción</th>
               <th className="text-left p-4 text-gray-400 text-sm uppercase">Tipo</th>
               <th className="text-left p-4 text-gray-400 text-sm uppercase">Monto</th>
+              <th className="p-4"></th>
             </tr>
           </thead>
           <tbody>
@@ -76,10 +168,28 @@ export default function TransactionsPage() {
                   </span>
                 </td>
                 <td className="p-4 font-bold">€ {t.amount.toLocaleString()}</td>
+                <td className="p-4 text-right">
+                  {t.category !== 'Inversión' && (
+                    <button onClick={() => handleDelete(t.transaction_id)} className="text-gray-500 hover:text-red-400 transition-colors" title="Eliminar">
+                      <Trash2 className="w-4 h-4" />
+                    </button>
+                  )}
+                </td>
               </tr>
             ))}
           </tbody>
         </table>
+        {nextCursor && (
+          <div className="p-4 text-center border-t border-white/5">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-4 py-2 bg-purple-600/20 hover:bg-purple-600/30 border border-purple-500/30 rounded-lg transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
@@ -72,6 +72,10 @@ async function apiRequest<T>(
     requireAuth: boolean = false
 ): Promise<T> {
     const headers = await getHeaders(requireAuth);
+    // Con FormData el navegador pone el Content-Type multipart con su boundary
+    if (options.body instanceof FormData) {
+        delete headers['Content-Type'];
+    }
     
     const config: RequestInit = {
         ...options,
@@ -113,7 +117,9 @@ async function apiRequest<T>(
         
         try {
             const errorData = await response.json();
-            errorMessage = errorData.detail || errorData.message || errorMessage;
+            // Algunos endpoints (p. ej. importaciones) devuelven detail como objeto con message
+            const detail = typeof errorData.detail === 'object' ? errorData.detail?.message : errorData.detail;
+            errorMessage = detail || errorData.message || errorMessage;
         } catch {
             errorMessage = await response.text() || errorMessage;
         }
@@ -121,6 +127,11 @@ async function apiRequest<T>(
         throw new Error(errorMessage);
     }
 
+    // 204 No Content (p. ej. DELETE) no trae cuerpo
+    if (response.status === 204) {
+        return undefined as T;
+    }
+
     return response.json();
 }
 
@@ -133,6 +144,29 @@ export async function apiGet<T>(
 }
 
 
+/**
+ * Descarga un fichero del API (con autenticación) y lo guarda con el nombre que indica el servidor
+ */
+export async function apiDownload(endpoint: string, fallbackName: string): Promise<void> {
+    const headers = await getHeaders(true);
+    const response = await fetch(`${API_BASE_URL}${endpoint}`, { headers });
+    if (!response.ok) {
+        throw new Error(`API error: ${response.status}`);
+    }
+
+    const disposition = response.headers.get('Content-Disposition') ?? '';
+    const filename = disposition.match(/filename="([^"]+)"/)?.[1] ?? fallbackName;
+    const url = URL.createObjectURL(await response.blob());
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = filename;
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+    URL.revokeObjectURL(url);
+}
+
+
 export async function apiPost<T>(
   endpoint: string, 
   data: any, 
@@ -170,9 +204,9 @@ export async function apiPost<T>(
 //     }, requireAuth);
 // }
 
-// export async function apiDelete<T>(
-//     endpoint: string, 
-//     requireAuth: boolean = false
-// ): Promise<T> {
-//     return apiRequest<T>(endpoint, { method: 'DELETE' }, requireAuth);
-// }
\ No newline at end of file
+export async function apiDelete<T>(
+    endpoint: string, 
+    requireAuth: boolean = false
+): Promise<T> {
+    return apiRequest<T>(endpoint, { method: 'DELETE' }, requireAuth);
+}
\ No newline at end of file
@@ -1,4 +1,4 @@
-import { AssetAllocation, AssetTableRow, Asset, AssetCreate } from '../types/asset'
+import { AssetAllocation, AllocationOverview, AssetTableRow, Asset, AssetCreate } from '../types/asset'
 import { apiGet, apiPost } from './api'
 
 
@@ -25,6 +25,19 @@ export async function getAccountAssetAllocation(accountId: number, groupBy: 'typ
     }
 }
 
+/**
+ * Obtiene en una sola petición todas las asignaciones (asset, theme, type), globales y por cuenta
+ */
+export async function getAllocationOverview(): Promise<AllocationOverview> {
+    try {
+        const data = await apiGet<AllocationOverview>('/portfolio/allocation', true)
+        return data
+    } catch (error) {
+        console.error('Error fetching allocation overview:', error)
+        throw error
+    }
+}
+
 export async function getAllAssets(): Promise<AssetTableRow[]> {
     try {
         const data = await apiGet<AssetTableRow[]>('/portfolio/assets/all', true)
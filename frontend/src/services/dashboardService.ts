@@ -0,0 +1,14 @@
+import { apiGet } from './api'
+import { DashboardResponse } from '../types/dashboard'
+
+/**
+ * Obtiene en una sola petición todos los datos de la página de portfolio
+ */
+export async function getDashboard(): Promise<DashboardResponse> {
+  try {
+    return await apiGet<DashboardResponse>('/portfolio/dashboard', true);
+  } catch (error) {
+    console.error('Error fetching dashboard:', error);
+    throw error;
+  }
+}
@@ -0,0 +1,17 @@
+import { apiDownload } from './api';
+
+export type ExportDataset = 'operations' | 'transactions' | 'prices';
+export type ExportFormat = 'csv' | 'parquet';
+
+/**
+ * Descarga el histórico completo (operaciones, transacciones o precios) en CSV o Parquet
+ * El servidor lo genera por trozos, sin depender de las páginas cargadas en pantalla
+ */
+export async function downloadExport(dataset: ExportDataset, format: ExportFormat = 'csv'): Promise<void> {
+  try {
+    await apiDownload(`/export/${dataset}?format=${format}`, `${dataset}.${format}`);
+  } catch (error) {
+    console.error('Error exporting data:', error);
+    throw error;
+  }
+}
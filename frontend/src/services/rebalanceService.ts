@@ -1,5 +1,5 @@
 import { apiGet, apiPost } from './api';
-import { RebalanceSetting, RebalanceUpdate, RebalanceBulkUpdate } from '../types/rebalance';
+import { RebalanceSetting, RebalanceUpdate, RebalanceBulkUpdate, RebalancePlan, RebalancePlanOptions, RebalanceBacktest, RebalanceStrategy } from '../types/rebalance';
 
 export async function getRebalanceTable(): Promise<RebalanceSetting[]> {
     try {
@@ -21,4 +21,31 @@ export async function saveRebalanceSettings(settings: RebalanceUpdate[]): Promis
         console.error('Error saving rebalance settings:', error);
         throw error;
     }
-}
\ No newline at end of file
+}
+
+export async function getRebalancePlan(options: RebalancePlanOptions): Promise<RebalancePlan> {
+    try {
+        const params = new URLSearchParams({
+            cash: String(options.cash),
+            min_trade: String(options.minTrade),
+            whole_shares: String(options.wholeShares),
+            allow_sells: String(options.allowSells),
+        });
+        const data = await apiGet<RebalancePlan>(`/rebalance/plan?${params.toString()}`, true);
+        return data;
+    } catch (error) {
+        console.error('Error fetching rebalance plan:', error);
+        throw error;
+    }
+}
+
+export async function getRebalanceBacktest(strategy: RebalanceStrategy, threshold: number): Promise<RebalanceBacktest> {
+    try {
+        const params = new URLSearchParams({ strategy, threshold: String(threshold) });
+        const data = await apiGet<RebalanceBacktest>(`/rebalance/backtest?${params.toString()}`, true);
+        return data;
+    } catch (error) {
+        console.error('Error fetching rebalance backtest:', error);
+        throw error;
+    }
+}
@@ -1,13 +1,19 @@
-import { TradeHistory, Operation, OperationCreate } from '../types/trade';
+import { TradeHistoryPage, TradeHistoryFilters, TradeImportResult, Operation, OperationCreate } from '../types/trade';
 import { apiGet, apiPost } from './api';
 
 /**
- * Obtiene el historial completo de operaciones del usuario
- * Incluye todas las operaciones de compra/venta de todas las cuentas
+ * Obtiene una página del historial de operaciones del usuario (más recientes primero)
+ * Para la página siguiente se pasa el `next_cursor` de la anterior
  */
-export async function getTradeHistory(): Promise<TradeHistory[]> {
+export async function getTradeHistory(cursor?: string | null, filters: TradeHistoryFilters = {}): Promise<TradeHistoryPage> {
     try {
-        const data = await apiGet<TradeHistory[]>('/trades/history', true);
+        const params = new URLSearchParams();
+        if (cursor) params.append('cursor', cursor);
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value !== undefined && value !== '') params.append(key, String(value));
+        });
+        const query = params.toString();
+        const data = await apiGet<TradeHistoryPage>(`/trades/history${query ? `?${query}` : ''}`, true);
         return data;
     } catch (error) {
         console.error('Error fetching trade history:', error);
@@ -41,4 +47,20 @@ export async function createTradeWithPriceHistory(
         console.error('Error creating trade with price history:', error);
         throw error;
     }
-}
\ No newline at end of file
+}
+
+/**
+ * Importa un histórico de operaciones desde un CSV del bróker
+ * Columnas: date, account_id, operation_type, quantity, price, fees y asset_id, ticker o isin
+ */
+export async function importTrades(file: File): Promise<TradeImportResult> {
+    try {
+        const formData = new FormData();
+        formData.append('file', file);
+        const data = await apiPost<TradeImportResult>('/trades/import', formData, true);
+        return data;
+    } catch (error) {
+        console.error('Error importing trades:', error);
+        throw error;
+    }
+}
@@ -1,12 +1,25 @@
-import { apiGet, apiPost } from './api';
-import { Transaction, TransactionCreate } from '../types/transaction';
+import { apiGet, apiPost, apiDelete } from './api';
+import {
+  Transaction, TransactionCreate, TransactionPage, TransactionFilters, TransactionSummaryRow,
+  MonthlyTrendPoint, CategoryTrend, StatementImportResult
+} from '../types/transaction';
+
+function toQuery(params: Record<string, string | number | null | undefined>): string {
+  const search = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') search.append(key, String(value));
+  });
+  const query = search.toString();
+  return query ? `?${query}` : '';
+}
 
 /**
- * Obtiene todas las transacciones del usuario actual
+ * Obtiene una página de transacciones del usuario actual (más recientes primero)
+ * Para la página siguiente se pasa el `next_cursor` de la anterior
  */
-export async function getTransactions(): Promise<Transaction[]> {
+export async function getTransactions(cursor?: string | null, filters: TransactionFilters = {}): Promise<TransactionPage> {
   try {
-    const data = await apiGet<Transaction[]>('/transactions/me', true);
+    const data = await apiGet<TransactionPage>(`/transactions/me${toQuery({ cursor, ...filters })}`, true);
     return data;
   } catch (error) {
     console.error('Error fetching transactions:', error);
@@ -14,6 +27,19 @@ export async function getTransactions(): Promise<Transaction[]> {
   }
 }
 
+/**
+ * Totales por mes, categoría y tipo calculados en el servidor
+ */
+export async function getTransactionSummary(filters: Omit<TransactionFilters, 'category'> = {}): Promise<TransactionSummaryRow[]> {
+  try {
+    const data = await apiGet<TransactionSummaryRow[]>(`/transactions/summary${toQuery({ ...filters })}`, true);
+    return data;
+  } catch (error) {
+    console.error('Error fetching transaction summary:', error);
+    throw error;
+  }
+}
+
 /**
  * Crea una nueva transacción (Ingreso o Gasto)
  */
@@ -25,4 +51,55 @@ export async function createTransaction(transaction: TransactionCreate): Promise
     console.error('Error creating transaction:', error);
     throw error;
   }
-}
\ No newline at end of file
+}
+
+/**
+ * Da de baja una transacción (deja de contar en saldos y resúmenes)
+ */
+export async function deleteTransaction(transactionId: number): Promise<void> {
+  try {
+    await apiDelete<void>(`/transactions/${transactionId}`, true);
+  } catch (error) {
+    console.error('Error deleting transaction:', error);
+    throw error;
+  }
+}
+
+/**
+ * Ingresos, gastos y neto de los últimos meses con la variación mensual
+ */
+export async function getMonthlyTrend(months: number = 12, accountId?: number): Promise<MonthlyTrendPoint[]> {
+  try {
+    return await apiGet<MonthlyTrendPoint[]>(`/transactions/trends/monthly${toQuery({ months, account_id: accountId })}`, true);
+  } catch (error) {
+    console.error('Error fetching monthly trend:', error);
+    throw error;
+  }
+}
+
+/**
+ * Serie mensual por categoría de gastos o ingresos
+ */
+export async function getCategoryTrend(type: 'income' | 'expense' = 'expense', months: number = 12, accountId?: number): Promise<CategoryTrend> {
+  try {
+    return await apiGet<CategoryTrend>(`/transactions/trends/categories${toQuery({ type, months, account_id: accountId })}`, true);
+  } catch (error) {
+    console.error('Error fetching category trend:', error);
+    throw error;
+  }
+}
+
+/**
+ * Importa un extracto bancario (CSV, OFX/QFX o CAMT.053) en una cuenta
+ * Los movimientos que ya existen no se duplican
+ */
+export async function importStatement(accountId: number, file: File): Promise<StatementImportResult> {
+  try {
+    const formData = new FormData();
+    formData.append('file', file);
+    return await apiPost<StatementImportResult>(`/transactions/import${toQuery({ account_id: accountId })}`, formData, true);
+  } catch (error) {
+    console.error('Error importing statement:', error);
+    throw error;
+  }
+}
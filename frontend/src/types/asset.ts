@@ -5,6 +5,22 @@ export interface AssetAllocation {
   asset_count: number
 }
 
+export interface AllocationBreakdown {
+  asset: AssetAllocation[]
+  theme: AssetAllocation[]
+  type: AssetAllocation[]
+}
+
+export interface AccountAllocationBreakdown extends AllocationBreakdown {
+  account_id: number
+  name: string
+}
+
+export interface AllocationOverview {
+  portfolio: AllocationBreakdown
+  accounts: AccountAllocationBreakdown[]
+}
+
 export interface AssetTableRow {
   account_id: number
   account_name: string
@@ -19,6 +35,8 @@ export interface AssetTableRow {
   total_value: number
   invested_value: number
   performance: number
+  unrealized_gain: number
+  realized_gain: number
 }
 
 export interface Asset {
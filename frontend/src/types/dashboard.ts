@@ -0,0 +1,12 @@
+import { AccountWithBalance } from './account'
+import { AllocationOverview, AssetTableRow } from './asset'
+import { PerformanceResponse } from './performance'
+import { PortfolioPoint } from './history_chart'
+
+export interface DashboardResponse {
+  accounts: AccountWithBalance[];
+  assets: AssetTableRow[];
+  allocation: AllocationOverview;
+  performance: PerformanceResponse;
+  growth: PortfolioPoint[];
+}
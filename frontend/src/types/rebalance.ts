@@ -12,4 +12,52 @@ export interface RebalanceUpdate {
 
 export interface RebalanceBulkUpdate {
     settings: RebalanceUpdate[];
-}
\ No newline at end of file
+}
+
+export interface RebalancePlanAsset {
+    asset_id: number;
+    asset_name: string | null;
+    ticker: string | null;
+    price: number | null;
+    quantity: number;
+    current_value: number;
+    current_weight: number;
+    target_weight: number;
+    action: 'buy' | 'sell' | 'hold';
+    trade_quantity: number;
+    trade_value: number;
+    post_trade_weight: number;
+}
+
+export interface RebalancePlan {
+    total_value: number;
+    cash_available: number;
+    cash_used: number;
+    cash_remaining: number;
+    assets: RebalancePlanAsset[];
+}
+
+export interface RebalancePlanOptions {
+    cash: number;
+    minTrade: number;
+    wholeShares: boolean;
+    allowSells: boolean;
+}
+
+export type RebalanceStrategy = 'monthly' | 'quarterly' | 'threshold';
+
+export interface RebalanceBacktestPoint {
+    date: string;
+    capital_invertido: number;
+    total_value: number;
+    simulated_value: number;
+}
+
+export interface RebalanceBacktest {
+    strategy: RebalanceStrategy;
+    rebalance_count: number;
+    final_value: number;
+    real_final_value: number;
+    capital_invertido: number;
+    history: RebalanceBacktestPoint[];
+}
@@ -1,4 +1,5 @@
 export interface TradeHistory {
+    operation_id: number;
     ticker: string | null;
     isin: string | null;
     asset_name: string;
@@ -11,6 +12,19 @@ export interface TradeHistory {
     account_name: string;
 }
 
+export interface TradeHistoryPage {
+    items: TradeHistory[];
+    next_cursor: string | null;
+}
+
+export interface TradeHistoryFilters {
+    account_id?: number;
+    asset_id?: number;
+    operation_type?: 'buy' | 'sell';
+    date_from?: string;
+    date_to?: string;
+}
+
 export interface Operation {
     operation_id: number;
     asset_id: number;
@@ -30,4 +44,9 @@ export interface OperationCreate {
     price: number;
     fees?: number;
     operation_type: 'buy' | 'sell';
-}
\ No newline at end of file
+}
+export interface TradeImportResult {
+    operations_imported: number;
+    transactions_created: number;
+    positions_updated: number;
+}
@@ -16,4 +16,45 @@ export interface TransactionCreate {
   amount: number;
   type: 'income' | 'expense';
   description?: string;
-}
\ No newline at end of file
+}
+
+export interface TransactionPage {
+  items: Transaction[];
+  next_cursor: string | null;
+}
+
+export interface TransactionFilters {
+  account_id?: number;
+  category?: string;
+  type?: 'income' | 'expense';
+  date_from?: string;
+  date_to?: string;
+}
+
+export interface TransactionSummaryRow {
+  month: string;
+  category: string;
+  type: 'income' | 'expense';
+  total: number;
+  transaction_count: number;
+}
+
+export interface MonthlyTrendPoint {
+  month: string;
+  income: number;
+  expense: number;
+  net: number;
+  income_change_pct: number | null;
+  expense_change_pct: number | null;
+}
+
+export interface CategoryTrend {
+  months: string[];
+  categories: { category: string; totals: number[]; total: number }[];
+}
+
+export interface StatementImportResult {
+  rows_read: number;
+  imported: number;
+  duplicates: number;
+}
@@ -8,6 +8,9 @@ import schedule
 import pytz
 load_dotenv()
 
+# Divisa base de las valoraciones: los tipos se guardan como valor en esta divisa de una unidad de cada otra
+BASE_CURRENCY = os.getenv("BASE_CURRENCY", "EUR")
+
 def get_madrid_tz():
     """Obtiene la zona horaria de Madrid"""
     return pytz.timezone('Europe/Madrid')
@@ -44,6 +47,24 @@ def connect_db():
         host="db"
     )
 
+def notify_prices_updated():
+    """
+    Avisa al backend (LISTEN price_updates) de que hay precios, tipos o métricas nuevas
+    para que invalide las respuestas cacheadas.
+    """
+    conn = None
+    try:
+        conn = connect_db()
+        cur = conn.cursor()
+        cur.execute("SELECT pg_notify('price_updates', '')")
+        conn.commit()
+        cur.close()
+    except Exception as e:
+        print(f"Error notificando precios: {e}")
+    finally:
+        if conn:
+            conn.close()
+
 def try_get_data(identifier):
     """Intenta obtener datos de Yahoo Finance con varios sufijos si es necesario."""
     # Lista de sufijos por orden de probabilidad para fondos/ETFs en Europa
@@ -119,6 +140,7 @@ def update_prices():
         if conn:
             conn.close()
     
+    notify_prices_updated()
     print(f"Tarea de alta frecuencia finalizada: {datetime.now()}\n")
 
 def nightly_update():
@@ -165,6 +187,9 @@ def nightly_update():
             conn.close()
     
     consolidate_history()
+    update_fx_rates()
+    precompute_performance()
+    notify_prices_updated()
     
     print(f"Tarea nocturna completada: {datetime.now()}\n")
 
@@ -221,6 +246,227 @@ def consolidate_history():
         if conn:
             conn.close()
 
+def update_fx_rates():
+    """
+    Descarga los tipos de cambio diarios de las divisas usadas en cuentas y activos contra BASE_CURRENCY
+    y los guarda en fx_rates. Cada divisa continúa desde su último día guardado; la primera vez
+    se rellena desde el movimiento más antiguo para poder valorar todo el histórico.
+    """
+    print("💱 Actualizando tipos de cambio...")
+    conn = None
+    try:
+        conn = connect_db()
+        cur = conn.cursor()
+
+        cur.execute("""
+            SELECT c.currency, (SELECT MAX(fx.date) FROM fx_rates fx WHERE fx.currency = c.currency)
+            FROM (
+                SELECT currency FROM accounts
+                UNION
+                SELECT currency FROM assets
+            ) c
+            WHERE c.currency <> %s
+        """, (BASE_CURRENCY,))
+        currencies = cur.fetchall()
+
+        cur.execute("""
+            SELECT LEAST(
+                (SELECT MIN(date) FROM transactions),
+                (SELECT MIN(date) FROM operations)
+            )::date
+        """)
+        first_day = cur.fetchone()[0] or datetime.now().date()
+
+        for currency, last_date in currencies:
+            start = last_date + timedelta(days=1) if last_date else first_day
+            if start > datetime.now().date():
+                continue
+
+            pair = f"{currency}{BASE_CURRENCY}=X"
+            try:
+                data = yf.Ticker(pair).history(start=start.isoformat())
+            except Exception as e:
+                print(f"  • Error con {pair}: {e}")
+                continue
+
+            if data.empty:
+                print(f"  • {pair}: sin datos desde {start}")
+                continue
+
+            rows = [
+                (currency, index.date(), float(close))
+                for index, close in data['Close'].items()
+            ]
+            try:
+                cur.executemany("""
+                    INSERT INTO fx_rates (currency, date, rate)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (currency, date)
+                    DO UPDATE SET rate = EXCLUDED.rate
+                """, rows)
+                conn.commit()
+                print(f"  • {pair}: {len(rows)} días (último {rows[-1][2]:.4f})")
+            except Exception as e:
+                conn.rollback()
+                print(f"  • Error DB con {pair}: {e}")
+
+        cur.close()
+    except Exception as e:
+        print(f"Error actualizando tipos de cambio: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def precompute_performance():
+    """
+    Calcula en una sola pasada (basada en conjuntos) las métricas de rendimiento
+    de todos los usuarios y las guarda en performance_cache.
+    En lugar de construir la serie diaria completa, valora cada cartera solo en
+    los días de referencia (hoy, hace 1 mes, hace 3 meses e inicio de año).
+    Los importes se agrupan por divisa y se convierten a la divisa base con el tipo de cada día de referencia.
+    """
+    print("📈 Precalculando métricas de rendimiento...")
+    conn = None
+    try:
+        conn = connect_db()
+        cur = conn.cursor()
+
+        cur.execute("""
+            WITH user_bounds AS (
+                SELECT a.user_id, MIN(t.date)::date AS first_day
+                FROM transactions t
+                JOIN accounts a ON a.account_id = t.account_id
+                WHERE t.is_active = TRUE
+                GROUP BY a.user_id
+            ),
+            ref_days AS (
+                -- Si el usuario no tiene datos tan antiguos se usa su primer día (como el cálculo bajo demanda)
+                SELECT ub.user_id, r.kind, GREATEST(r.day, ub.first_day) AS day
+                FROM user_bounds ub
+                CROSS JOIN (VALUES
+                    ('current', CURRENT_DATE),
+                    ('1m', (NOW() - interval '1 month')::date),
+                    ('3m', (NOW() - interval '3 month')::date),
+                    ('ytd', DATE_TRUNC('year', NOW())::date)
+                ) AS r(kind, day)
+            ),
+            cash AS (
+                SELECT
+                    rd.user_id,
+                    rd.kind,
+                    rd.day,
+                    a.currency,
+                    SUM(CASE
+                        WHEN t.type = 'income' AND t.category != 'Inversión' THEN t.amount
+                        WHEN t.type = 'expense' AND t.category != 'Inversión' THEN -t.amount
+                        ELSE 0 END) AS capital_invertido,
+                    SUM(CASE WHEN t.type = 'income' THEN t.amount ELSE -t.amount END) AS efectivo_total
+                FROM ref_days rd
+                JOIN accounts a ON a.user_id = rd.user_id
+                JOIN transactions t ON t.account_id = a.account_id AND t.date::date <= rd.day AND t.is_active = TRUE
+                GROUP BY rd.user_id, rd.kind, rd.day, a.currency
+            ),
+            positions AS (
+                SELECT
+                    rd.user_id,
+                    rd.kind,
+                    rd.day,
+                    o.asset_id,
+                    SUM(CASE WHEN o.operation_type = 'buy' THEN o.quantity ELSE -o.quantity END) AS qty
+                FROM ref_days rd
+                JOIN accounts a ON a.user_id = rd.user_id
+                JOIN operations o ON o.account_id = a.account_id AND o.date::date <= rd.day
+                GROUP BY rd.user_id, rd.kind, rd.day, o.asset_id
+            ),
+            assets_value AS (
+                -- Último precio conocido en o antes del día de referencia (usa idx_price_asset_date)
+                SELECT p.user_id, p.kind, p.day, ast.currency, SUM(p.qty * COALESCE(lp.price, 0)) AS valor
+                FROM positions p
+                JOIN assets ast ON ast.asset_id = p.asset_id
+                LEFT JOIN LATERAL (
+                    SELECT ph.price
+                    FROM price_history ph
+                    WHERE ph.asset_id = p.asset_id
+                      AND ph.date < p.day + 1
+                    ORDER BY ph.date DESC
+                    LIMIT 1
+                ) lp ON TRUE
+                GROUP BY p.user_id, p.kind, p.day, ast.currency
+            ),
+            by_currency AS (
+                SELECT user_id, kind, day, currency,
+                    SUM(efectivo_total) AS efectivo_total,
+                    SUM(capital_invertido) AS capital_invertido,
+                    SUM(valor) AS valor
+                FROM (
+                    SELECT user_id, kind, day, currency, efectivo_total, capital_invertido, 0 AS valor FROM cash
+                    UNION ALL
+                    SELECT user_id, kind, day, currency, 0, 0, valor FROM assets_value
+                ) x
+                GROUP BY user_id, kind, day, currency
+            ),
+            converted AS (
+                -- Tipo del día de referencia (o el primero guardado si es anterior); la divisa base no tiene filas y vale 1.
+                -- El capital queda al tipo del día de referencia: el backend recalcula el actual con el tipo de cada aportación
+                SELECT
+                    b.user_id,
+                    b.kind,
+                    SUM((b.efectivo_total + b.valor) * fx.rate) AS total_value,
+                    SUM(b.capital_invertido * fx.rate) AS capital_invertido
+                FROM by_currency b
+                CROSS JOIN LATERAL (
+                    SELECT COALESCE(
+                        (SELECT rate FROM fx_rates WHERE currency = b.currency AND date <= b.day ORDER BY date DESC LIMIT 1),
+                        (SELECT rate FROM fx_rates WHERE currency = b.currency ORDER BY date LIMIT 1),
+                        1
+                    ) AS rate
+                ) fx
+                GROUP BY b.user_id, b.kind
+            ),
+            valued AS (
+                SELECT
+                    rd.user_id,
+                    rd.kind,
+                    COALESCE(cv.total_value, 0) AS total_value,
+                    COALESCE(cv.capital_invertido, 0) AS capital_invertido
+                FROM ref_days rd
+                LEFT JOIN converted cv ON cv.user_id = rd.user_id AND cv.kind = rd.kind
+            )
+            INSERT INTO performance_cache (user_id, as_of, current_val, current_cap, val_1m, val_3m, val_ytd, computed_at)
+            SELECT
+                user_id,
+                CURRENT_DATE,
+                MAX(total_value) FILTER (WHERE kind = 'current'),
+                MAX(capital_invertido) FILTER (WHERE kind = 'current'),
+                MAX(total_value) FILTER (WHERE kind = '1m'),
+                MAX(total_value) FILTER (WHERE kind = '3m'),
+                MAX(total_value) FILTER (WHERE kind = 'ytd'),
+                NOW()
+            FROM valued
+            GROUP BY user_id
+            ON CONFLICT (user_id) DO UPDATE SET
+                as_of = EXCLUDED.as_of,
+                current_val = EXCLUDED.current_val,
+                current_cap = EXCLUDED.current_cap,
+                val_1m = EXCLUDED.val_1m,
+                val_3m = EXCLUDED.val_3m,
+                val_ytd = EXCLUDED.val_ytd,
+                computed_at = EXCLUDED.computed_at;
+        """)
+
+        affected_rows = cur.rowcount
+        conn.commit()
+        print(f"  • Métricas precalculadas para {affected_rows} usuarios")
+
+        cur.close()
+    except Exception as e:
+        print(f"Error precalculando métricas: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
 def run_initial_update():
     """Ejecuta una actualización inicial al arrancar el script"""
     print("Iniciando sistema de actualización de precios")
@@ -253,7 +499,7 @@ def setup_schedule():
     
     print("Programación configurada:")
     print("  • Cada 15 minutos: Actualización (solo en mercado abierto)")
-    print("  • 23:59 diario: Actualización nocturna + consolidación")
+    print("  • 23:59 diario: Actualización nocturna + consolidación + tipos de cambio + métricas de rendimiento")
     print("  • Sábado 2:00: Consolidación adicional")
     print("  • Domingo 2:00: Consolidación adicional")
 